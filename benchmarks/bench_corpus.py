@@ -0,0 +1,101 @@
+"""
+Benchmark storing a corpus as one file per item versus a corpus store.
+
+Writes the same scenes as ``scene_NNNNN.json`` files (as batch-generate
+does without --corpus) and into ``morewritings.corpus.Corpus``, plain and
+gzip-compressed, then lists them, reloads them all and reads a random
+sample by key. Reports the time of each step, the files created and the
+bytes on disk.
+
+Usage:
+    python benchmarks/bench_corpus.py --items 20000 --words 300
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from morewritings.corpus import Corpus
+from morewritings.models import Scene
+from morewritings.serialization import dumps
+
+
+def make_scenes(count, words):
+    text = " ".join(["the lantern flickered as rain traced silver lines"] * (words // 8 + 1))
+    return [
+        Scene(title=f"Scene {i}", content=text, characters=["Aria", "Brom"], genre="fantasy")
+        for i in range(count)
+    ]
+
+
+def disk_usage(path):
+    files = [p for p in Path(path).rglob("*") if p.is_file()]
+    return len(files), sum(p.stat().st_size for p in files)
+
+
+def timed(step, results):
+    start = time.perf_counter()
+    value = step()
+    results.append(time.perf_counter() - start)
+    return value
+
+
+def bench_files(root, scenes, sample):
+    results = []
+
+    def write():
+        for i, scene in enumerate(scenes, 1):
+            (root / f"scene_{i:05d}.json").write_bytes(dumps(scene, compact=True))
+
+    timed(write, results)
+    names = timed(lambda: sorted(os.listdir(root)), results)
+    timed(lambda: [Scene.model_validate_json((root / n).read_bytes()) for n in names], results)
+    timed(lambda: [Scene.model_validate_json((root / f"scene_{i:05d}.json").read_bytes())
+                   for i in sample], results)
+    return results
+
+
+def bench_corpus(root, scenes, sample, compression):
+    results = []
+
+    def write():
+        with Corpus(root, compression=compression, commit_every=1000) as corpus:
+            for i, scene in enumerate(scenes, 1):
+                corpus.append(f"scene_{i:05d}", "scene", scene, position=i)
+
+    timed(write, results)
+    with Corpus(root) as corpus:
+        timed(corpus.keys, results)
+        timed(lambda: list(corpus.load()), results)
+        timed(lambda: [corpus.get(f"scene_{i:05d}") for i in sample], results)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=20000, help="Scenes to store")
+    parser.add_argument("--words", type=int, default=300, help="Words of content per scene")
+    parser.add_argument("--sample", type=int, default=1000, help="Random reads by key")
+    args = parser.parse_args()
+
+    scenes = make_scenes(args.items, args.words)
+    sample = random.Random(0).sample(range(1, args.items + 1), min(args.sample, args.items))
+    cases = [
+        ("one file per item", lambda root: bench_files(root, scenes, sample)),
+        ("corpus", lambda root: bench_corpus(root, scenes, sample, None)),
+        ("corpus gzip", lambda root: bench_corpus(root, scenes, sample, "gzip")),
+    ]
+    print(f"{'case':18} {'write s':>8} {'list s':>8} {'load s':>8} {'get ms':>8} "
+          f"{'files':>7} {'MB':>8}")
+    for name, run in cases:
+        with tempfile.TemporaryDirectory() as root:
+            write, listing, load, get = run(Path(root))
+            files, size = disk_usage(root)
+        print(f"{name:18} {write:8.2f} {listing:8.3f} {load:8.2f} "
+              f"{get / len(sample) * 1e3:8.3f} {files:7} {size / 1e6:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
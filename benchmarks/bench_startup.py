@@ -0,0 +1,54 @@
+"""
+Benchmark CLI startup time for ``morewritings --version``.
+
+Runs the command repeatedly in fresh interpreters and reports the median and
+best wall time, alongside a bare ``python -c pass`` baseline and the cost of
+importing the full generation stack for comparison.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 20]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+
+COMMANDS = {
+    "python (baseline)": [sys.executable, "-c", "pass"],
+    "morewritings --version": [
+        sys.executable, "-c", "from morewritings.cli import cli; cli(['--version'])"
+    ],
+    "morewritings --help": [
+        sys.executable, "-c", "from morewritings.cli import cli; cli(['--help'])"
+    ],
+    "import generators (full stack)": [
+        sys.executable, "-c", "import morewritings.generators"
+    ],
+}
+
+
+def time_command(argv, runs):
+    """Wall times in milliseconds for ``runs`` executions of ``argv``."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=20, help="Runs per command")
+    args = parser.parse_args()
+
+    print(f"{'command':34} {'median ms':>10} {'best ms':>10}")
+    for name, argv in COMMANDS.items():
+        times = time_command(argv, args.runs)
+        print(f"{name:34} {statistics.median(times):10.1f} {min(times):10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,599 @@
+"""
+Batch execution of generation requests.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+from collections import deque
+from typing import (
+    IO, Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+)
+
+import yaml
+
+from ..corpus import Corpus
+from ..generators import AIGenerator
+from ..models import Profile, Scenery
+from ..retry import GenerationError
+
+
+JOURNAL_NAME = ".batch_journal.jsonl"
+# Journals of every shard (``.batch_journal.shard-2-of-4.jsonl``) and the unsharded one
+JOURNAL_PATTERN = ".batch_journal*.jsonl"
+MANIFEST_NAME = "manifest.jsonl"
+# Corpus store in the output directory, for batches run with --corpus
+CORPUS_DIR = "corpus"
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+# Most items generated together in one packed completion
+MAX_PACK = 10
+
+# Called with (index, type) when an item starts, and (index, type, result) when it finishes.
+StartCallback = Callable[[int, str], None]
+ResultCallback = Callable[[int, str, Any], None]
+ErrorCallback = Callable[[int, str, Exception], None]
+
+
+def iter_jsonl(lines: Iterable[str]) -> Iterator[Dict[str, Any]]:
+    """Parse one JSON request per line, skipping blank lines."""
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"Invalid JSON on line {number}: {e}")
+
+
+def read_batch(batch_file: str, stdin: Optional[IO[str]] = None) -> Iterable[Dict[str, Any]]:
+    """Requests from a batch file.
+
+    JSONL files (``.jsonl``/``.ndjson``) and ``-`` (JSONL on stdin) are read
+    lazily, one line at a time, so memory use does not grow with batch size.
+    YAML and JSON files are parsed whole and returned as a list.
+    """
+    if batch_file == "-":
+        return iter_jsonl(stdin if stdin is not None else sys.stdin)
+    if batch_file.endswith(JSONL_SUFFIXES):
+        return _iter_jsonl_file(batch_file)
+    with open(batch_file) as f:
+        if batch_file.endswith('.json'):
+            return json.load(f)
+        return yaml.safe_load(f)
+
+
+def _iter_jsonl_file(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        yield from iter_jsonl(f)
+
+
+def pack_items(
+    items: Iterable[Tuple[int, Dict[str, Any]]],
+    generators: Dict[str, AIGenerator],
+    pack_tokens: int,
+    max_items: int = MAX_PACK,
+) -> Iterator[List[Tuple[int, Dict[str, Any]]]]:
+    """Group numbered items of the same type into packs for one completion each.
+
+    A pack holds as many items as fit ``pack_tokens`` of output at the
+    type's current learned budget (at most ``max_items``), so packs grow as
+    budgets shrink. Items are buffered per type, so interleaved types still
+    pack; unknown types, ``distinct`` items, items with dependencies and
+    generators that cannot pack pass through alone.
+    """
+    buffers: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}
+    for index, req in items:
+        req_type = req.get("type")
+        generator = generators.get(req_type)
+        if (
+            generator is None or not generator.can_pack
+            or req.get("distinct") or req.get("depends_on")
+        ):
+            yield [(index, req)]
+            continue
+        buffer = buffers.setdefault(req_type, [])
+        buffer.append((index, req))
+        capacity = pack_tokens // generator.budgets.budget(req_type, pack_tokens)
+        if len(buffer) >= max(1, min(max_items, capacity)):
+            yield buffers.pop(req_type)
+    yield from buffers.values()
+
+
+class DependencyError(GenerationError):
+    """A batch item could not run because an item it depends on did not complete."""
+
+
+# Batch item fields that are not generator options
+SCHEDULING_FIELDS = ("type", "id", "depends_on")
+
+
+def _dependencies(req: Dict[str, Any]) -> List[str]:
+    """Ids a batch item depends on (``depends_on`` may be one id or a list)."""
+    depends_on = req.get("depends_on") or []
+    return [depends_on] if isinstance(depends_on, str) else list(depends_on)
+
+
+def _options(req: Dict[str, Any], inputs: Sequence[Any] = ()) -> Dict[str, Any]:
+    """Generator options of a batch item, fed the results of its dependencies.
+
+    Generated profiles join a scene's ``characters`` and generated scenery
+    becomes its ``scenery``; other dependencies only order the run.
+    """
+    options = {k: v for k, v in req.items() if k not in SCHEDULING_FIELDS}
+    if req.get("type") != "scene":
+        return options
+    profiles = [r for r in inputs if isinstance(r, Profile)]
+    if profiles:
+        options["characters"] = [*(options.get("characters") or []), *profiles]
+    scenery = [r for r in inputs if isinstance(r, Scenery)]
+    if len(scenery) + bool(options.get("scenery")) > 1:
+        raise ValueError("A scene can have only one scenery")
+    if scenery:
+        options["scenery"] = scenery[0]
+    return options
+
+
+async def run_batch(
+    items: Iterable[Tuple[int, Dict[str, Any]]],
+    generators: Dict[str, AIGenerator],
+    concurrency: int = 1,
+    on_start: Optional[StartCallback] = None,
+    on_result: Optional[ResultCallback] = None,
+    on_unknown: Optional[StartCallback] = None,
+    on_error: Optional[ErrorCallback] = None,
+    pack_tokens: Optional[int] = None,
+    max_pack: int = MAX_PACK,
+    resolved: Optional[Dict[str, Any]] = None,
+) -> None:
+    """Run numbered batch items through their generators.
+
+    ``concurrency`` workers pull from a shared iterator, so at most that many
+    requests are in flight and items are only read from ``items`` as a worker
+    becomes free. Results are reported with their original index, so callers
+    can number outputs independently of completion order.
+
+    Items may have an ``id`` and ``depends_on`` (ids of other items). An item
+    whose dependencies have not finished is set aside while the workers go
+    on reading items, and runs, ahead of unread items, as soon as they have;
+    generated profiles and scenery are then passed to dependent scenes (see
+    ``_options``). Items whose dependencies fail are reported failed with
+    ``DependencyError``. ``resolved`` holds results by id of items finished
+    in an earlier run; it may be filled while ``items`` is being read.
+
+    With ``pack_tokens``, small items of the same type are generated several
+    to a completion (see ``pack_items``) and reported individually.
+
+    Without ``on_error`` the first failure aborts the batch; with it, failed
+    items are reported and the remaining items still run.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    results = resolved if resolved is not None else {}
+    seen_ids = set()
+    failed: Dict[str, Exception] = {}
+    # Items waiting on dependencies, by index: [index, req, unfinished dependencies]
+    parked: Dict[int, List[Any]] = {}
+    waiting: Dict[str, List[List[Any]]] = {}
+    ready: Deque[Tuple[int, Dict[str, Any]]] = deque()
+
+    def admit(entry: List[Any]) -> None:
+        index, req, _ = entry
+        entry[2] = 0
+        for dep in _dependencies(req):
+            if dep in failed:
+                settle(index, req, dependency_failed(dep))
+                return
+            if dep not in results:
+                entry[2] += 1
+                waiting.setdefault(dep, []).append(entry)
+        if entry[2]:
+            parked[index] = entry
+        else:
+            ready.append((index, req))
+
+    def admitted() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for index, req in items:
+            if "id" in req:
+                seen_ids.add(req["id"])
+            if not _dependencies(req):
+                yield index, req
+                continue
+            admit([index, req, 0])
+            # Run whatever became ready before reading further
+            while ready:
+                yield ready.popleft()
+
+    def dependency_failed(dep: str) -> DependencyError:
+        return DependencyError(
+            f"Depends on failed item {dep!r}",
+            retryable=getattr(failed[dep], "retryable", False)
+        )
+
+    def release(item_id: str, result: Any) -> None:
+        """Record an item's result and release (or fail) the items waiting on it."""
+        if isinstance(result, Exception):
+            failed[item_id] = result
+        else:
+            results[item_id] = result
+        for entry in waiting.pop(item_id, []):
+            index, req, _ = entry
+            if parked.get(index) is not entry:
+                continue
+            if isinstance(result, Exception):
+                del parked[index]
+                settle(index, req, dependency_failed(item_id))
+                continue
+            entry[2] -= 1
+            if entry[2] == 0:
+                del parked[index]
+                ready.append((index, req))
+
+    def settle(index: int, req: Dict[str, Any], result: Any) -> None:
+        report(index, req.get("type"), result)
+        if "id" in req:
+            release(req["id"], result)
+
+    def report(index: int, req_type: str, result: Any) -> None:
+        if isinstance(result, Exception):
+            if on_error is None:
+                raise result
+            on_error(index, req_type, result)
+        elif on_result:
+            on_result(index, req_type, result)
+
+    def unblock() -> bool:
+        """Once every item is read, recheck parked items against ``resolved``; fail the rest."""
+        entries = list(parked.values())
+        parked.clear()
+        waiting.clear()
+        for entry in entries:
+            admit(entry)
+        if not ready:
+            for index, entry in list(parked.items()):
+                if parked.get(index) is not entry:
+                    continue
+                del parked[index]
+                missing = [d for d in _dependencies(entry[1]) if d not in results]
+                unknown = [d for d in missing if d not in seen_ids]
+                settle(index, entry[1], DependencyError(
+                    f"Depends on unknown item {unknown[0]!r} (not in this batch or shard)"
+                    if unknown else f"Dependency cycle through {missing[0]!r}"
+                ))
+        return bool(ready)
+
+    async def run_one(index: int, req: Dict[str, Any]) -> None:
+        req_type = req.get("type")
+        generator = generators.get(req_type)
+        if not generator:
+            if on_unknown:
+                on_unknown(index, req_type)
+            if "id" in req:
+                release(req["id"], ValueError(f"Unknown type {req_type!r}"))
+            return
+
+        if on_start:
+            on_start(index, req_type)
+        try:
+            options = _options(req, [results[dep] for dep in _dependencies(req)])
+            result = await generator.agenerate(**options)
+        except Exception as e:
+            result = e
+        settle(index, req, result)
+
+    async def run_pack(group: List[Tuple[int, Dict[str, Any]]]) -> None:
+        req_type = group[0][1]["type"]
+        requests = []
+        for index, req in group:
+            if on_start:
+                on_start(index, req_type)
+            requests.append(_options(req))
+        try:
+            packed = await generators[req_type].agenerate_packed(requests)
+        except Exception as e:
+            # A failure of the pack as a whole is every item's failure
+            packed = [e] * len(group)
+        for (index, req), result in zip(group, packed):
+            settle(index, req, result)
+
+    if pack_tokens is None:
+        groups = ([item] for item in admitted())
+    else:
+        groups = pack_items(admitted(), generators, pack_tokens, max_pack)
+
+    running = 0
+    exhausted = False
+    progress = asyncio.Event()
+
+    async def worker():
+        nonlocal running, exhausted
+        while True:
+            if ready:
+                group = [ready.popleft()]
+            elif not exhausted:
+                group = next(groups, None)
+                if group is None:
+                    exhausted = True
+                    continue
+            elif running:
+                # Finishing items may release parked ones
+                progress.clear()
+                await progress.wait()
+                continue
+            elif parked and unblock():
+                continue
+            else:
+                return
+            running += 1
+            try:
+                if len(group) == 1:
+                    await run_one(*group[0])
+                else:
+                    await run_pack(group)
+            finally:
+                running -= 1
+                progress.set()
+
+    tasks = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class Shard:
+    """Every ``count``-th batch item, starting at position ``index`` (1-based).
+
+    Items are dealt out round-robin by their position in the batch file, so
+    shards stay balanced whatever the mix of types and need no item count up
+    front; positions (and so output file names) stay those of the full batch.
+    Items linked by ``depends_on`` are dealt out together by the position of
+    their group (see ``dependency_groups``).
+    """
+
+    def __init__(self, index: int, count: int):
+        if not 1 <= index <= count:
+            raise ValueError(f"Invalid shard {index}/{count}; expected 1 <= I <= N")
+        self.index = index
+        self.count = count
+
+    @classmethod
+    def parse(cls, spec: str) -> "Shard":
+        """Shard from an ``"I/N"`` string such as ``"2/4"``."""
+        index, sep, count = spec.partition("/")
+        try:
+            index, count = int(index), int(count)
+        except ValueError:
+            raise ValueError(f"Invalid shard {spec!r}; expected I/N")
+        return cls(index, count)
+
+    def __contains__(self, position: int) -> bool:
+        return (position - 1) % self.count == self.index - 1
+
+    def split(self, parts: int) -> List["Shard"]:
+        """This shard dealt out round-robin into ``parts`` smaller shards."""
+        return [Shard(self.index + self.count * j, self.count * parts) for j in range(parts)]
+
+    @property
+    def name(self) -> str:
+        """File-name friendly label, e.g. ``shard-2-of-4``."""
+        return f"shard-{self.index}-of-{self.count}"
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, Shard) and (self.index, self.count) == (other.index, other.count)
+
+    def __repr__(self) -> str:
+        return f"Shard({self.index}, {self.count})"
+
+    def __str__(self) -> str:
+        return f"{self.index}/{self.count}"
+
+
+def dependency_groups(requests: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+    """First position of the group of items each item is linked to by ``depends_on``.
+
+    Covers the items that depend on, or are depended on by, another item in
+    ``requests``; sharding items by their group's position keeps every item
+    in the same shard as its dependencies. Only ids and dependencies are
+    kept, so a large batch can be streamed through.
+    """
+    ids: Dict[str, int] = {}
+    links: List[Tuple[int, str]] = []
+    for index, req in enumerate(requests, 1):
+        if "id" in req:
+            ids.setdefault(req["id"], index)
+        links.extend((index, dep) for dep in _dependencies(req))
+
+    # Union-find over positions, each group rooted at its first position
+    parent: Dict[int, int] = {}
+
+    def find(index: int) -> int:
+        root = parent.setdefault(index, index)
+        while parent[root] != root:
+            root = parent[root]
+        while parent[index] != root:
+            parent[index], index = root, parent[index]
+        return root
+
+    for index, dep in links:
+        if dep in ids:
+            a, b = find(index), find(ids[dep])
+            parent[max(a, b)] = min(a, b)
+    return {index: find(index) for index in parent}
+
+
+def write_atomic(path: Union[str, Path], data: Union[str, bytes]) -> str:
+    """Write ``data`` (text is UTF-8 encoded) to ``path`` via a temp file and return its SHA-256."""
+    path = Path(path)
+    encoded = data if isinstance(data, bytes) else data.encode("utf-8")
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encoded)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class BatchJournal:
+    """Append-only record of completed batch items in an output directory.
+
+    Each line holds an item's index, type, output file and the file's SHA-256,
+    or the error for an item that failed. Lines are flushed and fsynced as
+    items finish, so after a crash the journal lists exactly the outputs
+    that were fully written. Items appended to a corpus store instead name
+    their record key, which is checked against the corpus index in
+    ``CORPUS_DIR``.
+    
+    Each shard of a batch keeps its own journal, so shards can share an
+    output directory. Reads cover the journals of all shards in the
+    directory, so a batch resumes and merges whatever shards produced it.
+    """
+
+    def __init__(
+        self,
+        output_dir: Union[str, Path],
+        shard: Optional[Shard] = None,
+        corpus: Optional[Corpus] = None
+    ):
+        """Journal for the batch (or ``shard`` of it) writing into ``output_dir``.
+
+        ``corpus`` is the store the batch appends to; by default the one in
+        ``output_dir`` is opened when stored records are checked.
+        """
+        self.output_dir = Path(output_dir)
+        self.shard = shard
+        self.corpus = corpus
+        name = JOURNAL_NAME if shard is None else f".batch_journal.{shard.name}.jsonl"
+        self.path = self.output_dir / name
+        self._file = None
+
+    def _entries(self) -> Dict[int, Dict[str, Any]]:
+        """Latest journal entry for each item index, this journal's entries last."""
+        entries = {}
+        others = [p for p in sorted(self.output_dir.glob(JOURNAL_PATTERN)) if p != self.path]
+        for path in [*others, self.path]:
+            if not path.exists():
+                continue
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A torn final line from an interrupted write
+                        continue
+                    entries[entry["index"]] = entry
+        return entries
+
+    def completed(self) -> Dict[int, Dict[str, Any]]:
+        """Journal entries whose output file still exists with the recorded hash."""
+        done = {}
+        entries = self._entries()
+        checksums = self._checksums(entries.values())
+        for index, entry in entries.items():
+            if "sha256" not in entry:
+                continue
+            if "record" in entry:
+                if checksums.get(entry["record"]) == entry["sha256"]:
+                    done[index] = entry
+                continue
+            try:
+                data = (self.output_dir / entry["file"]).read_bytes()
+            except OSError:
+                continue
+            if hashlib.sha256(data).hexdigest() == entry["sha256"]:
+                done[index] = entry
+        return done
+
+    def _checksums(self, entries: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        """Corpus record hashes by key, if any entry names a corpus record."""
+        if not any("record" in entry for entry in entries):
+            return {}
+        if self.corpus is not None:
+            return self.corpus.checksums()
+        if not (self.output_dir / CORPUS_DIR).is_dir():
+            return {}
+        with Corpus(self.output_dir / CORPUS_DIR) as corpus:
+            return corpus.checksums()
+
+    def reset(self) -> None:
+        """Remove the journals of every shard, before a fresh run of the whole batch."""
+        for path in self.output_dir.glob(JOURNAL_PATTERN):
+            path.unlink()
+
+    def open(self, resume: bool = False) -> "BatchJournal":
+        """Open for appending; a fresh run truncates any previous journal.
+        
+        A fresh unsharded run also removes the journals of earlier sharded runs.
+        """
+        if not resume and self.shard is None:
+            self.reset()
+        self._file = open(self.path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0:
+            # Terminate a torn final line so the next entry starts cleanly
+            with open(self.path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+        return self
+
+    def record(self, index: int, req_type: str, filename: str, sha256: str) -> None:
+        """Durably record a completed item."""
+        self._append({"index": index, "type": req_type, "file": filename, "sha256": sha256})
+
+    def record_stored(self, index: int, req_type: str, key: str, sha256: str) -> None:
+        """Durably record an item appended to the corpus under ``key``."""
+        self._append({"index": index, "type": req_type, "record": key, "sha256": sha256})
+
+    def record_failure(self, index: int, req_type: str, error: str, retryable: bool) -> None:
+        """Record a failed item; it is retried by the next ``--resume`` run."""
+        self._append({"index": index, "type": req_type, "error": error, "retryable": retryable})
+
+    def failures(self) -> Dict[int, Dict[str, Any]]:
+        """Items whose latest journal entry is a failure."""
+        return {i: e for i, e in self._entries().items() if "error" in e}
+
+    def merged(self) -> List[Dict[str, Any]]:
+        """Latest entry per item across all shards, in batch order.
+
+        Items whose output file (or corpus record) is missing or no longer
+        matches its hash are left out.
+        """
+        entries = self._entries()
+        completed = self.completed()
+        return [
+            entries[i] for i in sorted(entries) if i in completed or "error" in entries[i]
+        ]
+
+    def write_manifest(self) -> List[Dict[str, Any]]:
+        """Write ``manifest.jsonl`` with the ``merged`` entries and return them."""
+        entries = self.merged()
+        write_atomic(
+            self.output_dir / MANIFEST_NAME, "".join(json.dumps(e) + "\n" for e in entries)
+        )
+        return entries
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(entry) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "BatchJournal":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
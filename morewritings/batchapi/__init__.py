@@ -0,0 +1,259 @@
+"""
+Provider batch-API jobs: upload a batch file, poll it and materialize results.
+
+Provider batch endpoints run requests asynchronously within a completion
+window, at lower cost and with separate rate limits; suited to jobs where
+latency does not matter. Job state is kept in the output directory, so an
+interrupted run can resume polling without resubmitting.
+"""
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from openai import OpenAI
+
+from ..batch import ErrorCallback, ResultCallback, StartCallback, write_atomic
+from ..generators import AIGenerator
+from ..retry import RETRYABLE_STATUSES, GenerationError
+
+
+STATE_NAME = ".provider_batch.json"
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+# Provider limit on requests per batch input file
+MAX_REQUESTS = 50000
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+
+def custom_id(index: int) -> str:
+    """Batch request id for the item at ``index`` of the batch file."""
+    return f"item-{index}"
+
+
+def batch_line(generator: AIGenerator, index: int, req: Dict[str, Any]) -> Dict[str, Any]:
+    """Batch input line for one batch-file item (with ``type`` already removed).
+
+    Requests ask for the full ``max_tokens``: a truncated result cannot be
+    re-requested within the job, and batch pricing is per token used.
+    """
+    req = dict(req)
+    prompt = req.pop("prompt")
+    req.pop("distinct", None)
+    request = generator._prepare(generator._build_request(prompt, **req), adaptive=False)
+    return {
+        "custom_id": custom_id(index),
+        "method": "POST",
+        "url": ENDPOINT,
+        "body": generator._completion_args(request)
+    }
+
+
+def write_inputs(
+    items: Iterable[Tuple[int, Dict[str, Any]]],
+    generators: Dict[str, AIGenerator],
+    directory: Union[str, Path],
+    max_requests: int = MAX_REQUESTS,
+    on_unknown: Optional[StartCallback] = None,
+) -> List[Path]:
+    """Write numbered items as batch input JSONL files of at most ``max_requests`` lines."""
+    directory = Path(directory)
+    paths: List[Path] = []
+    f = None
+    count = 0
+    try:
+        for index, req in items:
+            req = dict(req)
+            req_type = req.pop("type")
+            req.pop("id", None)
+            if req.pop("depends_on", None):
+                raise ValueError(
+                    f"Item {index} has depends_on; provider batch jobs cannot feed "
+                    f"one item's output into another, so run it without --submit-batch"
+                )
+            generator = generators.get(req_type)
+            if not generator:
+                if on_unknown:
+                    on_unknown(index, req_type)
+                continue
+            if f is None or count >= max_requests:
+                if f is not None:
+                    f.close()
+                paths.append(directory / f".provider_batch_input_{len(paths) + 1}.jsonl")
+                f = open(paths[-1], "w", encoding="utf-8")
+                count = 0
+            f.write(json.dumps(batch_line(generator, index, req)) + "\n")
+            count += 1
+    finally:
+        if f is not None:
+            f.close()
+    return paths
+
+
+class ResultIndex:
+    """Lookup of batch output/error lines by ``custom_id`` via byte offsets.
+
+    Only offsets are held in memory; each line is read back when requested.
+    """
+
+    def __init__(self, paths: Iterable[Union[str, Path]]):
+        self.paths = [Path(p) for p in paths]
+        self._offsets: Dict[str, Tuple[int, int]] = {}
+        for number, path in enumerate(self.paths):
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    if line.strip():
+                        self._offsets[json.loads(line)["custom_id"]] = (number, offset)
+                    offset += len(line)
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        location = self._offsets.get(key)
+        if location is None:
+            return None
+        number, offset = location
+        with open(self.paths[number], "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline())
+
+
+def result_content(line: Optional[Dict[str, Any]]) -> str:
+    """Completion text from a batch result line; raises ``GenerationError`` on failure."""
+    if line is None:
+        raise GenerationError("No result returned for this request", retryable=True)
+    if line.get("error"):
+        error = line["error"]
+        raise GenerationError(f"Failed to generate content: {error.get('message', error)}")
+    response = line.get("response") or {}
+    status = response.get("status_code")
+    body = response.get("body") or {}
+    if status != 200:
+        message = (body.get("error") or {}).get("message", f"status {status}")
+        raise GenerationError(
+            f"Failed to generate content: {message}",
+            retryable=status in RETRYABLE_STATUSES or (status or 0) >= 500
+        )
+    return body["choices"][0]["message"]["content"]
+
+
+def materialize(
+    items: Iterable[Tuple[int, Dict[str, Any]]],
+    generators: Dict[str, AIGenerator],
+    results: ResultIndex,
+    on_result: Optional[ResultCallback] = None,
+    on_error: Optional[ErrorCallback] = None,
+) -> None:
+    """Build result models for numbered items from their batch results.
+
+    The same items that were submitted are passed again, so each result is
+    built by its generator's ``_build_result`` with the original parameters.
+    """
+    for index, req in items:
+        req = dict(req)
+        req_type = req.pop("type")
+        req.pop("prompt")
+        req.pop("distinct", None)
+        generator = generators.get(req_type)
+        if not generator:
+            continue
+        try:
+            content = result_content(results.get(custom_id(index)))
+        except GenerationError as e:
+            if on_error is None:
+                raise
+            on_error(index, req_type, e)
+            continue
+        if on_result:
+            on_result(index, req_type, generator._build_result(content, **req))
+
+
+class ProviderBatch:
+    """Submitted provider batch jobs, with state saved in ``output_dir``."""
+
+    def __init__(self, client: OpenAI, output_dir: Union[str, Path]):
+        self.client = client
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / STATE_NAME
+        self.jobs: List[Dict[str, Any]] = []
+
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def load(self) -> "ProviderBatch":
+        self.jobs = json.loads(self.path.read_text())["jobs"]
+        return self
+
+    def save(self) -> None:
+        write_atomic(self.path, json.dumps({"jobs": self.jobs}, indent=2))
+
+    def submit(self, input_paths: Iterable[Path]) -> None:
+        """Upload each input file and create a batch job for it."""
+        for path in input_paths:
+            with open(path, "rb") as f:
+                file = self.client.files.create(file=(path.name, f), purpose="batch")
+            batch = self.client.batches.create(
+                input_file_id=file.id,
+                endpoint=ENDPOINT,
+                completion_window=COMPLETION_WINDOW
+            )
+            self.jobs.append({"id": batch.id, "input_file_id": file.id, "status": batch.status})
+            # Save after every job, so a crash never loses a submitted job's id
+            self.save()
+
+    def refresh(self) -> List[Dict[str, Any]]:
+        """Fetch the current status of every unfinished job."""
+        for job in self.jobs:
+            if job["status"] in TERMINAL_STATUSES:
+                continue
+            batch = self.client.batches.retrieve(job["id"])
+            counts = batch.request_counts
+            job.update(
+                status=batch.status,
+                output_file_id=batch.output_file_id,
+                error_file_id=batch.error_file_id,
+                completed=counts.completed if counts else 0,
+                failed=counts.failed if counts else 0,
+                total=counts.total if counts else 0
+            )
+        self.save()
+        return self.jobs
+
+    @property
+    def done(self) -> bool:
+        return all(job["status"] in TERMINAL_STATUSES for job in self.jobs)
+
+    def wait(
+        self,
+        interval: float = 60.0,
+        on_status: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> List[Dict[str, Any]]:
+        """Poll every ``interval`` seconds until all jobs reach a terminal status."""
+        while True:
+            jobs = self.refresh()
+            if on_status:
+                on_status(jobs)
+            if self.done:
+                return jobs
+            sleep(interval)
+
+    def download(self) -> ResultIndex:
+        """Download output and error files and index their lines."""
+        paths = []
+        for number, job in enumerate(self.jobs, 1):
+            for kind in ("output", "error"):
+                file_id = job.get(f"{kind}_file_id")
+                if not file_id:
+                    continue
+                path = self.output_dir / f".provider_batch_{kind}_{number}.jsonl"
+                self.client.files.content(file_id).write_to_file(path)
+                paths.append(path)
+        return ResultIndex(paths)
+
+    def cleanup(self) -> None:
+        """Remove the job state and the batch input and result files."""
+        for path in self.output_dir.glob(".provider_batch*"):
+            path.unlink()
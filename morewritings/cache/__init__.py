@@ -0,0 +1,152 @@
+"""
+Persistent, content-addressed cache for generated completions.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "morewritings"
+
+
+def default_cache_dir() -> Path:
+    """Cache directory from MOREWRITINGS_CACHE_DIR, or ~/.cache/morewritings."""
+    return Path(os.getenv("MOREWRITINGS_CACHE_DIR", DEFAULT_CACHE_DIR))
+
+
+def make_key(
+    model: str,
+    temperature: float,
+    max_tokens: int,
+    system_prompt: str,
+    prompt: str,
+    response_format: Optional[Dict[str, Any]] = None,
+) -> str:
+    """Hash everything that determines a completion into a cache key."""
+    parts: List[Any] = [model, temperature, max_tokens, system_prompt, prompt]
+    if response_format is not None:
+        parts.append(response_format)
+    payload = json.dumps(
+        parts,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """On-disk completion cache with LRU eviction and optional TTL.
+
+    Each entry is a small JSON file named by its key. File mtimes record last
+    use, so recency survives across processes; the in-memory LRU index is
+    rebuilt from them on first access. Writes go through a temp file and
+    ``os.replace`` so concurrent writers never leave partial entries.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path, None] = None,
+        max_entries: int = 10000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None,
+    ):
+        """Create a cache rooted at ``cache_dir``; ``ttl`` is in seconds."""
+        self.cache_dir = Path(cache_dir) if cache_dir else default_cache_dir()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._index: Optional[OrderedDict] = None
+        self._total_bytes = 0
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _load_index(self) -> OrderedDict:
+        """Build the LRU index (oldest first) from entries on disk."""
+        if self._index is None:
+            entries = []
+            if self.cache_dir.exists():
+                for path in self.cache_dir.glob("*/*.json"):
+                    try:
+                        stat = path.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, path.stem, stat.st_size))
+            entries.sort()
+            self._index = OrderedDict((key, size) for _, key, size in entries)
+            self._total_bytes = sum(self._index.values())
+        return self._index
+
+    def get(self, key: str) -> Optional[str]:
+        """Return cached content for ``key``, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if self.ttl is not None and time.time() - entry.get("created_at", 0) > self.ttl:
+            self._discard(key)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        index = self._load_index()
+        if key in index:
+            index.move_to_end(key)
+        return entry.get("content")
+
+    def set(self, key: str, content: str) -> None:
+        """Store ``content`` under ``key`` and evict least recently used entries."""
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps({"created_at": time.time(), "content": content}, ensure_ascii=False)
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+        index = self._load_index()
+        self._total_bytes -= index.pop(key, 0)
+        size = path.stat().st_size
+        index[key] = size
+        self._total_bytes += size
+        self._evict()
+
+    def _discard(self, key: str) -> None:
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+        index = self._load_index()
+        self._total_bytes -= index.pop(key, 0)
+
+    def _evict(self) -> None:
+        index = self._load_index()
+        while index and (len(index) > self.max_entries or self._total_bytes > self.max_bytes):
+            key = next(iter(index))
+            self._discard(key)
+
+    def clear(self) -> None:
+        """Remove every cached entry."""
+        for key in list(self._load_index()):
+            self._discard(key)
+
+    def __len__(self) -> int:
+        return len(self._load_index())
@@ -1,77 +1,412 @@
 """
 Command-line interface for morewritings.
+
+Heavy dependencies (openai, httpx, pydantic, PyYAML) are imported inside the
+commands that use them, so ``--help``, ``--version`` and argument errors stay
+fast when the CLI is invoked from shell pipelines.
 """
 import click
 import json
 import os
-import yaml
+import sys
+import time
 from pathlib import Path
-from typing import Optional
-from ..generators import SceneGenerator, ProfileGenerator, SceneryGenerator
-from ..models import Scene, Profile, Scenery
+from typing import TYPE_CHECKING, Optional
+from ..cache import ResponseCache, default_cache_dir
+
+if TYPE_CHECKING:
+    from ..batch import Shard
+    from ..clients import ClientPool
+    from ..models import Scene, Profile, Scenery
+    from ..ratelimit import RateLimitRegistry
+
+
+def cache_options(f):
+    """Add the response cache switches shared by every generating command."""
+    f = click.option("--no-cache", is_flag=True,
+                     help="Always call the API, bypassing the response cache")(f)
+    f = click.option("--cache-dir", type=click.Path(file_okay=False), default=default_cache_dir,
+                     show_default="$MOREWRITINGS_CACHE_DIR or ~/.cache/morewritings",
+                     help="Response cache directory")(f)
+    return f
+
+
+def library_option(f):
+    """Add the --library switch shared by commands that use stored entities."""
+    def default_library_path() -> str:
+        # Imported lazily: the library module pulls in the pydantic models
+        from ..library import default_library_path
+        return str(default_library_path())
+    
+    return click.option("--library", "library_path", type=click.Path(dir_okay=False),
+                        default=default_library_path,
+                        show_default="$MOREWRITINGS_LIBRARY or "
+                                     "~/.local/share/morewritings/library.db",
+                        help="Profile/scenery library file")(f)
+
+
+def _save_to_library(library_path: str, entity) -> None:
+    """Store a generated profile or scenery in the library."""
+    from ..library import Library
+    with Library(library_path) as library:
+        library.add(entity)
+    click.echo(f"Saved {entity.name!r} to library {library_path}")
+
+
+def _read_style_guide(ctx, param, value) -> Optional[str]:
+    """Click callback reading a --style-guide file."""
+    if value is None:
+        return None
+    return Path(value).read_text(encoding="utf-8")
+
+
+STYLE_GUIDE_HELP = "File of writing guidelines added to every system prompt"
+COMPACT_HELP = "Write JSON without indentation (smaller, faster)"
+
+
+def _make_cache(cache_dir: str, no_cache: bool) -> Optional[ResponseCache]:
+    """Build the response cache selected by the CLI switches."""
+    return None if no_cache else ResponseCache(cache_dir)
+
+
+def _parse_rate_limits(ctx, param, value) -> Optional["RateLimitRegistry"]:
+    """Click callback turning --rate-limit specs into a shared registry."""
+    if not value:
+        return None
+    from ..ratelimit import RateLimitRegistry
+    try:
+        return RateLimitRegistry.from_specs(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _parse_shard(ctx, param, value) -> Optional["Shard"]:
+    """Click callback turning --shard I/N into a ``Shard``."""
+    if value is None:
+        return None
+    from ..batch import Shard
+    try:
+        return Shard.parse(value)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+
+def _parse_values(ctx, param, value) -> dict:
+    """Click callback collecting repeated FIELD=VALUE options into value lists."""
+    values = {}
+    for spec in value:
+        field, sep, item = spec.partition("=")
+        if not sep or not field:
+            raise click.BadParameter(f"{spec!r}; expected FIELD=VALUE")
+        values.setdefault(field, []).append(item)
+    return values
+
+
+def _configure_pool() -> "ClientPool":
+    """Apply the global connection pool options (imports the HTTP client stack)."""
+    from ..clients import PoolConfig, configure_pool
+    options = click.get_current_context().find_root().obj or {}
+    return configure_pool(PoolConfig(**options))
+
+
+def _echo_stream(generation_stream):
+    """Echo streamed chunks as they arrive and return the assembled model."""
+    for chunk in generation_stream:
+        click.echo(chunk, nl=False)
+    click.echo("\n")
+    if generation_stream.time_to_first_token is not None:
+        click.echo(
+            f"Time to first token: {generation_stream.time_to_first_token:.2f}s "
+            f"(total {generation_stream.elapsed:.2f}s)",
+            err=True
+        )
+    return generation_stream.result
+
+
+def _echo_scene_header(scene: "Scene"):
+    click.echo(f"\n{'='*60}")
+    click.echo(f"SCENE: {scene.title}")
+    click.echo(f"{'='*60}\n")
+    if scene.characters:
+        click.echo(f"Characters: {', '.join(scene.characters)}")
+    if scene.genre:
+        click.echo(f"Genre: {scene.genre}")
+    if scene.mood:
+        click.echo(f"Mood: {scene.mood}")
+    click.echo()
+
+
+def _echo_profile_header(profile: "Profile"):
+    click.echo(f"\n{'='*60}")
+    click.echo(f"CHARACTER PROFILE: {profile.name}")
+    click.echo(f"{'='*60}\n")
+
+
+def _echo_scenery_header(scenery: "Scenery"):
+    click.echo(f"\n{'='*60}")
+    click.echo(f"SCENERY: {scenery.name}")
+    click.echo(f"{'='*60}")
+    if scenery.location_type:
+        click.echo(f"Type: {scenery.location_type}")
+    if scenery.mood:
+        click.echo(f"Mood: {scenery.mood}")
+    if scenery.time_of_day:
+        click.echo(f"Time: {scenery.time_of_day}")
+    if scenery.weather:
+        click.echo(f"Weather: {scenery.weather}")
+    click.echo()
+
+
+def _echo_stats(summary: dict) -> None:
+    """Print a run summary from ``MetricsRecorder.summary()``."""
+    def seconds(name: str) -> str:
+        values = [summary[f"{name}_p{q}"] for q in (50, 95, 99)]
+        if values[0] is None:
+            return "n/a"
+        return "/".join(f"{v:.3f}" for v in values) + "s"
+    
+    elapsed = summary["elapsed"] or 0.0
+    click.echo(
+        f"Requests: {summary['requests']} in {elapsed:.2f}s "
+        f"({summary['requests_per_second'] or 0:.2f}/s), "
+        f"{summary['errors']} errors, {summary['cached']} cached, "
+        f"{summary['coalesced']} coalesced, {summary['hedged']} hedged, "
+        f"{summary['retries']} retries"
+    )
+    click.echo(f"Latency p50/p95/p99: {seconds('latency')}")
+    click.echo(f"Time to first byte p50/p95/p99: {seconds('ttfb')}")
+    cached = f"{summary['cached_tokens']} cached"
+    if summary["prompt_cache_hit_rate"] is not None:
+        cached += f", {summary['prompt_cache_hit_rate']:.0%} prompt cache hit rate"
+    click.echo(
+        f"Tokens: {summary['prompt_tokens']} prompt ({cached}), "
+        f"{summary['completion_tokens']} completion "
+        f"({summary['completion_tokens_per_second'] or 0:.1f} completion tokens/s)"
+    )
+    click.echo(
+        f"Rate-limit wait: {summary['rate_limit_wait']:.2f}s, "
+        f"writing output: {summary['write_time']:.2f}s"
+    )
+
+
+def _run_provider_batch(
+    batch_file: str,
+    output_path: Path,
+    generators: dict,
+    done: dict,
+    resume: bool,
+    poll_interval: float,
+    journal,
+    on_result,
+    on_error,
+    on_unknown
+):
+    """Submit batch items as provider batch jobs, wait for them and write results."""
+    from ..batch import read_batch
+    from ..batchapi import ProviderBatch, materialize, write_inputs
+    
+    if batch_file == "-":
+        raise ValueError("--submit-batch needs a batch file; stdin cannot be re-read for results")
+    
+    def pending():
+        return ((i, req) for i, req in enumerate(read_batch(batch_file), 1) if i not in done)
+    
+    job = ProviderBatch(generators["scene"].client, output_path)
+    if job.exists():
+        if not resume:
+            raise ValueError(
+                f"Provider batch jobs are already pending in {output_path}/; "
+                f"rerun with --resume to collect them"
+            )
+        job.load()
+        click.echo(f"Resuming {len(job.jobs)} provider batch job(s)")
+    else:
+        inputs = write_inputs(pending(), generators, output_path, on_unknown=on_unknown)
+        if not inputs:
+            click.echo("Nothing to submit")
+            return
+        job.submit(inputs)
+        click.echo(f"Submitted provider batch job(s): {', '.join(j['id'] for j in job.jobs)}")
+    
+    def on_status(jobs):
+        for j in jobs:
+            counts = f"{j.get('completed', 0)}/{j.get('total', 0)}" if j.get("total") else ""
+            click.echo(f"  {j['id']}: {j['status']} {counts}".rstrip())
+    
+    job.wait(poll_interval, on_status)
+    results = job.download()
+    with journal.open(resume=resume):
+        materialize(pending(), generators, results, on_result=on_result, on_error=on_error)
+    job.cleanup()
 
 
 @click.group()
 @click.version_option(version="0.1.0")
-def cli():
+@click.option("--pool-size", default=100, type=click.IntRange(min=1), show_default=True,
+              help="Maximum HTTP connections shared by all requests")
+@click.option("--keepalive", default=30.0, type=float, show_default=True,
+              help="Seconds idle connections are kept open for reuse")
+@click.option("--http2", is_flag=True, help="Use HTTP/2 (requires httpx[http2])")
+@click.option("--connect-timeout", default=10.0, type=float, show_default=True,
+              help="Connection timeout in seconds")
+@click.option("--read-timeout", default=600.0, type=float, show_default=True,
+              help="Read timeout in seconds")
+@click.pass_context
+def cli(
+    ctx: click.Context,
+    pool_size: int,
+    keepalive: float,
+    http2: bool,
+    connect_timeout: float,
+    read_timeout: float
+):
     """Morewritings - AI-powered creative writing tool for scenes, profiles, and scenery."""
-    pass
+    # Applied by the commands that make API calls, see _configure_pool
+    ctx.obj = dict(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=keepalive,
+        http2=http2,
+        connect_timeout=connect_timeout,
+        read_timeout=read_timeout
+    )
 
 
 @cli.command()
 @click.argument("prompt")
-@click.option("--title", default="Generated Scene", help="Title for the scene")
+@click.option("--title", help="Title for the scene (default: chosen by the model)")
 @click.option("--characters", multiple=True, help="Characters in the scene")
 @click.option("--scenery", help="Setting/scenery for the scene")
+@click.option("--profile", "profile_names", multiple=True, metavar="NAME",
+              help="Stored profile to cast in the scene (repeatable)")
+@click.option("--setting", "setting_name", metavar="NAME",
+              help="Stored scenery to set the scene in")
 @click.option("--genre", help="Genre of the scene")
 @click.option("--mood", help="Mood/tone of the scene")
+@click.option("--style-guide", type=click.Path(exists=True, dir_okay=False),
+              callback=_read_style_guide, help=STYLE_GUIDE_HELP)
 @click.option("--output", "-o", help="Output file path (JSON)")
+@click.option("--compact", is_flag=True, help=COMPACT_HELP)
+@click.option("--stream", is_flag=True, help="Print text as it is generated")
+@click.option("--hedge", is_flag=True,
+              help="Send a duplicate request when the first one runs unusually long")
+@click.option("--hedge-percentile", type=click.FloatRange(0, 100, min_open=True, max_open=True),
+              default=95.0, show_default=True,
+              help="Latency percentile of past requests after which to hedge")
+@click.option("--hedge-max-rate", type=click.FloatRange(0, 1), default=0.05, show_default=True,
+              help="Largest share of recent requests that may be hedged")
 @click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
+@cache_options
+@library_option
 def generate_scene(
     prompt: str,
-    title: str,
+    title: Optional[str],
     characters: tuple,
     scenery: Optional[str],
+    profile_names: tuple,
+    setting_name: Optional[str],
     genre: Optional[str],
     mood: Optional[str],
+    style_guide: Optional[str],
     output: Optional[str],
-    api_key: Optional[str]
+    compact: bool,
+    stream: bool,
+    hedge: bool,
+    hedge_percentile: float,
+    hedge_max_rate: float,
+    api_key: Optional[str],
+    cache_dir: str,
+    no_cache: bool,
+    library_path: str
 ):
     """Generate a scene using AI.
     
     Example:
         morewritings generate-scene "A tense negotiation in a dimly lit room" \\
             --characters Alice --characters Bob --genre thriller --mood suspenseful
+    
+    With --profile and --setting, characters and the setting are taken from
+    the library (see "morewritings library") and described in full in the
+    prompt.
+    
+    With --hedge, a request that outlasts the given percentile of earlier
+    requests' latencies is sent a second time and the first reply wins.
+    Latencies are kept in hedging.json in the cache directory (not with
+    --no-cache), so the trigger is learned across runs; hedging starts
+    after 20 requests.
     """
     try:
-        generator = SceneGenerator(api_key=api_key)
-        scene = generator.generate(
+        from ..generators import SceneGenerator
+        from ..library import Library, MissingEntityError
+        from ..serialization import write_json
+        
+        if hedge and stream:
+            raise click.UsageError("--hedge cannot be combined with --stream")
+        cast = list(characters)
+        if profile_names or setting_name:
+            if scenery and setting_name:
+                raise click.UsageError("Use either --scenery or --setting, not both")
+            with Library(library_path) as library:
+                cast.extend(library.profiles(profile_names))
+                if setting_name:
+                    scenery = library.scenery(setting_name)
+                    if scenery is None:
+                        raise MissingEntityError(
+                            f"No scenery named {setting_name!r} in the library"
+                        )
+        
+        pool = _configure_pool()
+        policy = None
+        if hedge:
+            from ..hedging import HedgePolicy
+            policy = HedgePolicy(hedge_percentile, hedge_max_rate)
+            # Learned latencies live with the cache, and are neither read nor kept without it
+            hedge_state = None if no_cache else Path(cache_dir) / "hedging.json"
+            if hedge_state is not None:
+                policy.load(hedge_state)
+        generator = SceneGenerator(
+            api_key=api_key,
+            cache=_make_cache(cache_dir, no_cache),
+            style_guide=style_guide,
+            hedge=policy
+        )
+        options = dict(
             prompt=prompt,
             title=title,
-            characters=list(characters),
+            characters=cast,
             scenery=scenery,
             genre=genre,
             mood=mood
         )
+        if hedge:
+            import asyncio
+            
+            # The async path cancels whichever request loses the race
+            async def run():
+                try:
+                    return await generator.agenerate(**options)
+                finally:
+                    await pool.aclose()
+            
+            try:
+                scene = asyncio.run(run())
+            finally:
+                if hedge_state is not None:
+                    policy.save(hedge_state)
+        else:
+            scene = generator.generate(stream=stream, **options)
+        if stream:
+            _echo_scene_header(scene.preview)
+            scene = _echo_stream(scene)
+            click.echo(f"{'='*60}")
         
         # Output
         if output:
-            output_path = Path(output)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w') as f:
-                json.dump(scene.model_dump(), f, indent=2, default=str)
+            write_json(output, scene, compact=compact)
             click.echo(f"Scene saved to {output}")
-        else:
-            click.echo(f"\n{'='*60}")
-            click.echo(f"SCENE: {scene.title}")
-            click.echo(f"{'='*60}\n")
-            if scene.characters:
-                click.echo(f"Characters: {', '.join(scene.characters)}")
-            if scene.genre:
-                click.echo(f"Genre: {scene.genre}")
-            if scene.mood:
-                click.echo(f"Mood: {scene.mood}")
-            click.echo(f"\n{scene.content}\n")
+        elif not stream:
+            _echo_scene_header(scene)
+            click.echo(f"{scene.content}\n")
             click.echo(f"{'='*60}")
         
     except Exception as e:
@@ -83,12 +418,23 @@ def generate_scene(
 @click.argument("prompt")
 @click.option("--name", help="Character name")
 @click.option("--output", "-o", help="Output file path (JSON)")
+@click.option("--compact", is_flag=True, help=COMPACT_HELP)
+@click.option("--stream", is_flag=True, help="Print text as it is generated")
+@click.option("--save", is_flag=True, help="Store the profile in the library")
 @click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
+@cache_options
+@library_option
 def generate_profile(
     prompt: str,
     name: Optional[str],
     output: Optional[str],
-    api_key: Optional[str]
+    compact: bool,
+    stream: bool,
+    save: bool,
+    api_key: Optional[str],
+    cache_dir: str,
+    no_cache: bool,
+    library_path: str
 ):
     """Generate a character profile using AI.
     
@@ -97,22 +443,27 @@ def generate_profile(
             --name "John Rivers"
     """
     try:
-        generator = ProfileGenerator(api_key=api_key)
-        profile = generator.generate(prompt=prompt, name=name)
+        from ..generators import ProfileGenerator
+        from ..serialization import write_json
+        
+        _configure_pool()
+        generator = ProfileGenerator(api_key=api_key, cache=_make_cache(cache_dir, no_cache))
+        profile = generator.generate(prompt=prompt, name=name, stream=stream)
+        if stream:
+            _echo_profile_header(profile.preview)
+            profile = _echo_stream(profile)
+            click.echo(f"{'='*60}")
         
         # Output
         if output:
-            output_path = Path(output)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w') as f:
-                json.dump(profile.model_dump(), f, indent=2, default=str)
+            write_json(output, profile, compact=compact)
             click.echo(f"Profile saved to {output}")
-        else:
-            click.echo(f"\n{'='*60}")
-            click.echo(f"CHARACTER PROFILE: {profile.name}")
-            click.echo(f"{'='*60}\n")
+        elif not stream:
+            _echo_profile_header(profile)
             click.echo(profile.description)
             click.echo(f"\n{'='*60}")
+        if save:
+            _save_to_library(library_path, profile)
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
@@ -127,7 +478,12 @@ def generate_profile(
 @click.option("--time", "time_of_day", help="Time of day")
 @click.option("--weather", help="Weather conditions")
 @click.option("--output", "-o", help="Output file path (JSON)")
+@click.option("--compact", is_flag=True, help=COMPACT_HELP)
+@click.option("--stream", is_flag=True, help="Print text as it is generated")
+@click.option("--save", is_flag=True, help="Store the scenery in the library")
 @click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
+@cache_options
+@library_option
 def generate_scenery(
     prompt: str,
     name: Optional[str],
@@ -136,7 +492,13 @@ def generate_scenery(
     time_of_day: Optional[str],
     weather: Optional[str],
     output: Optional[str],
-    api_key: Optional[str]
+    compact: bool,
+    stream: bool,
+    save: bool,
+    api_key: Optional[str],
+    cache_dir: str,
+    no_cache: bool,
+    library_path: str
 ):
     """Generate scenery/setting description using AI.
     
@@ -145,37 +507,35 @@ def generate_scenery(
             --name "Blackstone Lighthouse" --mood eerie --time dusk
     """
     try:
-        generator = SceneryGenerator(api_key=api_key)
+        from ..generators import SceneryGenerator
+        from ..serialization import write_json
+        
+        _configure_pool()
+        generator = SceneryGenerator(api_key=api_key, cache=_make_cache(cache_dir, no_cache))
         scenery = generator.generate(
             prompt=prompt,
             name=name,
             location_type=location_type,
             mood=mood,
             time_of_day=time_of_day,
-            weather=weather
+            weather=weather,
+            stream=stream
         )
+        if stream:
+            _echo_scenery_header(scenery.preview)
+            scenery = _echo_stream(scenery)
+            click.echo(f"{'='*60}")
         
         # Output
         if output:
-            output_path = Path(output)
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            with open(output_path, 'w') as f:
-                json.dump(scenery.model_dump(), f, indent=2, default=str)
+            write_json(output, scenery, compact=compact)
             click.echo(f"Scenery saved to {output}")
-        else:
-            click.echo(f"\n{'='*60}")
-            click.echo(f"SCENERY: {scenery.name}")
-            click.echo(f"{'='*60}")
-            if scenery.location_type:
-                click.echo(f"Type: {scenery.location_type}")
-            if scenery.mood:
-                click.echo(f"Mood: {scenery.mood}")
-            if scenery.time_of_day:
-                click.echo(f"Time: {scenery.time_of_day}")
-            if scenery.weather:
-                click.echo(f"Weather: {scenery.weather}")
-            click.echo(f"\n{scenery.description}\n")
+        elif not stream:
+            _echo_scenery_header(scenery)
+            click.echo(f"{scenery.description}\n")
             click.echo(f"{'='*60}")
+        if save:
+            _save_to_library(library_path, scenery)
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
@@ -183,65 +543,747 @@ def generate_scenery(
 
 
 @cli.command()
-@click.argument("batch_file", type=click.Path(exists=True))
+@click.argument("batch_file", type=click.Path(exists=True, allow_dash=True))
 @click.option("--output-dir", "-o", default="generated_scenes", help="Output directory")
+@click.option("--concurrency", "-c", default=1, type=click.IntRange(min=1),
+              help="Number of requests kept in flight")
+@click.option("--resume", is_flag=True,
+              help="Skip items already completed in the output directory "
+                   "(or keep polling jobs submitted with --submit-batch)")
+@click.option("--rate-limit", "rate_limits", multiple=True, callback=_parse_rate_limits,
+              metavar="[MODEL=]RPM:TPM",
+              help="Client-side requests/tokens per minute budget (repeat per model)")
+@click.option("--max-retries", default=4, type=click.IntRange(min=0), show_default=True,
+              help="Retries per item for transient errors (timeouts, 429, 5xx)")
+@click.option("--fail-fast", is_flag=True,
+              help="Abort the batch on the first failed item instead of skipping it")
+@click.option("--submit-batch", is_flag=True,
+              help="Run through the provider's batch API (cheaper, completes within 24h)")
+@click.option("--poll-interval", default=60.0, type=click.FloatRange(min=0), show_default=True,
+              help="Seconds between status checks with --submit-batch")
+@click.option("--no-coalesce", is_flag=True,
+              help="Send identical in-flight requests separately (distinct samples; "
+                   "per item with \"distinct\": true)")
+@click.option("--pack-tokens", type=click.IntRange(min=1),
+              help="Generate several items of a type per completion, up to N output tokens; "
+                   "the system prompt is sent once per pack")
+@click.option("--pack-size", default=10, type=click.IntRange(min=1), show_default=True,
+              help="Most items per packed completion with --pack-tokens")
+@click.option("--style-guide", type=click.Path(exists=True, dir_okay=False),
+              callback=_read_style_guide, help=STYLE_GUIDE_HELP)
+@click.option("--shard", callback=_parse_shard, metavar="I/N",
+              help="Generate only shard I of N (every Nth item, starting at item I, keeping "
+                   "dependent items together); combine with merge-shards")
+@click.option("--workers", default=1, type=click.IntRange(min=1), show_default=True,
+              help="Processes to split the batch (or shard) across, each with -c requests in "
+                   "flight and an equal share of the --rate-limit budget")
+@click.option("--compact", is_flag=True, help=COMPACT_HELP)
+@click.option("--corpus", "use_corpus", is_flag=True,
+              help="Append items to a corpus store in the output directory, not one file each; "
+                   "browse it with the corpus commands")
+@click.option("--compression", type=click.Choice(["gzip", "zstd"]),
+              help="Compress corpus records (with --corpus)")
+@click.option("--pool-stats", is_flag=True, help="Print HTTP connection pool statistics at the end")
+@click.option("--stats", is_flag=True,
+              help="Print throughput, latency percentiles and token usage at the end "
+                   "(also stored in each scene's metadata)")
+@click.option("--metrics-file", type=click.Path(dir_okay=False),
+              help="Write run metrics here (Prometheus textfile for .prom, else JSON)")
 @click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
-def batch_generate(batch_file: str, output_dir: str, api_key: Optional[str]):
-    """Generate multiple items from a batch file (YAML/JSON).
+@cache_options
+def batch_generate(
+    batch_file: str,
+    output_dir: str,
+    concurrency: int,
+    resume: bool,
+    rate_limits: Optional["RateLimitRegistry"],
+    max_retries: int,
+    fail_fast: bool,
+    submit_batch: bool,
+    poll_interval: float,
+    no_coalesce: bool,
+    pack_tokens: Optional[int],
+    pack_size: int,
+    style_guide: Optional[str],
+    shard: Optional["Shard"],
+    workers: int,
+    compact: bool,
+    use_corpus: bool,
+    compression: Optional[str],
+    pool_stats: bool,
+    stats: bool,
+    metrics_file: Optional[str],
+    api_key: Optional[str],
+    cache_dir: str,
+    no_cache: bool
+):
+    """Generate multiple items from a batch file (YAML/JSON/JSONL).
     
     The batch file should contain a list of generation requests with type and parameters.
+    JSONL files and "-" (JSONL on stdin) are streamed in constant memory.
+    
+    Output files are numbered by position in the batch file. Completed items
+    are journaled in the output directory, so an interrupted batch can be
+    finished with --resume. Items that still fail after retries are skipped
+    and the exit status is 1.
+    
+    Items may declare an "id" and "depends_on" (a list of ids); an item runs
+    once its dependencies are generated, and generated profiles and scenery
+    are cast into the scenes that depend on them.
+    
+    See the README for provider batch jobs, packing, sharding and the
+    corpus store.
     
+    \b
     Example batch file (YAML):
         - type: scene
           prompt: "A mysterious encounter in a forest"
           title: "Forest Meeting"
           genre: fantasy
+          depends_on: [merlin]
         - type: profile
+          id: merlin
           prompt: "A wise old wizard"
           name: "Merlin"
     """
     try:
-        # Load batch file
-        with open(batch_file) as f:
-            if batch_file.endswith('.json'):
-                requests = json.load(f)
-            else:
-                requests = yaml.safe_load(f)
+        import asyncio
+        from ..batch import (
+            CORPUS_DIR, BatchJournal, dependency_groups, read_batch, run_batch, write_atomic
+        )
+        from ..corpus import Corpus
+        from ..generators import SceneGenerator, ProfileGenerator, SceneryGenerator
+        from ..library import load_entity
+        from ..retry import RetryPolicy
+        from ..serialization import dumps
+        from ..telemetry import MetricsRecorder
+        
+        if submit_batch and pack_tokens:
+            raise click.UsageError("--pack-tokens cannot be combined with --submit-batch")
+        if submit_batch and (shard or workers > 1):
+            raise click.UsageError("--shard and --workers cannot be combined with --submit-batch")
+        if compression and not use_corpus:
+            raise click.UsageError("--compression needs --corpus")
+        if workers > 1:
+            if batch_file == "-":
+                raise click.UsageError("--workers needs a batch file, not stdin")
+            _run_batch_workers(click.get_current_context(), workers)
+            return
+        
+        # Load batch file (lazily for JSONL)
+        requests = read_batch(batch_file)
+        total = len(requests) if isinstance(requests, list) else None
         
         # Create output directory
         output_path = Path(output_dir)
         output_path.mkdir(parents=True, exist_ok=True)
+        corpus = None
+        if use_corpus:
+            corpus = Corpus(output_path / CORPUS_DIR, compression=compression,
+                            writer=shard.name if shard is not None else "segment")
+        journal = BatchJournal(output_path, shard, corpus)
+        done = journal.completed() if resume else {}
+        if done:
+            click.echo(f"Resuming: {len(done)} items already completed")
         
         # Process each request
+        pool = _configure_pool()
+        telemetry = MetricsRecorder() if stats or metrics_file else None
+        options = dict(
+            api_key=api_key,
+            cache=_make_cache(cache_dir, no_cache),
+            rate_limits=rate_limits,
+            retry=RetryPolicy(max_retries=max_retries),
+            pool=pool,
+            telemetry=telemetry,
+            coalesce=not no_coalesce,
+            style_guide=style_guide
+        )
         generators = {
-            "scene": SceneGenerator(api_key=api_key),
-            "profile": ProfileGenerator(api_key=api_key),
-            "scenery": SceneryGenerator(api_key=api_key)
+            "scene": SceneGenerator(**options),
+            "profile": ProfileGenerator(**options),
+            "scenery": SceneryGenerator(**options)
         }
         
-        results = []
-        for i, req in enumerate(requests, 1):
-            req_type = req.pop("type")
-            prompt = req.pop("prompt")
+        generated = 0
+        failures = 0
+        
+        def on_start(i: int, req_type: str):
+            progress = f"{i}/{total}" if total is not None else f"{i}"
+            click.echo(f"Generating {req_type} {progress}...")
+        
+        def on_unknown(i: int, req_type: str):
+            click.echo(f"Unknown type: {req_type}", err=True)
+        
+        def on_result(i: int, req_type: str, result):
+            nonlocal generated
+            # Save result, then journal it
+            written = time.perf_counter()
+            if corpus is not None:
+                key = f"{req_type}_{i:03d}"
+                journal.record_stored(i, req_type, key, corpus.append(key, req_type, result, i))
+                saved = f"{CORPUS_DIR}/{key}"
+            else:
+                saved = f"{req_type}_{i:03d}.json"
+                data = dumps(result, compact=compact)
+                journal.record(i, req_type, saved, write_atomic(output_path / saved, data))
+            if telemetry is not None:
+                telemetry.record_write(time.perf_counter() - written)
             
-            click.echo(f"Generating {req_type} {i}/{len(requests)}...")
+            generated += 1
+            click.echo(f"  Saved to {saved}")
+        
+        def on_error(i: int, req_type: str, error: Exception):
+            nonlocal failures
+            retryable = getattr(error, "retryable", False)
+            journal.record_failure(i, req_type, str(error), retryable)
+            failures += 1
+            click.echo(f"  Failed {req_type} {i}: {error}", err=True)
+        
+        connection_stats = {}
+        if submit_batch:
+            try:
+                _run_provider_batch(
+                    batch_file, output_path, generators, done, resume, poll_interval, journal,
+                    on_result=on_result,
+                    on_error=None if fail_fast else on_error,
+                    on_unknown=on_unknown
+                )
+            finally:
+                if corpus is not None:
+                    corpus.close()
+        else:
+            # Results of resumed items that later items depend on, read from their outputs
+            resolved = {}
+            
+            def load(entry):
+                if "record" in entry:
+                    return corpus.get(entry["record"])
+                return load_entity(output_path / entry["file"])
             
-            generator = generators.get(req_type)
-            if not generator:
-                click.echo(f"Unknown type: {req_type}", err=True)
-                continue
+            # Dependency-linked items share the shard of their group's first item
+            groups = {}
+            if shard is not None:
+                if batch_file == "-":
+                    # stdin cannot be read twice
+                    requests = list(requests)
+                source = requests if isinstance(requests, list) else read_batch(batch_file)
+                groups = dependency_groups(source)
             
-            result = generator.generate(prompt=prompt, **req)
+            def pending():
+                for i, req in enumerate(requests, 1):
+                    if i in done:
+                        if "id" in req:
+                            resolved[req["id"]] = load(done[i])
+                    elif shard is None or groups.get(i, i) in shard:
+                        yield i, req
             
-            # Save result
-            filename = f"{req_type}_{i:03d}.json"
-            with open(output_path / filename, 'w') as f:
-                json.dump(result.model_dump(), f, indent=2, default=str)
+            async def run():
+                try:
+                    await run_batch(
+                        pending(),
+                        generators,
+                        concurrency=concurrency,
+                        on_start=on_start,
+                        on_result=on_result,
+                        on_unknown=on_unknown,
+                        on_error=None if fail_fast else on_error,
+                        pack_tokens=pack_tokens,
+                        max_pack=pack_size,
+                        resolved=resolved
+                    )
+                finally:
+                    connection_stats.update(pool.stats())
+                    await pool.aclose()
             
-            results.append({"type": req_type, "file": filename})
-            click.echo(f"  Saved to {filename}")
+            if telemetry is not None:
+                telemetry.start()
+            try:
+                with journal.open(resume=resume):
+                    asyncio.run(run())
+            finally:
+                if corpus is not None:
+                    corpus.close()
+                if telemetry is not None:
+                    telemetry.stop()
+                    if metrics_file:
+                        telemetry.write(metrics_file)
+        
+        click.echo(f"\nGenerated {generated} items in {output_dir}/")
+        if pool_stats:
+            click.echo(
+                "Connection pool: " + ", ".join(f"{k}={v}" for k, v in connection_stats.items())
+            )
+        if stats:
+            _echo_stats(telemetry.summary())
+        if metrics_file:
+            click.echo(f"Metrics written to {metrics_file}")
+        if failures:
+            click.echo(
+                f"{failures} items failed (see {journal.path.name}); "
+                f"rerun with --resume to retry them",
+                err=True
+            )
+            sys.exit(1)
         
-        click.echo(f"\nGenerated {len(results)} items in {output_dir}/")
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+def _run_batch_workers(ctx: click.Context, workers: int) -> None:
+    """Run batch-generate in ``workers`` processes, one sub-shard each, and merge their outputs."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from itertools import repeat
+    from ..batch import CORPUS_DIR, BatchJournal, Shard
+    from ..corpus import Corpus
+    
+    params = dict(ctx.params, workers=1)
+    if params["rate_limits"] is not None:
+        params["rate_limits"] = params["rate_limits"].share(workers)
+    output_path = Path(params["output_dir"])
+    output_path.mkdir(parents=True, exist_ok=True)
+    if params["use_corpus"]:
+        # Create the shared index once, before the workers open it together
+        Corpus(output_path / CORPUS_DIR).close()
+    journal = BatchJournal(output_path)
+    if not params["resume"]:
+        journal.reset()
+    
+    runs = []
+    for shard in (params["shard"] or Shard(1, 1)).split(workers):
+        run = dict(params, shard=shard)
+        if params["metrics_file"]:
+            metrics_path = Path(params["metrics_file"])
+            run["metrics_file"] = str(
+                metrics_path.with_name(f"{metrics_path.stem}.{shard.name}{metrics_path.suffix}")
+            )
+        runs.append(run)
+    
+    click.echo(f"Starting {workers} workers...")
+    # Spawned rather than forked, so workers start without the parent's threads and sockets
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(workers, mp_context=context) as executor:
+        statuses = list(executor.map(_batch_worker, runs, repeat(ctx.find_root().obj or {})))
+    
+    entries = journal.write_manifest()
+    incomplete = _echo_manifest(output_path, entries)
+    if incomplete or any(statuses):
+        sys.exit(1)
+
+
+def _batch_worker(params: dict, pool_options: dict) -> int:
+    """Process pool entry point running one shard of batch-generate; returns its exit status."""
+    with click.Context(cli, info_name="morewritings", obj=pool_options) as root:
+        with click.Context(batch_generate, info_name="batch-generate", parent=root):
+            try:
+                batch_generate.callback(**params)
+            except SystemExit as e:
+                return e.code or 0
+            except click.Abort:
+                return 1
+    return 0
+
+
+def _echo_manifest(output_path: Path, entries: list) -> bool:
+    """Report a merged batch manifest; returns whether items failed or are missing."""
+    from ..batch import MANIFEST_NAME
+    
+    failed = [e["index"] for e in entries if "error" in e]
+    indices = {e["index"] for e in entries}
+    missing = [i for i in range(1, max(indices, default=0) + 1) if i not in indices]
+    click.echo(
+        f"Manifest of {len(entries) - len(failed)} items written to "
+        f"{output_path / MANIFEST_NAME}"
+    )
+    if failed:
+        click.echo(f"{len(failed)} items failed: {', '.join(map(str, failed))}", err=True)
+    if missing:
+        click.echo(f"{len(missing)} items missing: {', '.join(map(str, missing))}", err=True)
+    return bool(failed or missing)
+
+
+@cli.command()
+@click.argument("output_dir", type=click.Path(exists=True, file_okay=False))
+def merge_shards(output_dir: str):
+    """Merge the outputs of a sharded batch into one ordered manifest.
+    
+    Reads the journals of every shard in OUTPUT_DIR and writes
+    manifest.jsonl, listing each item's type and output file (or error) in
+    batch order. When shards ran on several hosts, first copy their output
+    directories into one (file names do not collide). Exits with status 1
+    if items failed or are missing.
+    
+    Example:
+        morewritings batch-generate chapter.jsonl --shard 1/2 -o out
+        morewritings batch-generate chapter.jsonl --shard 2/2 -o out
+        morewritings merge-shards out
+    """
+    try:
+        from ..batch import BatchJournal
+        
+        output_path = Path(output_dir)
+        if _echo_manifest(output_path, BatchJournal(output_path).write_manifest()):
+            sys.exit(1)
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@cli.command()
+@click.option("--host", default="127.0.0.1", show_default=True, help="Interface to listen on")
+@click.option("--port", default=8000, type=click.IntRange(0, 65535), show_default=True,
+              help="TCP port to listen on")
+@click.option("--socket", "socket_path", type=click.Path(dir_okay=False),
+              help="Listen on this Unix socket instead of TCP")
+@click.option("--concurrency", "-c", default=8, type=click.IntRange(min=1), show_default=True,
+              help="Generations run at once")
+@click.option("--max-queue", default=100, type=click.IntRange(min=0), show_default=True,
+              help="Requests waiting for a slot before new ones get 503")
+@click.option("--rate-limit", "rate_limits", multiple=True, callback=_parse_rate_limits,
+              metavar="[MODEL=]RPM:TPM",
+              help="Client-side requests/tokens per minute budget (repeat per model)")
+@click.option("--max-retries", default=4, type=click.IntRange(min=0), show_default=True,
+              help="Retries per request for transient errors (timeouts, 429, 5xx)")
+@click.option("--style-guide", type=click.Path(exists=True, dir_okay=False),
+              callback=_read_style_guide, help=STYLE_GUIDE_HELP)
+@click.option("--api-key", envvar="OPENAI_API_KEY", help="OpenAI API key")
+@cache_options
+def serve(
+    host: str,
+    port: int,
+    socket_path: Optional[str],
+    concurrency: int,
+    max_queue: int,
+    rate_limits: Optional["RateLimitRegistry"],
+    max_retries: int,
+    style_guide: Optional[str],
+    api_key: Optional[str],
+    cache_dir: str,
+    no_cache: bool
+):
+    """Serve scene, profile and scenery generation over a local HTTP API.
+    
+    Generators, connections and caches stay warm between requests, so a web
+    app can POST to the server instead of running the CLI per item:
+    
+    \b
+        POST /generate/scene|profile|scenery   JSON body as in a batch item
+        GET  /health                           status and queue depth
+        GET  /metrics                          Prometheus metrics
+    
+    Example:
+        morewritings serve --port 8000 -c 16
+        curl -d '{"prompt": "A duel at dawn"}' localhost:8000/generate/scene
+    """
+    try:
+        import signal
+        import threading
+        from ..generators import SceneGenerator, ProfileGenerator, SceneryGenerator
+        from ..retry import RetryPolicy
+        from ..server import GenerationServer
+        from ..telemetry import MetricsRecorder
+        
+        pool = _configure_pool()
+        telemetry = MetricsRecorder()
+        options = dict(
+            api_key=api_key,
+            cache=_make_cache(cache_dir, no_cache),
+            rate_limits=rate_limits,
+            retry=RetryPolicy(max_retries=max_retries),
+            pool=pool,
+            telemetry=telemetry,
+            style_guide=style_guide
+        )
+        generators = {
+            "scene": SceneGenerator(**options),
+            "profile": ProfileGenerator(**options),
+            "scenery": SceneryGenerator(**options)
+        }
+        server = GenerationServer(
+            generators,
+            host=host,
+            port=port,
+            socket_path=socket_path,
+            concurrency=concurrency,
+            max_queue=max_queue,
+            telemetry=telemetry,
+            pool=pool
+        )
+        # Shut down cleanly when a process manager stops the daemon
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        with server:
+            click.echo(f"Serving on {server.url} (Ctrl-C to stop)")
+            try:
+                threading.Event().wait()
+            except KeyboardInterrupt:
+                pass
+        click.echo("Server stopped")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@cli.command()
+@click.argument("templates_file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--template", "-t", "names", multiple=True,
+              help="Template to expand (repeatable; default: all)")
+@click.option("--values", "values_file", type=click.Path(exists=True, dir_okay=False),
+              help="YAML/JSON file mapping placeholders to value lists")
+@click.option("--set", "set_values", multiple=True, callback=_parse_values,
+              metavar="FIELD=VALUE", help="Add a value for a placeholder (repeatable)")
+@click.option("--sample", type=click.IntRange(min=1),
+              help="Emit N random distinct combinations per template instead of all")
+@click.option("--seed", type=int, help="Random seed for --sample")
+@click.option("--count", "count_only", is_flag=True,
+              help="Print the number of combinations and exit")
+@click.option("--output", "-o", default="-", help="Output JSONL file (default: stdout)")
+def expand_templates(
+    templates_file: str,
+    names: tuple,
+    values_file: Optional[str],
+    set_values: dict,
+    sample: Optional[int],
+    seed: Optional[int],
+    count_only: bool,
+    output: str
+):
+    """Expand prompt templates into batch requests (JSONL).
+    
+    Each template's placeholders are filled with every combination of their
+    value lists (or a random --sample of them). Combinations are generated
+    and written one at a time, so even huge products use constant memory;
+    pipe the output straight into batch-generate:
+    
+        morewritings expand-templates templates/scene_templates.yaml \
+            -t epic_battle --values values.yaml | morewritings batch-generate -
+    
+    Value lists come from the template's own "values" key, then --values,
+    then --set, later sources replacing earlier ones per placeholder.
+    """
+    try:
+        from ..templating import expand_all, load_templates, load_values
+        
+        templates = load_templates(templates_file)
+        unknown = [name for name in names if name not in templates]
+        if unknown:
+            raise ValueError(f"Unknown template(s): {', '.join(unknown)}")
+        selected = [templates[name] for name in names] if names else list(templates.values())
+        values = load_values(values_file) if values_file else {}
+        values.update(set_values)
+        
+        # Validate every template before writing anything
+        counts = [t.count(values) for t in selected]
+        if count_only:
+            total = sum(min(n, sample) if sample else n for n in counts)
+            click.echo(str(total))
+            return
+        
+        with click.open_file(output, "w") as f:
+            for request in expand_all(selected, values, sample=sample, seed=seed):
+                f.write(json.dumps(request) + "\n")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@cli.group()
+def library():
+    """Manage the library of stored profiles and scenery.
+    
+    Stored entities can be cast in scenes by name with
+    "generate-scene --profile NAME --setting NAME".
+    """
+
+
+@library.command("import")
+@click.argument("files", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@library_option
+def library_import(files: tuple, library_path: str):
+    """Import generated profile/scenery JSON files (e.g. batch-generate output).
+    
+    Scene files are skipped; an entity with an existing name is replaced.
+    """
+    try:
+        from ..library import Library, load_entity
+        
+        entities = [entity for entity in map(load_entity, files) if entity is not None]
+        with Library(library_path) as lib:
+            count = lib.add_all(entities)
+        click.echo(f"Imported {count} entities ({len(files) - count} files skipped)")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@library.command("list")
+@click.option("--trait", help="Only profiles with this trait")
+@click.option("--location-type", help="Only scenery of this location type")
+@click.option("--mood", help="Only scenery with this mood")
+@library_option
+def library_list(
+    trait: Optional[str],
+    location_type: Optional[str],
+    mood: Optional[str],
+    library_path: str
+):
+    """List stored profiles and scenery, optionally filtered."""
+    try:
+        from ..library import Library
+        
+        scenery_filter = location_type is not None or mood is not None
+        with Library(library_path) as lib:
+            if not scenery_filter:
+                for profile in lib.find_profiles(trait=trait):
+                    traits = f" ({', '.join(profile.traits)})" if profile.traits else ""
+                    click.echo(f"profile  {profile.name}{traits}")
+            if trait is None:
+                for scenery in lib.find_scenery(location_type=location_type, mood=mood):
+                    details = ", ".join(filter(None, [scenery.location_type, scenery.mood]))
+                    click.echo(f"scenery  {scenery.name} ({details})")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@library.command("show")
+@click.argument("name")
+@library_option
+def library_show(name: str, library_path: str):
+    """Print a stored profile or scenery as JSON."""
+    try:
+        from ..library import Library, MissingEntityError
+        from ..serialization import dumps
+        
+        with Library(library_path) as lib:
+            entity = lib.profile(name) or lib.scenery(name)
+        if entity is None:
+            raise MissingEntityError(f"Nothing named {name!r} in the library")
+        click.echo(dumps(entity).decode("utf-8"))
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@library.command("remove")
+@click.argument("name")
+@library_option
+def library_remove(name: str, library_path: str):
+    """Delete a stored profile or scenery."""
+    try:
+        from ..library import Library, MissingEntityError
+        
+        with Library(library_path) as lib:
+            if not lib.remove(name):
+                raise MissingEntityError(f"Nothing named {name!r} in the library")
+        click.echo(f"Removed {name!r}")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@cli.group()
+def corpus():
+    """Browse and export corpus stores written by "batch-generate --corpus".
+    
+    CORPUS_DIR is the store itself or a batch output directory holding one.
+    """
+
+
+def _open_corpus(corpus_dir: str):
+    """The corpus in ``corpus_dir``, or in its ``corpus`` subdirectory."""
+    from ..batch import CORPUS_DIR
+    from ..corpus import INDEX_NAME, Corpus
+    
+    path = Path(corpus_dir)
+    if not (path / INDEX_NAME).exists() and (path / CORPUS_DIR / INDEX_NAME).exists():
+        path = path / CORPUS_DIR
+    if not (path / INDEX_NAME).exists():
+        raise FileNotFoundError(f"No corpus in {corpus_dir}")
+    return Corpus(path)
+
+
+CORPUS_TYPES = click.Choice(["scene", "profile", "scenery"])
+
+
+@corpus.command("list")
+@click.argument("corpus_dir", type=click.Path(exists=True, file_okay=False))
+@click.option("--type", "req_type", type=CORPUS_TYPES, help="Only records of this type")
+def corpus_list(corpus_dir: str, req_type: Optional[str]):
+    """List the keys and types of stored records, in batch order."""
+    try:
+        with _open_corpus(corpus_dir) as store:
+            for entry in store.entries(req_type):
+                click.echo(f"{entry['key']}  {entry['type']}")
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@corpus.command("show")
+@click.argument("corpus_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("key")
+def corpus_show(corpus_dir: str, key: str):
+    """Print the record stored under KEY (e.g. scene_001) as JSON."""
+    try:
+        from ..serialization import dumps
+        
+        with _open_corpus(corpus_dir) as store:
+            click.echo(dumps(store.get(key)).decode("utf-8"))
+        
+    except Exception as e:
+        click.echo(f"Error: {str(e)}", err=True)
+        raise click.Abort()
+
+
+@corpus.command("export")
+@click.argument("corpus_dir", type=click.Path(exists=True, file_okay=False))
+@click.argument("output", type=click.Path(allow_dash=True))
+@click.option("--type", "req_type", type=CORPUS_TYPES, help="Only records of this type")
+@click.option("--format", "fmt", type=click.Choice(["jsonl", "files"]), default="jsonl",
+              show_default=True,
+              help="One JSON Lines file (\"-\" for stdout), or a directory of KEY.json files")
+@click.option("--compact", is_flag=True, help=COMPACT_HELP)
+def corpus_export(
+    corpus_dir: str,
+    output: str,
+    req_type: Optional[str],
+    fmt: str,
+    compact: bool
+):
+    """Export stored records to JSON Lines or to one JSON file per record.
+    
+    JSON Lines export copies the stored records without parsing them.
+    
+    Example:
+        morewritings corpus export generated_scenes profiles.jsonl --type profile
+    """
+    try:
+        from ..batch import write_atomic
+        from ..serialization import dumps
+        
+        with _open_corpus(corpus_dir) as store:
+            records = store.load(req_type)
+            if fmt == "files":
+                output_path = Path(output)
+                output_path.mkdir(parents=True, exist_ok=True)
+                for key, item in zip(records.keys, records):
+                    write_atomic(output_path / f"{key}.json", dumps(item, compact=compact))
+            else:
+                with click.open_file(output, "wb") as f:
+                    for line in records.raw():
+                        f.write(line)
+        if output != "-":
+            click.echo(f"Exported {len(records)} records to {output}")
         
     except Exception as e:
         click.echo(f"Error: {str(e)}", err=True)
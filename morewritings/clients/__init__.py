@@ -0,0 +1,171 @@
+"""
+Process-wide pooled HTTP clients shared by all generators.
+"""
+import asyncio
+import threading
+from typing import Any, Dict, Optional
+
+from openai import OpenAI, AsyncOpenAI
+from pydantic import BaseModel, ConfigDict
+
+try:
+    import httpx
+except ImportError:  # newer openai releases are built on httpx2
+    import httpx2 as httpx
+
+
+class PoolConfig(BaseModel):
+    """Connection pool and timeout settings for the shared HTTP clients."""
+    model_config = ConfigDict(frozen=True)
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+    connect_timeout: float = 10.0
+    read_timeout: float = 600.0
+
+    def limits(self) -> "httpx.Limits":
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry
+        )
+
+    def timeout(self) -> "httpx.Timeout":
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+
+def _connection_counts(http_client) -> Dict[str, int]:
+    """Open/idle connection counts from an HTTP client's pool, where exposed."""
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return {}
+    idle = sum(1 for c in connections if c.is_idle())
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
+
+
+class ClientPool:
+    """One keep-alive connection pool shared by every OpenAI client it hands out.
+
+    ``client()`` and ``async_client()`` return lightweight SDK clients bound to
+    the shared HTTP transport, so generators with different API keys or
+    settings still reuse connections. Async transports are tied to an event
+    loop, so one is kept per running loop.
+    """
+
+    def __init__(self, config: Optional[PoolConfig] = None):
+        self.config = config or PoolConfig()
+        self._lock = threading.Lock()
+        self._http_client = None
+        self._async_http_client = None
+        self._async_loop = None
+        self._requests = 0
+
+    def _count_request(self, request) -> None:
+        self._requests += 1
+
+    async def _acount_request(self, request) -> None:
+        self._requests += 1
+
+    def _client_options(self) -> Dict[str, Any]:
+        return dict(
+            limits=self.config.limits(),
+            timeout=self.config.timeout(),
+            http2=self.config.http2,
+            follow_redirects=True
+        )
+
+    @property
+    def http_client(self) -> "httpx.Client":
+        """The shared synchronous HTTP client."""
+        with self._lock:
+            if self._http_client is None:
+                try:
+                    self._http_client = httpx.Client(
+                        event_hooks={"request": [self._count_request]},
+                        **self._client_options()
+                    )
+                except ImportError as e:
+                    raise ValueError(f"HTTP/2 support is not installed: {e}")
+            return self._http_client
+
+    @property
+    def async_http_client(self) -> "httpx.AsyncClient":
+        """The shared async HTTP client for the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async_http_client is None or self._async_loop is not loop:
+                try:
+                    self._async_http_client = httpx.AsyncClient(
+                        event_hooks={"request": [self._acount_request]},
+                        **self._client_options()
+                    )
+                except ImportError as e:
+                    raise ValueError(f"HTTP/2 support is not installed: {e}")
+                self._async_loop = loop
+            return self._async_http_client
+
+    def client(self, api_key: str, **kwargs) -> OpenAI:
+        """An OpenAI client using the shared connection pool."""
+        return OpenAI(api_key=api_key, http_client=self.http_client, **kwargs)
+
+    def async_client(self, api_key: str, **kwargs) -> AsyncOpenAI:
+        """An AsyncOpenAI client using the shared pool (call inside the event loop)."""
+        return AsyncOpenAI(api_key=api_key, http_client=self.async_http_client, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool statistics for tuning: requests sent and connection usage."""
+        stats = {
+            "requests": self._requests,
+            "max_connections": self.config.max_connections,
+            "max_keepalive_connections": self.config.max_keepalive_connections,
+            "http2": self.config.http2
+        }
+        for http_client in (self._http_client, self._async_http_client):
+            if http_client is None:
+                continue
+            for key, value in _connection_counts(http_client).items():
+                stats[key] = stats.get(key, 0) + value
+        return stats
+
+    async def aclose(self) -> None:
+        """Close the async transport; call before the event loop shuts down."""
+        with self._lock:
+            http_client, self._async_http_client = self._async_http_client, None
+            self._async_loop = None
+        if http_client is not None:
+            await http_client.aclose()
+
+    def close(self) -> None:
+        """Close the shared sync transport and drop the async one."""
+        with self._lock:
+            if self._http_client is not None:
+                self._http_client.close()
+                self._http_client = None
+            self._async_http_client = None
+            self._async_loop = None
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ClientPool:
+    """The process-wide client pool, created with default settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool()
+        return _pool
+
+
+def configure_pool(config: PoolConfig) -> ClientPool:
+    """Replace the process-wide pool with one using ``config``."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ClientPool(config)
+        return _pool
@@ -0,0 +1,347 @@
+"""
+Append-only corpus store: many generated items in a few large files.
+
+One JSON file per item costs an inode per item, and listing or reloading
+a corpus of hundreds of thousands of items is slow. A ``Corpus`` directory
+instead holds segment files, each a run of compact JSON records appended
+one after another, and ``index.db``, an SQLite index from each record's
+key to its segment, offset and length. Segments are memory-mapped, so a
+record is read by key without scanning, and ``load`` materializes
+``Scene``/``Profile``/``Scenery`` objects only as they are accessed.
+
+Segments may be compressed record by record (``compression="gzip"``, or
+``"zstd"`` with ``pip install morewritings[zstd]``). Each record is its own
+gzip member or zstd frame, so it can still be read on its own, and a whole
+segment still decompresses to JSON Lines with ``zcat``/``zstdcat``.
+"""
+import gzip
+import hashlib
+import mmap
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import Sequence
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from pydantic import BaseModel
+
+from ..models import Profile, Scene, Scenery
+from ..serialization import dumps
+
+
+INDEX_NAME = "index.db"
+MODELS = {"scene": Scene, "profile": Profile, "scenery": Scenery}
+COMPRESSIONS = {None: ".jsonl", "gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}
+MAX_SEGMENT_BYTES = 256 * 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    key TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    position INTEGER,
+    segment TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS records_type ON records (type);
+"""
+
+# Batch order for records with a position, insertion order for the rest
+ORDER = "ORDER BY position IS NULL, position, rowid"
+
+
+class MissingRecordError(LookupError):
+    """A key that is not in the corpus."""
+
+
+@lru_cache(maxsize=None)
+def _zstd():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            'zstd compression needs zstandard (pip install "morewritings[zstd]")'
+        ) from None
+    return zstandard
+
+
+def _compression(segment: str) -> Optional[str]:
+    if segment.endswith(COMPRESSIONS["gzip"]):
+        return "gzip"
+    if segment.endswith(COMPRESSIONS["zstd"]):
+        return "zstd"
+    return None
+
+
+def _compress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        # mtime=0: identical records compress to identical bytes
+        return gzip.compress(data, mtime=0)
+    if compression == "zstd":
+        return _zstd().ZstdCompressor().compress(data)
+    return data
+
+
+def _decompress(data: bytes, compression: Optional[str]) -> bytes:
+    if compression == "gzip":
+        return gzip.decompress(data)
+    if compression == "zstd":
+        return _zstd().ZstdDecompressor().decompress(data)
+    return data
+
+
+class Corpus:
+    """Generated items stored by key in append-only segment files.
+
+    ``append`` writes a record to the end of the current segment of this
+    writer and indexes it; a new segment is started once the current one
+    reaches ``max_segment_bytes``. Appending an existing key replaces it
+    in the index (the old bytes stay in their segment). Writers with
+    different ``writer`` names, e.g. the shards of a batch, append to
+    their own segments and may share a corpus concurrently.
+
+    The index is committed every ``commit_every`` appends and on ``flush``
+    or ``close``; after a crash, records appended since the last commit
+    are simply absent. Safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        compression: Optional[str] = None,
+        writer: str = "segment",
+        max_segment_bytes: int = MAX_SEGMENT_BYTES,
+        commit_every: int = 100,
+    ):
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown compression {compression!r}; expected gzip or zstd"
+            )
+        if compression == "zstd":
+            _zstd()
+        self.path = Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.writer = writer
+        self.max_segment_bytes = max_segment_bytes
+        self.commit_every = commit_every
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(
+            str(self.path / INDEX_NAME), timeout=30, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+        self._segment: Optional[str] = None
+        self._file = None
+        self._pending: List[Tuple[Any, ...]] = []
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def append(
+        self,
+        key: str,
+        req_type: str,
+        item: Union[BaseModel, bytes],
+        position: Optional[int] = None
+    ) -> str:
+        """Append ``item`` (a model, or its compact JSON) under ``key``; returns its SHA-256.
+
+        ``position`` orders records, e.g. by their index in a batch file.
+        """
+        data = item if isinstance(item, bytes) else dumps(item, compact=True)
+        record = data.rstrip(b"\n") + b"\n"
+        sha256 = hashlib.sha256(record).hexdigest()
+        stored = _compress(record, self.compression)
+        with self._lock:
+            segment, f = self._writable(len(stored))
+            offset = f.tell()
+            f.write(stored)
+            self._pending.append(
+                (key, req_type, position, segment, offset, len(stored), sha256)
+            )
+            if len(self._pending) >= self.commit_every:
+                self._commit()
+        return sha256
+
+    def _writable(self, size: int):
+        """The segment to append ``size`` bytes to, rolling over to a new one when full."""
+        if self._file is not None and self._file.tell() + size > self.max_segment_bytes:
+            self._commit()
+            self._file.close()
+            self._file = None
+        if self._file is None:
+            self._segment = self._next_segment()
+            self._file = open(self.path / self._segment, "ab")
+        return self._segment, self._file
+
+    def _next_segment(self) -> str:
+        """This writer's last segment if it has room, else a new one."""
+        suffix = COMPRESSIONS[self.compression]
+        pattern = re.compile(rf"{re.escape(self.writer)}-(\d+){re.escape(suffix)}$")
+        numbers = [
+            int(match.group(1))
+            for match in map(pattern.match, os.listdir(self.path)) if match
+        ]
+        if numbers:
+            last = f"{self.writer}-{max(numbers):05d}{suffix}"
+            if (self.path / last).stat().st_size < self.max_segment_bytes:
+                return last
+        return f"{self.writer}-{max(numbers, default=0) + 1:05d}{suffix}"
+
+    def _commit(self) -> None:
+        if not self._pending:
+            return
+        # Records reach the disk before the index entries pointing at them
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO records "
+                "(key, type, position, segment, offset, length, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                self._pending
+            )
+        self._pending = []
+
+    def flush(self) -> None:
+        """Make every appended record durable and visible to other readers."""
+        with self._lock:
+            self._commit()
+
+    def _query(self, sql: str, params=()) -> List[Tuple[Any, ...]]:
+        with self._lock:
+            self._commit()
+            return self._db.execute(sql, params).fetchall()
+
+    def _where(self, req_type: Optional[str]) -> Tuple[str, Tuple[str, ...]]:
+        return ("WHERE type = ? ", (req_type,)) if req_type is not None else ("", ())
+
+    def __len__(self) -> int:
+        return self._query("SELECT COUNT(*) FROM records")[0][0]
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self._query("SELECT 1 FROM records WHERE key = ?", (key,)))
+
+    def keys(self, req_type: Optional[str] = None) -> List[str]:
+        """Keys in order, optionally only those of records of ``req_type``."""
+        where, params = self._where(req_type)
+        return [row[0] for row in self._query(f"SELECT key FROM records {where}{ORDER}", params)]
+
+    def entries(self, req_type: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Index entries (key, type, position, stored length and SHA-256) in order."""
+        where, params = self._where(req_type)
+        rows = self._query(
+            f"SELECT key, type, position, length, sha256 FROM records {where}{ORDER}", params
+        )
+        return [
+            {"key": key, "type": t, "position": position, "length": length, "sha256": sha256}
+            for key, t, position, length, sha256 in rows
+        ]
+
+    def checksums(self) -> Dict[str, str]:
+        """SHA-256 of every record's JSON by key, read in one query."""
+        return dict(self._query("SELECT key, sha256 FROM records"))
+
+    def _locate(self, key: str) -> Tuple[Any, ...]:
+        rows = self._query(
+            "SELECT type, segment, offset, length FROM records WHERE key = ?", (key,)
+        )
+        if not rows:
+            raise MissingRecordError(f"No record {key!r} in corpus {self.path}")
+        return rows[0]
+
+    def raw(self, key: str) -> bytes:
+        """The JSON line stored under ``key``; raises ``MissingRecordError`` if absent."""
+        req_type, *location = self._locate(key)
+        return self._read(location)
+
+    def get(self, key: str) -> BaseModel:
+        """The ``Scene``, ``Profile`` or ``Scenery`` stored under ``key``."""
+        req_type, *location = self._locate(key)
+        return self._model(req_type, self._read(location))
+
+    def load(self, req_type: Optional[str] = None) -> "CorpusView":
+        """Every record (or those of ``req_type``) as a lazily materialized sequence."""
+        where, params = self._where(req_type)
+        rows = self._query(
+            f"SELECT key, type, segment, offset, length FROM records {where}{ORDER}", params
+        )
+        return CorpusView(self, rows)
+
+    def _model(self, req_type: str, data: bytes) -> BaseModel:
+        return MODELS[req_type].model_validate_json(data)
+
+    def _read(self, location) -> bytes:
+        segment, offset, length = location
+        end = offset + length
+        with self._lock:
+            mapped = self._maps.get(segment)
+            if mapped is None or end > len(mapped):
+                if segment == self._segment:
+                    self._file.flush()
+                if mapped is not None:
+                    mapped.close()
+                with open(self.path / segment, "rb") as f:
+                    mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                self._maps[segment] = mapped
+            data = mapped[offset:end]
+        return _decompress(data, _compression(segment))
+
+    def segments(self) -> List[str]:
+        """Names of the segment files in the corpus."""
+        return sorted({row[0] for row in self._query("SELECT DISTINCT segment FROM records")})
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._commit()
+                self._file.close()
+                self._file = None
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._db.close()
+
+    def __enter__(self) -> "Corpus":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class CorpusView(Sequence):
+    """Records of a corpus as models, each parsed only when it is accessed.
+
+    Holds just the index entries; iterating reads the segments in order, so
+    a whole corpus streams through in constant memory. ``keys`` lists the
+    record keys in the same order.
+    """
+
+    def __init__(self, corpus: Corpus, rows: List[Tuple[Any, ...]]):
+        self.corpus = corpus
+        self._rows = rows
+
+    @property
+    def keys(self) -> List[str]:
+        return [row[0] for row in self._rows]
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CorpusView(self.corpus, self._rows[index])
+        _, req_type, *location = self._rows[index]
+        return self.corpus._model(req_type, self.corpus._read(location))
+
+    def __iter__(self) -> Iterator[BaseModel]:
+        for i in range(len(self._rows)):
+            yield self[i]
+
+    def raw(self) -> Iterator[bytes]:
+        """The records' JSON lines, without parsing them."""
+        for _, _, *location in self._rows:
+            yield self.corpus._read(location)
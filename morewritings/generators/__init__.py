@@ -1,37 +1,725 @@
 """
 AI-powered content generators for scenes, profiles, and scenery.
 """
+import asyncio
 import os
-from typing import Optional, Dict, Any
-from openai import OpenAI
-from ..models import Scene, Profile, Scenery, GenerationRequest
+import queue
+import threading
+import time
+from typing import Optional, Dict, Any, Awaitable, Callable, Iterator, List, Sequence, Type, Union
+from openai import AsyncOpenAI
+from pydantic import BaseModel
+from ..cache import ResponseCache, make_key
+from ..clients import ClientPool, get_pool
+from ..hedging import HedgePolicy
+from ..models import Scene, Profile, Scenery, GenerationRequest, default_model
+from ..ratelimit import RateLimiter, RateLimitRegistry
+from ..retry import RetryPolicy, generation_error
+from ..singleflight import SingleFlight
+from ..structured import (
+    output_model_of, pack_model, parse_output, rejects_response_format, response_format,
+    supports_json_schema
+)
+from ..telemetry import MetricsRecorder, RequestMetrics
+from ..tokens import (
+    ContextWindowError, OutputBudgets, check_context, count_message_tokens, count_tokens
+)
+
+
+PACK_PROMPT = (
+    "Write one item for each numbered request below. "
+    "Return them in the \"items\" array in the same order."
+)
+
+
+class GenerationStream:
+    """Content chunks of a streaming generation, plus the assembled result.
+    
+    Iterate to receive text chunks as they arrive; ``result`` holds the final
+    model once the stream is exhausted (reading it drains any remainder).
+    """
+    
+    def __init__(self, chunks: Iterator[str], build_result: Callable[[str], Any]):
+        self._chunks = chunks
+        self._build_result = build_result
+        self._parts = []
+        self._result = None
+        self.time_to_first_token: Optional[float] = None
+        self.elapsed: Optional[float] = None
+    
+    def __iter__(self) -> Iterator[str]:
+        started = time.perf_counter()
+        for chunk in self._chunks:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - started
+            self._parts.append(chunk)
+            yield chunk
+        self.elapsed = time.perf_counter() - started
+        self._result = self._build_result(self.content)
+    
+    @property
+    def content(self) -> str:
+        """Text received so far."""
+        return "".join(self._parts)
+    
+    @property
+    def preview(self):
+        """Model built from the request parameters alone, with empty content.
+        
+        Useful for rendering headers before any text has arrived.
+        """
+        return self._build_result("")
+    
+    @property
+    def result(self):
+        """The generated model, draining the stream first if needed."""
+        if self._result is None:
+            for _ in self:
+                pass
+        return self._result
 
 
 class AIGenerator:
-    """Base class for AI-powered content generation."""
+    """Base class for AI-powered content generation.
+
+    Subclasses implement ``_build_request`` (prompt assembly) and
+    ``_build_result`` (model construction); ``generate`` and ``agenerate``
+    wire those together around the sync and async API clients. Subclasses
+    with an ``output_model`` ask for replies as JSON matching it.
+    """
+    
+    output_model: Optional[Type[BaseModel]] = None
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize with OpenAI API key."""
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limits: Optional[RateLimitRegistry] = None,
+        retry: Optional[RetryPolicy] = None,
+        pool: Optional[ClientPool] = None,
+        telemetry: Optional[MetricsRecorder] = None,
+        budgets: Optional[OutputBudgets] = None,
+        coalesce: bool = True,
+        flights: Optional[SingleFlight] = None,
+        structured: Optional[bool] = None,
+        style_guide: Optional[str] = None,
+        hedge: Optional[HedgePolicy] = None
+    ):
+        """Initialize with OpenAI API key; every other argument is optional.
+        
+        ``cache`` stores responses by request. Generators passed the same
+        ``rate_limits`` registry share its per-model budgets, and transient
+        errors are retried per ``retry``. ``pool`` holds the HTTP connections
+        (the process-wide pool by default).
+        
+        ``telemetry`` records each request's timings and token usage.
+        ``budgets`` caps output tokens per content type.
+        
+        Identical requests in flight share one completion unless
+        ``coalesce=False``. Pass ``flights`` to share that across generators.
+        
+        ``structured`` picks JSON replies following ``output_model``: ``None``
+        for models known to support JSON schemas, ``True`` for all, ``False``
+        for none.
+        
+        ``style_guide`` is appended to every system prompt. ``hedge`` sends a
+        duplicate of slow requests and keeps the first reply.
+        """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key required. Set OPENAI_API_KEY environment variable.")
-        self.client = OpenAI(api_key=self.api_key)
+        self.pool = pool or get_pool()
+        # Retries are handled by self.retry, not the SDK
+        self.client = self.pool.client(self.api_key, max_retries=0)
+        self._async_client = None
+        self._async_transport = None
+        self.cache = cache
+        self.rate_limits = rate_limits
+        self.retry = retry or RetryPolicy()
+        self.telemetry = telemetry
+        self.budgets = budgets or OutputBudgets()
+        self.coalesce = coalesce
+        self.flights = flights or SingleFlight()
+        self.structured = structured
+        self.style_guide = style_guide
+        self.hedge = hedge
+        # Models that rejected a JSON schema response_format
+        self._plain_models = set()
     
-    def _generate(self, request: GenerationRequest) -> str:
-        """Generate content using OpenAI API."""
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async OpenAI client on the pool's transport for the running event loop.
+        
+        The pool keeps one transport per event loop, so the client is rebuilt
+        when the generator is used from a new loop (e.g. another ``asyncio.run``).
+        """
+        transport = self.pool.async_http_client
+        if self._async_transport is not transport:
+            self._async_client = self.pool.async_client(self.api_key, max_retries=0)
+            self._async_transport = transport
+        return self._async_client
+    
+    def generate(self, prompt: str, *args, stream: bool = False, distinct: bool = False, **kwargs):
+        """Generate content for the prompt (blocking).
+        
+        With ``stream=True`` a ``GenerationStream`` is returned instead. With
+        ``distinct=True`` the request bypasses the cache and in-flight
+        coalescing, for an independent sample at temperature > 0.
+        """
+        if stream:
+            return self.stream(prompt, *args, **kwargs)
+        request = self._prepare(self._build_request(prompt, *args, **kwargs))
+        metrics = self._start_metrics(request)
+        started = time.perf_counter()
+        try:
+            content = self._generate(request, metrics, distinct)
+        except Exception as e:
+            self._finish_metrics(metrics, started, error=e)
+            raise
+        result = self._build_result(content, *args, **kwargs)
+        self._finish_metrics(metrics, started, result)
+        return result
+    
+    def stream(self, prompt: str, *args, **kwargs) -> GenerationStream:
+        """Generate content for the prompt, yielding text chunks as they arrive.
+        
+        Streams ask for the full ``max_tokens``: text already shown cannot be
+        regenerated if a learned budget turns out too small. They are always
+        plain text, to be readable as it arrives.
+        """
+        request = self._prepare(
+            self._build_request(prompt, *args, **kwargs), adaptive=False, structured=False
+        )
+        return GenerationStream(
+            self._generate_stream(request),
+            lambda content: self._build_result(content, *args, **kwargs)
+        )
+    
+    async def agenerate(self, prompt: str, *args, distinct: bool = False, **kwargs):
+        """Generate content for the prompt without blocking the event loop."""
+        request = self._prepare(self._build_request(prompt, *args, **kwargs))
+        metrics = self._start_metrics(request)
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=request.model,
-                messages=[
-                    {"role": "system", "content": self._get_system_prompt(request.type)},
-                    {"role": "user", "content": request.prompt}
-                ],
-                temperature=request.temperature,
-                max_tokens=request.max_tokens
+            content = await self._agenerate(request, metrics, distinct)
+        except Exception as e:
+            self._finish_metrics(metrics, started, error=e)
+            raise
+        result = self._build_result(content, *args, **kwargs)
+        self._finish_metrics(metrics, started, result)
+        return result
+    
+    @property
+    def can_pack(self) -> bool:
+        """Whether several requests can share one completion (needs JSON replies)."""
+        return self._wants_schema(default_model())
+    
+    def _wants_schema(self, model: str) -> bool:
+        """Whether to ask ``model`` for JSON following ``output_model``."""
+        if self.output_model is None or self.structured is False or model in self._plain_models:
+            return False
+        return self.structured or supports_json_schema(model)
+    
+    async def agenerate_packed(self, requests: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Generate several items in one completion returning an array of them.
+        
+        Each request is a dict of ``agenerate`` arguments (``prompt`` plus
+        parameters). The system prompt is sent once and the numbered user
+        prompts together, with room for each item's output budget. Results
+        come back in request order; items the reply does not cover (a wrong
+        count, invalid JSON, a model without JSON schemas, or a prompt too
+        long for the context window) are generated individually instead, and
+        an item that fails is returned as its exception.
+        """
+        if len(requests) < 2:
+            return await self._agenerate_each(requests)
+        singles = [self._build_request(**req) for req in requests]
+        if not self._wants_schema(singles[0].model):
+            return await self._agenerate_each(requests)
+        prompt = PACK_PROMPT + "".join(
+            f"\n\nRequest {number}:\n{single.prompt}"
+            for number, single in enumerate(singles, 1)
+        )
+        model = pack_model(self.output_model, len(singles))
+        request = singles[0].model_copy(update={
+            "prompt": prompt,
+            "items": len(singles),
+            "max_tokens": sum(
+                self.budgets.budget(single.type, single.max_tokens) for single in singles
             )
-            return response.choices[0].message.content
+        })
+        try:
+            request = self._prepare(request, adaptive=False, structured=False)
+        except ContextWindowError:
+            return await self._agenerate_each(requests)
+        request = request.model_copy(update={"response_format": response_format(model)})
+        
+        metrics = self._start_metrics(request)
+        started = time.perf_counter()
+        try:
+            content = await self._agenerate(request, metrics)
         except Exception as e:
-            raise RuntimeError(f"Failed to generate content: {str(e)}")
+            self._finish_metrics(metrics, started, error=e)
+            return [e] * len(requests)
+        self._finish_metrics(metrics, started)
+        pack = parse_output(model, content)
+        if pack is None:
+            return await self._agenerate_each(requests)
+        results = []
+        for req, item in zip(requests, pack.items):
+            params = {k: v for k, v in req.items() if k != "prompt"}
+            result = self._build_result(item.model_dump_json(), **params)
+            if metrics is not None and isinstance(getattr(result, "metadata", None), dict):
+                result.metadata["telemetry"] = metrics.model_dump()
+            results.append(result)
+        return results
+    
+    async def _agenerate_each(self, requests: Sequence[Dict[str, Any]]) -> List[Any]:
+        """Generate requests separately and concurrently, returning failures in place."""
+        return await asyncio.gather(
+            *(self.agenerate(**req) for req in requests), return_exceptions=True
+        )
+    
+    def _build_request(self, prompt: str, **kwargs) -> GenerationRequest:
+        """Assemble the generation request for the prompt and parameters."""
+        raise NotImplementedError
+    
+    def _build_result(self, content: str, **kwargs):
+        """Build the output model from generated content and parameters."""
+        raise NotImplementedError
+    
+    def _parse(self, content: str) -> Optional[BaseModel]:
+        """Structured reply as an ``output_model`` instance; None for plain text."""
+        if self.output_model is None:
+            return None
+        return parse_output(self.output_model, content)
+    
+    def _prepare(
+        self,
+        request: GenerationRequest,
+        adaptive: bool = True,
+        structured: bool = True
+    ) -> GenerationRequest:
+        """Check the prompt fits the context window and set the output budget and format."""
+        prompt_tokens = count_message_tokens(self._messages(request), request.model)
+        room = check_context(
+            prompt_tokens, request.model, min(self.budgets.minimum, request.max_tokens)
+        )
+        limit = request.max_tokens if room is None else min(request.max_tokens, room)
+        budget = self.budgets.budget(request.type, limit) if adaptive else None
+        update = {"max_tokens": limit, "token_budget": budget}
+        if structured and self._wants_schema(request.model):
+            update["response_format"] = response_format(self.output_model)
+        return request.model_copy(update=update)
+    
+    def _start_metrics(self, request: GenerationRequest) -> Optional[RequestMetrics]:
+        """Fresh metrics for a request, if telemetry is enabled."""
+        if self.telemetry is None:
+            return None
+        return RequestMetrics(type=request.type, model=request.model)
+    
+    def _finish_metrics(
+        self,
+        metrics: Optional[RequestMetrics],
+        started: float,
+        result: Any = None,
+        error: Optional[BaseException] = None
+    ) -> None:
+        """Record a finished request and attach its metrics to the result."""
+        if metrics is None:
+            return
+        metrics.wall_time = time.perf_counter() - started
+        if error is not None:
+            metrics.error = str(error)
+        self.telemetry.record(metrics)
+        if isinstance(getattr(result, "metadata", None), dict):
+            result.metadata["telemetry"] = metrics.model_dump()
+    
+    def _messages(self, request: GenerationRequest) -> list:
+        """Chat messages for a request."""
+        return [
+            {"role": "system", "content": self._system_prompt(request.type)},
+            {"role": "user", "content": request.prompt}
+        ]
+    
+    def _cache_key(self, request: GenerationRequest) -> str:
+        """Cache key covering everything sent to the API for a request."""
+        return make_key(
+            request.model,
+            request.temperature,
+            request.max_tokens,
+            self._system_prompt(request.type),
+            request.prompt,
+            request.response_format
+        )
+    
+    def _generate(
+        self,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics] = None,
+        distinct: bool = False
+    ) -> str:
+        """Generate content, serving repeats from the cache or an identical in-flight request."""
+        if distinct:
+            return self._call(request, metrics)
+        key = self._cache_key(request)
+        if self.cache is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                if metrics is not None:
+                    metrics.cached = True
+                return content
+        if not self.coalesce:
+            return self._fetch(key, request, metrics)
+        content, shared = self.flights.do(key, self._fetch, key, request, metrics)
+        if shared and metrics is not None:
+            metrics.coalesced = True
+        return content
+    
+    async def _agenerate(
+        self,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics] = None,
+        distinct: bool = False
+    ) -> str:
+        """Async counterpart of ``_generate``."""
+        if distinct:
+            return await self._acall(request, metrics)
+        key = self._cache_key(request)
+        if self.cache is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                if metrics is not None:
+                    metrics.cached = True
+                return content
+        if not self.coalesce:
+            return await self._afetch(key, request, metrics)
+        content, shared = await self.flights.ado(key, self._afetch, key, request, metrics)
+        if shared and metrics is not None:
+            metrics.coalesced = True
+        return content
+    
+    def _fetch(
+        self,
+        key: str,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics]
+    ) -> str:
+        """Call the API (with retries) and cache the completion."""
+        content = self._call(request, metrics)
+        if self.cache is not None:
+            self.cache.set(key, content)
+        return content
+    
+    async def _afetch(
+        self,
+        key: str,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics]
+    ) -> str:
+        """Async counterpart of ``_fetch``."""
+        content = await self._acall(request, metrics)
+        if self.cache is not None:
+            self.cache.set(key, content)
+        return content
+    
+    def _call(self, request: GenerationRequest, metrics: Optional[RequestMetrics]) -> str:
+        """Completion with retries, hedged if a hedge policy is set."""
+        if self.hedge is None:
+            return self.retry.call(self._complete, request, metrics)
+        return self._hedged(lambda: self.retry.call(self._complete, request, metrics), metrics)
+    
+    async def _acall(self, request: GenerationRequest, metrics: Optional[RequestMetrics]) -> str:
+        """Async counterpart of ``_call``."""
+        if self.hedge is None:
+            return await self.retry.acall(self._acomplete, request, metrics)
+        return await self._ahedged(
+            lambda: self.retry.acall(self._acomplete, request, metrics), metrics
+        )
+    
+    def _hedged(self, call: Callable[[], str], metrics: Optional[RequestMetrics]) -> str:
+        """Run ``call``, racing a duplicate in another thread once it outlasts the hedge delay."""
+        delay = self.hedge.delay()
+        started = time.perf_counter()
+        if delay is None:
+            content = call()
+            self.hedge.observe(time.perf_counter() - started)
+            return content
+        
+        outcomes = queue.Queue()
+        
+        def attempt():
+            try:
+                outcomes.put((True, call()))
+            except Exception as e:
+                outcomes.put((False, e))
+        
+        # Daemon threads, so an abandoned attempt never holds up interpreter exit
+        threading.Thread(target=attempt, daemon=True).start()
+        running = 1
+        hedged = False
+        try:
+            ok, value = outcomes.get(timeout=delay)
+        except queue.Empty:
+            if self.hedge.allow():
+                hedged = True
+                if metrics is not None:
+                    metrics.hedged = True
+                threading.Thread(target=attempt, daemon=True).start()
+                running += 1
+            ok, value = outcomes.get()
+        running -= 1
+        error = None
+        while not ok and running:
+            error = error or value
+            ok, value = outcomes.get()
+            running -= 1
+        if not ok:
+            raise error or value
+        self.hedge.observe(time.perf_counter() - started, hedged)
+        return value
+    
+    async def _ahedged(
+        self,
+        call: Callable[[], Awaitable[str]],
+        metrics: Optional[RequestMetrics]
+    ) -> str:
+        """Async counterpart of ``_hedged``; the losing request is cancelled."""
+        delay = self.hedge.delay()
+        started = time.perf_counter()
+        primary = asyncio.ensure_future(call())
+        tasks = {primary}
+        hedged = False
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and self.hedge.allow():
+                    hedged = True
+                    if metrics is not None:
+                        metrics.hedged = True
+                    tasks.add(asyncio.ensure_future(call()))
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.hedge.observe(time.perf_counter() - started, hedged)
+                        return task.result()
+                    error = error or task.exception()
+            raise error
+        finally:
+            primary.cancel()
+            for task in tasks:
+                task.cancel()
+    
+    def _generate_stream(self, request: GenerationRequest) -> Iterator[str]:
+        """Streaming counterpart of ``_generate``; cache hits arrive as one chunk."""
+        key = self._cache_key(request) if self.cache is not None else None
+        if key is not None:
+            content = self.cache.get(key)
+            if content is not None:
+                yield content
+                return
+        parts = []
+        for chunk in self._complete_stream(request):
+            parts.append(chunk)
+            yield chunk
+        if key is not None:
+            self.cache.set(key, "".join(parts))
+    
+    def _completion_args(self, request: GenerationRequest) -> Dict[str, Any]:
+        """Keyword arguments for a chat completion call."""
+        args = {
+            "model": request.model,
+            "messages": self._messages(request),
+            "temperature": request.temperature,
+            "max_tokens": request.token_budget or request.max_tokens
+        }
+        if request.response_format is not None:
+            args["response_format"] = request.response_format
+        return args
+    
+    def _rate_limiter(self, request: GenerationRequest) -> Optional[RateLimiter]:
+        """Limiter for the request's model, if rate limiting is enabled."""
+        if self.rate_limits is None:
+            return None
+        return self.rate_limits.for_model(request.model)
+    
+    def _estimate_tokens(self, request: GenerationRequest) -> int:
+        """Tokens to reserve for a request: the prompt plus the completion limit."""
+        prompt_tokens = count_message_tokens(self._messages(request), request.model)
+        return prompt_tokens + (request.token_budget or request.max_tokens)
+    
+    def _settle(
+        self,
+        headers,
+        response,
+        limiter: Optional[RateLimiter],
+        reserved: int,
+        metrics: Optional[RequestMetrics]
+    ) -> None:
+        """Feed a response's headers and usage back to the limiter and metrics."""
+        usage = getattr(response, "usage", None)
+        if limiter is not None:
+            limiter.update_from_headers(headers)
+            limiter.reconcile(reserved, usage.total_tokens if usage else None)
+        if metrics is not None:
+            metrics.record_usage(usage)
+    
+    def _truncated(self, request: GenerationRequest, response) -> bool:
+        """Whether a completion was cut off by a learned budget below ``max_tokens``."""
+        return (
+            request.token_budget is not None
+            and request.token_budget < request.max_tokens
+            and response.choices[0].finish_reason == "length"
+        )
+    
+    def _without_schema(self, request: GenerationRequest, error: Exception) -> GenerationRequest:
+        """Plain-text retry of a request whose JSON schema the model rejected."""
+        if request.response_format is None or not rejects_response_format(error):
+            raise error
+        self._plain_models.add(request.model)
+        return request.model_copy(update={"response_format": None})
+    
+    def _observe(self, request: GenerationRequest, response) -> None:
+        """Feed a complete completion's length (per item, if packed) back to the output budgets."""
+        usage = getattr(response, "usage", None)
+        completion_tokens = getattr(usage, "completion_tokens", None)
+        if isinstance(completion_tokens, int) and response.choices[0].finish_reason != "length":
+            self.budgets.observe(request.type, -(-completion_tokens // request.items))
+    
+    def _complete(
+        self,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics] = None
+    ) -> str:
+        """Generate content using OpenAI API (one attempt; errors propagate).
+        
+        A completion truncated by the learned output budget is requested
+        once more with the full ``max_tokens``, and one whose JSON schema
+        the model does not support is sent again as plain text.
+        """
+        try:
+            response = self._send(request, metrics)
+        except Exception as e:
+            request = self._without_schema(request, e)
+            response = self._send(request, metrics)
+        if self._truncated(request, response):
+            request = request.model_copy(update={"token_budget": None})
+            response = self._send(request, metrics)
+        self._observe(request, response)
+        return response.choices[0].message.content
+    
+    def _send(self, request: GenerationRequest, metrics: Optional[RequestMetrics] = None):
+        """Send one chat completion request and return the parsed response.
+        
+        With a rate limiter or metrics, the response is read through
+        ``with_streaming_response`` so headers (and time to first byte) are
+        available before the body is parsed.
+        """
+        limiter = self._rate_limiter(request)
+        if metrics is not None:
+            metrics.attempts += 1
+        if limiter is None and metrics is None:
+            return self.client.chat.completions.create(**self._completion_args(request))
+        reserved = 0
+        if limiter is not None:
+            waited = time.perf_counter()
+            reserved = limiter.acquire(self._estimate_tokens(request))
+            if metrics is not None:
+                metrics.rate_limit_wait += time.perf_counter() - waited
+        sent = time.perf_counter()
+        with self.client.chat.completions.with_streaming_response.create(
+            **self._completion_args(request)
+        ) as raw:
+            if metrics is not None:
+                metrics.time_to_first_byte = time.perf_counter() - sent
+            response = raw.parse()
+        self._settle(raw.headers, response, limiter, reserved, metrics)
+        return response
+    
+    def _complete_stream(self, request: GenerationRequest) -> Iterator[str]:
+        """Stream content chunks from the OpenAI API.
+        
+        Streams are not retried: text already shown cannot be taken back.
+        With a rate limiter, the reservation is settled against the usage
+        reported in the final chunk, or estimated from the text received if
+        the stream ends without one.
+        """
+        limiter = self._rate_limiter(request)
+        args = self._completion_args(request)
+        reserved = 0
+        parts = []
+        usage = None
+        try:
+            if limiter is not None:
+                reserved = limiter.acquire(self._estimate_tokens(request))
+                args["stream_options"] = {"include_usage": True}
+            response = self.client.chat.completions.create(stream=True, **args)
+            for chunk in response:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].delta.content:
+                    parts.append(chunk.choices[0].delta.content)
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            raise generation_error(e) from e
+        finally:
+            if reserved:
+                used = usage.total_tokens if usage is not None else (
+                    count_message_tokens(args["messages"], request.model)
+                    + count_tokens("".join(parts), request.model)
+                )
+                limiter.reconcile(reserved, used)
+    
+    async def _acomplete(
+        self,
+        request: GenerationRequest,
+        metrics: Optional[RequestMetrics] = None
+    ) -> str:
+        """Generate content using the async OpenAI API (one attempt)."""
+        try:
+            response = await self._asend(request, metrics)
+        except Exception as e:
+            request = self._without_schema(request, e)
+            response = await self._asend(request, metrics)
+        if self._truncated(request, response):
+            request = request.model_copy(update={"token_budget": None})
+            response = await self._asend(request, metrics)
+        self._observe(request, response)
+        return response.choices[0].message.content
+    
+    async def _asend(self, request: GenerationRequest, metrics: Optional[RequestMetrics] = None):
+        """Async counterpart of ``_send``."""
+        limiter = self._rate_limiter(request)
+        if metrics is not None:
+            metrics.attempts += 1
+        if limiter is None and metrics is None:
+            return await self.async_client.chat.completions.create(
+                **self._completion_args(request)
+            )
+        reserved = 0
+        if limiter is not None:
+            waited = time.perf_counter()
+            reserved = await limiter.aacquire(self._estimate_tokens(request))
+            if metrics is not None:
+                metrics.rate_limit_wait += time.perf_counter() - waited
+        sent = time.perf_counter()
+        async with self.async_client.chat.completions.with_streaming_response.create(
+            **self._completion_args(request)
+        ) as raw:
+            if metrics is not None:
+                metrics.time_to_first_byte = time.perf_counter() - sent
+            response = await raw.parse()
+        self._settle(raw.headers, response, limiter, reserved, metrics)
+        return response
+    
+    def _system_prompt(self, content_type: str) -> str:
+        """System prompt for a content type, including the style guide."""
+        prompt = self._get_system_prompt(content_type)
+        if self.style_guide:
+            prompt += f"\n\nStyle guide:\n{self.style_guide.strip()}"
+        return prompt
     
     def _get_system_prompt(self, content_type: str) -> str:
         """Get system prompt based on content type."""
@@ -43,122 +731,245 @@ class AIGenerator:
         return prompts.get(content_type, "You are a helpful creative writing assistant.")
 
 
+def _name(entity) -> str:
+    """Name of a stored entity, or the string itself."""
+    return entity if isinstance(entity, str) else entity.name
+
+
+def _names(entities) -> list:
+    return [_name(entity) for entity in entities]
+
+
+def _describe_profile(profile: Profile) -> str:
+    """One-paragraph prompt description of a stored character."""
+    text = f"{profile.name}: {profile.description}"
+    if profile.traits:
+        text += f" Traits: {', '.join(profile.traits)}."
+    if profile.background:
+        text += f" Background: {profile.background}"
+    if profile.relationships:
+        text += " Relationships: " + "; ".join(
+            f"{other} ({relation})" for other, relation in profile.relationships.items()
+        ) + "."
+    return text
+
+
+def _describe_scenery(scenery: Scenery) -> str:
+    """Prompt description of a stored setting."""
+    text = f"{scenery.name} ({scenery.location_type}): {scenery.description}"
+    details = [
+        f"{label}: {value}"
+        for label, value in (
+            ("Mood", scenery.mood), ("Time", scenery.time_of_day), ("Weather", scenery.weather)
+        )
+        if value
+    ]
+    if details:
+        text += "\n" + "; ".join(details)
+    return text
+
+
 class SceneGenerator(AIGenerator):
-    """Generate scenes with AI assistance."""
+    """Generate scenes with AI assistance.
+    
+    ``generate``/``agenerate`` accept ``characters``, ``scenery``, ``genre``,
+    ``mood`` plus ``title`` and ``tags``. Characters may be names or stored
+    ``Profile`` objects, and scenery a name or a ``Scenery``; full entities
+    are described in the prompt so the model need not invent them.
+    """
+    
+    output_model = output_model_of(Scene, ["title", "content", "tags"])
     
-    def generate(
+    def _build_request(
         self,
         prompt: str,
         characters: Optional[list] = None,
-        scenery: Optional[str] = None,
+        scenery: Optional[Union[str, Scenery]] = None,
         genre: Optional[str] = None,
         mood: Optional[str] = None,
         **kwargs
-    ) -> Scene:
-        """Generate a scene based on the prompt and parameters."""
-        # Build enhanced prompt
-        enhanced_prompt = prompt
-        if characters:
-            enhanced_prompt += f"\n\nCharacters involved: {', '.join(characters)}"
-        if scenery:
-            enhanced_prompt += f"\nSetting: {scenery}"
+    ) -> GenerationRequest:
+        """Build the scene request from the prompt and parameters."""
+        # Shared context first and the free-text prompt last, so requests with
+        # the same cast, setting or genre share a prefix the provider can cache
+        sections = []
+        profiles = [c for c in characters or [] if isinstance(c, Profile)]
+        if profiles:
+            sections.append("Character profiles:\n" + "\n".join(
+                f"- {_describe_profile(profile)}" for profile in profiles
+            ))
+        if isinstance(scenery, Scenery):
+            sections.append(f"Setting description:\n{_describe_scenery(scenery)}")
+        details = []
         if genre:
-            enhanced_prompt += f"\nGenre: {genre}"
+            details.append(f"Genre: {genre}")
         if mood:
-            enhanced_prompt += f"\nMood/Tone: {mood}"
+            details.append(f"Mood/Tone: {mood}")
+        if characters:
+            details.append(f"Characters involved: {', '.join(_names(characters))}")
+        if scenery:
+            details.append(f"Setting: {_name(scenery)}")
+        if details:
+            sections.append("\n".join(details))
+        sections.append(prompt)
+        enhanced_prompt = "\n\n".join(sections)
         
-        # Create request
-        request = GenerationRequest(
+        return GenerationRequest(
             type="scene",
             prompt=enhanced_prompt,
             parameters=kwargs
         )
+    
+    def _build_result(
+        self,
+        content: str,
+        characters: Optional[list] = None,
+        scenery: Optional[Union[str, Scenery]] = None,
+        genre: Optional[str] = None,
+        mood: Optional[str] = None,
+        **kwargs
+    ) -> Scene:
+        """Create the scene object from generated content.
         
-        # Generate content
-        content = self._generate(request)
-        
-        # Create scene object
+        Requested title and tags take precedence over those in a structured
+        reply; a plain-text reply is the scene content.
+        """
+        draft = self._parse(content)
         return Scene(
-            title=kwargs.get("title", "Generated Scene"),
-            characters=characters or [],
-            scenery=scenery,
-            content=content,
+            title=kwargs.get("title") or (draft.title if draft else "Generated Scene"),
+            characters=_names(characters or []),
+            scenery=_name(scenery) if scenery else scenery,
+            content=draft.content if draft else content,
             genre=genre,
             mood=mood,
-            tags=kwargs.get("tags", [])
+            tags=kwargs.get("tags") or (draft.tags if draft else [])
         )
 
 
 class ProfileGenerator(AIGenerator):
-    """Generate character profiles with AI assistance."""
+    """Generate character profiles with AI assistance.
     
-    def generate(
+    ``generate``/``agenerate`` accept ``name`` plus optional ``traits`` and
+    ``background``.
+    """
+    
+    output_model = output_model_of(
+        Profile, ["name", "description", "traits", "background", "relationships"]
+    )
+    
+    def _build_request(
         self,
         prompt: str,
         name: Optional[str] = None,
         **kwargs
-    ) -> Profile:
-        """Generate a character profile based on the prompt."""
+    ) -> GenerationRequest:
+        """Build the profile request from the prompt."""
         # Build enhanced prompt
         enhanced_prompt = f"Create a detailed character profile.\n\n{prompt}"
         if name:
             enhanced_prompt += f"\n\nCharacter name: {name}"
         
-        # Create request
-        request = GenerationRequest(
+        return GenerationRequest(
             type="profile",
             prompt=enhanced_prompt,
             parameters=kwargs
         )
+    
+    def _build_result(
+        self,
+        content: str,
+        name: Optional[str] = None,
+        **kwargs
+    ) -> Profile:
+        """Create the profile object from generated content.
         
-        # Generate content
-        content = self._generate(request)
-        
-        # Parse the generated content (simplified - in production, use structured output)
+        Requested fields take precedence over those in a structured reply;
+        a plain-text reply becomes the description.
+        """
+        draft = self._parse(content)
+        if draft is None:
+            return Profile(
+                name=name or "Unnamed Character",
+                description=content,
+                traits=kwargs.get("traits", []),
+                background=kwargs.get("background")
+            )
         return Profile(
-            name=name or "Unnamed Character",
-            description=content,
-            traits=kwargs.get("traits", []),
-            background=kwargs.get("background")
+            name=name or draft.name,
+            description=draft.description,
+            traits=kwargs.get("traits") or draft.traits,
+            background=kwargs.get("background") or draft.background,
+            relationships=draft.relationships
         )
 
 
 class SceneryGenerator(AIGenerator):
-    """Generate scenery/setting descriptions with AI assistance."""
+    """Generate scenery/setting descriptions with AI assistance.
+    
+    ``generate``/``agenerate`` accept ``name``, ``location_type``, ``mood``,
+    ``time_of_day`` and ``weather``.
+    """
     
-    def generate(
+    output_model = output_model_of(
+        Scenery,
+        ["name", "location_type", "description", "mood", "time_of_day", "weather", "details"]
+    )
+    
+    def _build_request(
         self,
         prompt: str,
         name: Optional[str] = None,
         location_type: Optional[str] = None,
         **kwargs
-    ) -> Scenery:
-        """Generate scenery based on the prompt."""
-        # Build enhanced prompt
-        enhanced_prompt = f"Describe a setting/location.\n\n{prompt}"
+    ) -> GenerationRequest:
+        """Build the scenery request from the prompt."""
+        # Instructions and shared attributes first, the free-text prompt last
+        enhanced_prompt = "Describe a setting/location.\n\n"
+        details = []
         if location_type:
-            enhanced_prompt += f"\n\nType: {location_type}"
+            details.append(f"Type: {location_type}")
         if kwargs.get("mood"):
-            enhanced_prompt += f"\nMood: {kwargs['mood']}"
+            details.append(f"Mood: {kwargs['mood']}")
         if kwargs.get("time_of_day"):
-            enhanced_prompt += f"\nTime: {kwargs['time_of_day']}"
+            details.append(f"Time: {kwargs['time_of_day']}")
+        if details:
+            enhanced_prompt += "\n".join(details) + "\n\n"
+        enhanced_prompt += prompt
         
-        # Create request
-        request = GenerationRequest(
+        return GenerationRequest(
             type="scenery",
             prompt=enhanced_prompt,
             parameters=kwargs
         )
+    
+    def _build_result(
+        self,
+        content: str,
+        name: Optional[str] = None,
+        location_type: Optional[str] = None,
+        **kwargs
+    ) -> Scenery:
+        """Create the scenery object from generated content.
         
-        # Generate content
-        content = self._generate(request)
-        
-        # Create scenery object
+        Requested fields take precedence over those in a structured reply;
+        a plain-text reply becomes the description.
+        """
+        draft = self._parse(content)
+        if draft is None:
+            return Scenery(
+                name=name or "Unnamed Location",
+                location_type=location_type or "general",
+                description=content,
+                mood=kwargs.get("mood"),
+                time_of_day=kwargs.get("time_of_day"),
+                weather=kwargs.get("weather")
+            )
         return Scenery(
-            name=name or "Unnamed Location",
-            location_type=location_type or "general",
-            description=content,
-            mood=kwargs.get("mood"),
-            time_of_day=kwargs.get("time_of_day"),
-            weather=kwargs.get("weather")
+            name=name or draft.name,
+            location_type=location_type or draft.location_type,
+            description=draft.description,
+            mood=kwargs.get("mood") or draft.mood,
+            time_of_day=kwargs.get("time_of_day") or draft.time_of_day,
+            weather=kwargs.get("weather") or draft.weather,
+            details=draft.details
         )
@@ -0,0 +1,96 @@
+"""
+Hedged requests: a duplicate request once the first one runs unusually long.
+
+Tail latency is mostly occasional slow responses. ``HedgePolicy`` learns
+the latency distribution of recent requests and, once a request has taken
+longer than a chosen percentile of it, allows one duplicate; whichever
+finishes first wins and the other is cancelled. A cap on the share of
+requests that are hedged bounds the extra cost.
+"""
+import json
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Deque, Optional, Tuple, Union
+
+from ..telemetry import percentile
+
+
+class HedgePolicy:
+    """When to send a hedge request, from a window of recent requests.
+
+    The trigger delay is the ``percentile`` of the last ``window`` request
+    latencies, once ``min_samples`` have been seen (no hedging before).
+    A hedge is allowed only while at most ``max_rate`` of the requests in
+    the window were hedged. Thread-safe; ``save``/``load`` keep the window
+    across processes, e.g. between interactive CLI runs.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        max_rate: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+    ):
+        if not 0 < percentile < 100:
+            raise ValueError("percentile must be between 0 and 100")
+        if not 0 <= max_rate <= 1:
+            raise ValueError("max_rate must be between 0 and 1")
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        # (latency seconds, hedged) per finished request
+        self._requests: Deque[Tuple[float, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def delay(self) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little history."""
+        with self._lock:
+            if len(self._requests) < self.min_samples:
+                return None
+            return percentile([latency for latency, _ in self._requests], self.percentile)
+
+    def allow(self) -> bool:
+        """Whether one more hedge stays within ``max_rate`` of recent requests."""
+        with self._lock:
+            hedged = sum(1 for _, was_hedged in self._requests if was_hedged)
+            return hedged + 1 <= self.max_rate * (len(self._requests) + 1)
+
+    def observe(self, latency: float, hedged: bool = False) -> None:
+        """Record a finished request.
+
+        When a hedge won, ``latency`` is how long the caller waited: a lower
+        bound on the latency of the abandoned first request.
+        """
+        with self._lock:
+            self._requests.append((latency, hedged))
+
+    @property
+    def hedge_rate(self) -> float:
+        """Share of recent requests that were hedged."""
+        with self._lock:
+            if not self._requests:
+                return 0.0
+            return sum(1 for _, hedged in self._requests if hedged) / len(self._requests)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the request window to ``path`` (JSON)."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = json.dumps({"requests": list(self._requests)})
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(data)
+        tmp.replace(path)
+
+    def load(self, path: Union[str, Path]) -> "HedgePolicy":
+        """Restore the request window saved by ``save``; a missing or bad file is ignored."""
+        try:
+            requests = json.loads(Path(path).read_text())["requests"]
+            entries = [(float(latency), bool(hedged)) for latency, hedged in requests]
+        except (OSError, ValueError, KeyError, TypeError):
+            return self
+        with self._lock:
+            self._requests.extend(entries)
+        return self
@@ -0,0 +1,209 @@
+"""
+SQLite-backed library of profiles and scenery, indexed for lookup.
+"""
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Union
+
+from ..models import Profile, Scenery
+
+
+DEFAULT_LIBRARY = Path.home() / ".local" / "share" / "morewritings" / "library.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiles (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS profile_traits (
+    profile_id INTEGER NOT NULL REFERENCES profiles(id) ON DELETE CASCADE,
+    trait TEXT NOT NULL COLLATE NOCASE
+);
+CREATE INDEX IF NOT EXISTS profile_traits_trait ON profile_traits (trait, profile_id);
+CREATE INDEX IF NOT EXISTS profile_traits_profile ON profile_traits (profile_id);
+CREATE TABLE IF NOT EXISTS scenery (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE,
+    location_type TEXT NOT NULL COLLATE NOCASE,
+    mood TEXT COLLATE NOCASE,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenery_location_type ON scenery (location_type);
+CREATE INDEX IF NOT EXISTS scenery_mood ON scenery (mood);
+"""
+
+
+class MissingEntityError(LookupError):
+    """A profile or scenery name that is not in the library."""
+
+
+def default_library_path() -> Path:
+    """Library file from MOREWRITINGS_LIBRARY, or ~/.local/share/morewritings/library.db."""
+    return Path(os.getenv("MOREWRITINGS_LIBRARY", DEFAULT_LIBRARY))
+
+
+class Library:
+    """Stored ``Profile`` and ``Scenery`` objects, looked up by name or attribute.
+
+    Names are unique per kind and matched case-insensitively; saving an
+    entity with an existing name replaces it. Profiles are indexed by
+    trait and scenery by location type and mood. Safe to share between
+    threads.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path is not None else default_library_path()
+        if str(self.path) != ":memory:":
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA foreign_keys = ON")
+        self._db.execute("PRAGMA journal_mode = WAL")
+        self._db.executescript(SCHEMA)
+
+    def add(self, entity: Union[Profile, Scenery]) -> None:
+        """Save a profile or scenery, replacing any with the same name."""
+        with self._lock, self._db:
+            self._add(entity)
+
+    def add_all(self, entities: Iterable[Union[Profile, Scenery]]) -> int:
+        """Save many entities in one transaction; returns how many were saved."""
+        count = 0
+        with self._lock, self._db:
+            for entity in entities:
+                self._add(entity)
+                count += 1
+        return count
+
+    def _add(self, entity: Union[Profile, Scenery]) -> None:
+        if isinstance(entity, Profile):
+            self._add_profile(entity)
+        elif isinstance(entity, Scenery):
+            self._add_scenery(entity)
+        else:
+            raise TypeError(f"Cannot store {type(entity).__name__} in the library")
+
+    def _add_profile(self, profile: Profile) -> None:
+        self._db.execute(
+            "INSERT INTO profiles (name, data) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET name = excluded.name, data = excluded.data",
+            (profile.name, profile.model_dump_json())
+        )
+        # Looked up rather than RETURNING, which needs SQLite 3.35
+        (profile_id,) = self._db.execute(
+            "SELECT id FROM profiles WHERE name = ?", (profile.name,)
+        ).fetchone()
+        self._db.execute("DELETE FROM profile_traits WHERE profile_id = ?", (profile_id,))
+        self._db.executemany(
+            "INSERT INTO profile_traits (profile_id, trait) VALUES (?, ?)",
+            [(profile_id, trait) for trait in dict.fromkeys(profile.traits)]
+        )
+
+    def _add_scenery(self, scenery: Scenery) -> None:
+        self._db.execute(
+            "INSERT INTO scenery (name, location_type, mood, data) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET name = excluded.name, "
+            "location_type = excluded.location_type, mood = excluded.mood, data = excluded.data",
+            (scenery.name, scenery.location_type, scenery.mood, scenery.model_dump_json())
+        )
+
+    def _query(self, sql: str, params=()) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._db.execute(sql, params)]
+
+    def profile(self, name: str) -> Optional[Profile]:
+        """The profile called ``name``, or None."""
+        rows = self._query("SELECT data FROM profiles WHERE name = ?", (name,))
+        return Profile.model_validate_json(rows[0]) if rows else None
+
+    def scenery(self, name: str) -> Optional[Scenery]:
+        """The scenery called ``name``, or None."""
+        rows = self._query("SELECT data FROM scenery WHERE name = ?", (name,))
+        return Scenery.model_validate_json(rows[0]) if rows else None
+
+    def profiles(self, names: Iterable[str]) -> List[Profile]:
+        """Profiles for ``names`` in order; raises ``MissingEntityError`` naming any missing."""
+        names = list(names)
+        if not names:
+            return []
+        found: Dict[str, Profile] = {}
+        for data in self._query(
+            f"SELECT data FROM profiles WHERE name IN ({', '.join('?' * len(names))})", names
+        ):
+            profile = Profile.model_validate_json(data)
+            found[profile.name.casefold()] = profile
+        missing = [name for name in names if name.casefold() not in found]
+        if missing:
+            raise MissingEntityError(
+                f"No profile named {', '.join(map(repr, missing))} in the library"
+            )
+        return [found[name.casefold()] for name in names]
+
+    def find_profiles(self, trait: Optional[str] = None) -> Iterator[Profile]:
+        """Profiles by name, optionally only those with ``trait``."""
+        if trait is None:
+            rows = self._query("SELECT data FROM profiles ORDER BY name")
+        else:
+            rows = self._query(
+                "SELECT p.data FROM profile_traits t JOIN profiles p ON p.id = t.profile_id "
+                "WHERE t.trait = ? ORDER BY p.name",
+                (trait,)
+            )
+        return (Profile.model_validate_json(data) for data in rows)
+
+    def find_scenery(
+        self,
+        location_type: Optional[str] = None,
+        mood: Optional[str] = None
+    ) -> Iterator[Scenery]:
+        """Scenery by name, optionally filtered by location type and/or mood."""
+        clauses, params = [], []
+        for column, value in (("location_type", location_type), ("mood", mood)):
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        rows = self._query(f"SELECT data FROM scenery {where}ORDER BY name", params)
+        return (Scenery.model_validate_json(data) for data in rows)
+
+    def remove(self, name: str) -> bool:
+        """Delete the profile and/or scenery called ``name``; True if anything was removed."""
+        with self._lock, self._db:
+            removed = self._db.execute("DELETE FROM profiles WHERE name = ?", (name,)).rowcount
+            removed += self._db.execute("DELETE FROM scenery WHERE name = ?", (name,)).rowcount
+        return removed > 0
+
+    def counts(self) -> Dict[str, int]:
+        """Number of stored profiles and scenery."""
+        with self._lock:
+            return {
+                table: self._db.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("profiles", "scenery")
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "Library":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def load_entity(path: Union[str, Path]) -> Optional[Union[Profile, Scenery]]:
+    """Profile or Scenery from a generated JSON file; None for other files (e.g. scenes)."""
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or "content" in data:
+        return None
+    if "location_type" in data:
+        return Scenery.model_validate(data)
+    if "name" in data and "description" in data:
+        return Profile.model_validate(data)
+    return None
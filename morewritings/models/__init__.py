@@ -1,17 +1,19 @@
 """
 Data models for profiles, scenes, and scenery.
 """
+import os
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 from datetime import datetime
 
 
+def default_model() -> str:
+    """Chat model from MOREWRITINGS_MODEL, or gpt-4."""
+    return os.getenv("MOREWRITINGS_MODEL", "gpt-4")
+
+
 class Profile(BaseModel):
     """Character or entity profile."""
-    model_config = ConfigDict(
-        json_encoders={datetime: lambda v: v.isoformat()}
-    )
-    
     name: str
     description: str
     traits: List[str] = Field(default_factory=list)
@@ -22,10 +24,6 @@ class Profile(BaseModel):
 
 class Scenery(BaseModel):
     """Setting or environment description."""
-    model_config = ConfigDict(
-        json_encoders={datetime: lambda v: v.isoformat()}
-    )
-    
     name: str
     location_type: str  # e.g., "indoor", "outdoor", "fantasy", "sci-fi"
     description: str
@@ -38,10 +36,6 @@ class Scenery(BaseModel):
 
 class Scene(BaseModel):
     """A complete scene with characters, setting, and narrative."""
-    model_config = ConfigDict(
-        json_encoders={datetime: lambda v: v.isoformat()}
-    )
-    
     title: str
     characters: List[str] = Field(default_factory=list)
     scenery: Optional[str] = None
@@ -58,6 +52,12 @@ class GenerationRequest(BaseModel):
     type: str  # "scene", "profile", "scenery"
     prompt: str
     parameters: Dict[str, Any] = Field(default_factory=dict)
-    model: str = "gpt-4"
+    model: str = Field(default_factory=default_model)
     temperature: float = 0.7
     max_tokens: int = 2000
+    # Adaptive completion limit actually sent (at most max_tokens); None sends max_tokens
+    token_budget: Optional[int] = None
+    # JSON schema the reply must follow; None asks for plain text
+    response_format: Optional[Dict[str, Any]] = None
+    # Number of items generated together in one reply (see batch packing)
+    items: int = 1
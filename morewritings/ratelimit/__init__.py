@@ -0,0 +1,250 @@
+"""
+Client-side request and token rate limiting.
+"""
+import asyncio
+import re
+import threading
+import time
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for English text (about four characters per token)."""
+    return max(1, (len(text) + 3) // 4)
+
+
+def parse_reset(value: str) -> Optional[float]:
+    """Parse a rate-limit reset header such as ``"1s"``, ``"6m0s"`` or ``"20ms"``."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if not parts:
+        return None
+    return sum(float(amount) * units[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``per_minute`` units per minute.
+
+    Reservations are taken immediately and may drive the bucket negative; the
+    caller then waits until the debt is repaid. That keeps callers roughly
+    first-come first-served without holding a lock while sleeping.
+    """
+
+    def __init__(self, per_minute: float, capacity: Optional[float] = None):
+        """Bucket starting full, holding at most ``capacity`` (default one minute's worth)."""
+        self.per_minute = float(per_minute)
+        self.capacity = float(capacity if capacity is not None else per_minute)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in units per second."""
+        return self.per_minute / 60.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Take ``amount`` units and return how long to wait before using them."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def refund(self, amount: float) -> None:
+        """Return units (negative ``amount`` takes more) after reconciling usage."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+    def set_rate(self, per_minute: float) -> None:
+        """Change the refill rate and capacity, e.g. to match provider limits."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.per_minute = float(per_minute)
+            self.capacity = float(per_minute)
+            self.tokens = min(self.tokens, self.capacity)
+
+    def cap(self, remaining: float, reset: Optional[float] = None) -> None:
+        """Clamp to what the provider reports is left in its current window.
+
+        When nothing is left, ``reset`` (seconds until the provider's window
+        refills) pushes the bucket into debt so the next caller waits it out.
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            available = remaining
+            if remaining <= 0 and reset:
+                available = -reset * self.rate
+            self.tokens = min(self.tokens, available)
+
+
+class RateLimiter:
+    """Budget requests per minute and tokens per minute for one model.
+
+    Callers reserve one request and an estimated token count before each call,
+    then ``reconcile`` against actual usage once the response arrives.
+    ``update_from_headers`` adapts both buckets to the provider's reported
+    limits and remaining budget, never above the configured rates: those
+    are ceilings the provider's limits can only lower.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        parts: int = 1,
+    ):
+        """Create a limiter; ``None`` leaves that dimension unlimited.
+
+        ``parts`` is the number of processes sharing the provider account;
+        each takes that share of the limits and budget the provider reports.
+        """
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.parts = parts
+        self.ceilings = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+
+    def _reserve(self, tokens: int) -> float:
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def acquire(self, tokens: int) -> int:
+        """Block until a request estimated at ``tokens`` may be sent; returns the reservation."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return tokens
+
+    async def aacquire(self, tokens: int) -> int:
+        """Async counterpart of ``acquire``."""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return tokens
+
+    def reconcile(self, reserved: int, used: Optional[int]) -> None:
+        """Give back (or take) the difference between reserved and actual tokens."""
+        if self.tokens is not None and used is not None:
+            self.tokens.refund(reserved - used)
+
+    def update_from_headers(self, headers: Mapping[str, str]) -> None:
+        """Adapt to ``x-ratelimit-*`` response headers."""
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if limit is None and remaining is None:
+                continue
+            try:
+                limit = float(limit) / self.parts if limit is not None else None
+                remaining = float(remaining) / self.parts if remaining is not None else None
+            except ValueError:
+                continue
+            if limit is not None and self.ceilings[kind]:
+                limit = min(limit, self.ceilings[kind])
+            if bucket is None:
+                if limit is None:
+                    continue
+                bucket = TokenBucket(limit)
+                setattr(self, kind, bucket)
+            elif limit is not None and limit != bucket.per_minute:
+                bucket.set_rate(limit)
+            if remaining is not None:
+                bucket.cap(remaining, parse_reset(headers.get(f"x-ratelimit-reset-{kind}", "")))
+
+
+class RateLimitRegistry:
+    """Shared per-model rate limiters.
+
+    ``limits`` maps model names to ``(requests_per_minute, tokens_per_minute)``;
+    models without an entry use ``default``. Limiters are created on first use
+    and shared by every generator holding the registry. ``parts`` is the
+    number of processes sharing the provider account (see ``share``).
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Mapping[str, Tuple[Optional[float], Optional[float]]]] = None,
+        default: Tuple[Optional[float], Optional[float]] = (None, None),
+        parts: int = 1,
+    ):
+        self.limits: Dict[str, Tuple[Optional[float], Optional[float]]] = dict(limits or {})
+        self.default = default
+        self.parts = parts
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(
+        self,
+        model: str,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """Set the limits for ``model``, replacing any existing limiter."""
+        with self._lock:
+            self.limits[model] = (requests_per_minute, tokens_per_minute)
+            self._limiters.pop(model, None)
+
+    def for_model(self, model: str) -> RateLimiter:
+        """The limiter shared by all requests to ``model``."""
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                rpm, tpm = self.limits.get(model, self.default)
+                limiter = self._limiters[model] = RateLimiter(rpm, tpm, self.parts)
+            return limiter
+
+    def share(self, parts: int) -> "RateLimitRegistry":
+        """New registry granting each of ``parts`` processes an equal share of every limit.
+
+        The share also applies to the limits and budget providers report in
+        response headers.
+        """
+        def split(limits):
+            return tuple(None if limit is None else limit / parts for limit in limits)
+        return RateLimitRegistry(
+            {model: split(limits) for model, limits in self.limits.items()},
+            split(self.default),
+            self.parts * parts
+        )
+
+    def __reduce__(self):
+        # Limiters hold locks and live bucket state; a copy in another process starts afresh
+        return (RateLimitRegistry, (self.limits, self.default, self.parts))
+
+    @classmethod
+    def from_specs(cls, specs: Iterable[str]) -> "RateLimitRegistry":
+        """Build from ``"RPM:TPM"`` (default) and ``"MODEL=RPM:TPM"`` strings.
+
+        Either number may be left empty for no limit, e.g. ``"gpt-4=:40000"``.
+        """
+        registry = cls()
+        for spec in specs:
+            model, _, limits = spec.rpartition("=")
+            rpm, sep, tpm = limits.partition(":")
+            try:
+                parsed = (float(rpm) if rpm else None, float(tpm) if tpm else None)
+            except ValueError:
+                raise ValueError(f"Invalid rate limit {spec!r}; expected [MODEL=]RPM:TPM")
+            if not sep and not rpm:
+                raise ValueError(f"Invalid rate limit {spec!r}; expected [MODEL=]RPM:TPM")
+            if model:
+                registry.limits[model] = parsed
+            else:
+                registry.default = parsed
+        return registry
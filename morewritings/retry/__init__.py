@@ -0,0 +1,130 @@
+"""
+Retry policy for API calls: error classification, backoff and jitter.
+"""
+import asyncio
+import email.utils
+import random
+import time
+from typing import Any, Awaitable, Callable, Optional
+
+from openai import APIConnectionError, APIStatusError
+
+
+# HTTP statuses worth retrying: timeout, conflict/lock, rate limit, server errors
+RETRYABLE_STATUSES = {408, 409, 429}
+
+
+class GenerationError(RuntimeError):
+    """Content generation failed.
+
+    ``retryable`` tells batch runners whether rerunning the item later might
+    succeed (e.g. after a rate limit or outage) or not (bad key, invalid request).
+    """
+
+    def __init__(self, message: str, retryable: bool = False, attempts: int = 1):
+        super().__init__(message)
+        self.retryable = retryable
+        self.attempts = attempts
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether ``exc`` is transient: timeouts, connection resets, 429 or 5xx."""
+    if isinstance(exc, APIStatusError):
+        if getattr(exc, "code", None) == "insufficient_quota":
+            # A 429 that will not clear by waiting
+            return False
+        return exc.status_code in RETRYABLE_STATUSES or exc.status_code >= 500
+    if isinstance(exc, (APIConnectionError, ConnectionError, TimeoutError)):
+        return True
+    return False
+
+
+def generation_error(exc: BaseException, attempts: int = 1) -> GenerationError:
+    """Wrap an API failure in a classified ``GenerationError``."""
+    if isinstance(exc, GenerationError):
+        return exc
+    return GenerationError(
+        f"Failed to generate content: {str(exc)}",
+        retryable=is_retryable(exc),
+        attempts=attempts,
+    )
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from ``Retry-After`` style headers."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, parsed.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Capped exponential backoff with full jitter.
+
+    Retryable errors are retried up to ``max_retries`` times. Attempt ``n``
+    waits a random time in ``[0, min(max_delay, base_delay * 2**n)]`` unless
+    the server sent ``Retry-After``, which is honored up to ``max_retry_after``.
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 4,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        max_retry_after: float = 60.0,
+    ):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        """Seconds to wait before retry number ``attempt`` (starting at 0)."""
+        requested = retry_after(exc)
+        if requested is not None:
+            return min(requested, self.max_retry_after)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Call ``fn``, retrying transient failures; raises ``GenerationError``."""
+        attempt = 0
+        while True:
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise generation_error(e, attempt + 1) from e
+                time.sleep(self.delay(attempt, e))
+                attempt += 1
+
+    async def acall(self, fn: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """Async counterpart of ``call``."""
+        attempt = 0
+        while True:
+            try:
+                return await fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise generation_error(e, attempt + 1) from e
+                await asyncio.sleep(self.delay(attempt, e))
+                attempt += 1
@@ -0,0 +1,114 @@
+"""
+JSON serialization of the data models.
+
+Models are serialized straight to JSON bytes by pydantic's compiled
+serializer (``model_dump_json``, and a ``TypeAdapter`` for lists), without
+building intermediate dicts; datetimes are written as ISO 8601. With
+``backend="orjson"`` (``pip install morewritings[json]``, or
+``MOREWRITINGS_JSON_BACKEND=orjson``), ``model_dump`` output is encoded by
+orjson instead. Both produce the same JSON; see
+``benchmarks/bench_serialization.py`` for their cost.
+
+Output is indented by 2 spaces unless ``compact`` is set.
+"""
+import json
+import os
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Iterable, List, Optional, Sequence, Union
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticSerializationError
+
+
+BACKENDS = ("pydantic", "orjson")
+
+
+def default_backend() -> str:
+    """Backend named by MOREWRITINGS_JSON_BACKEND, or "pydantic"."""
+    return os.getenv("MOREWRITINGS_JSON_BACKEND", "pydantic")
+
+
+@lru_cache(maxsize=None)
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        raise RuntimeError(
+            'The orjson backend needs orjson (pip install "morewritings[json]")'
+        ) from None
+    return orjson
+
+
+@lru_cache(maxsize=None)
+def _list_adapter(model: type) -> TypeAdapter:
+    """Adapter serializing lists of ``model`` (``Any`` for mixed lists), built once."""
+    return TypeAdapter(List[model])
+
+
+def _backend(backend: Optional[str]) -> str:
+    backend = backend or default_backend()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def _fallback(data: Any, compact: bool) -> bytes:
+    # Values pydantic cannot serialize (e.g. custom objects in Scene.metadata) become strings
+    return json.dumps(
+        data, indent=None if compact else 2, default=str, ensure_ascii=False
+    ).encode("utf-8")
+
+
+def dumps(model: BaseModel, compact: bool = False, backend: Optional[str] = None) -> bytes:
+    """``model`` as UTF-8 JSON."""
+    if _backend(backend) == "orjson":
+        orjson = _orjson()
+        data = model.model_dump()
+        try:
+            return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+        except TypeError:
+            return _fallback(data, compact)
+    try:
+        # model_dump_json, minus decoding the bytes to str
+        return model.__pydantic_serializer__.to_json(model, indent=None if compact else 2)
+    except PydanticSerializationError:
+        return _fallback(model.model_dump(), compact)
+
+
+def dumps_many(
+    models: Sequence[BaseModel],
+    compact: bool = False,
+    backend: Optional[str] = None
+) -> bytes:
+    """``models`` as one UTF-8 JSON array, serialized in a single call."""
+    if _backend(backend) == "orjson":
+        orjson = _orjson()
+        data = [model.model_dump() for model in models]
+        try:
+            return orjson.dumps(data, option=0 if compact else orjson.OPT_INDENT_2)
+        except TypeError:
+            return _fallback(data, compact)
+    types = {type(model) for model in models}
+    adapter = _list_adapter(types.pop() if len(types) == 1 else Any)
+    try:
+        return adapter.dump_json(list(models), indent=None if compact else 2)
+    except PydanticSerializationError:
+        return _fallback([model.model_dump() for model in models], compact)
+
+
+def dumps_lines(models: Iterable[BaseModel], backend: Optional[str] = None) -> bytes:
+    """``models`` as JSON Lines: one compact object per line."""
+    return b"".join(dumps(model, compact=True, backend=backend) + b"\n" for model in models)
+
+
+def write_json(
+    path: Union[str, Path],
+    model: BaseModel,
+    compact: bool = False,
+    backend: Optional[str] = None
+) -> None:
+    """Write ``model`` to ``path`` as JSON, creating parent directories."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(dumps(model, compact, backend))
@@ -0,0 +1,241 @@
+"""
+Long-running generation server with a local HTTP API.
+
+``GenerationServer`` keeps generators, their connection pool and caches warm
+between requests, so callers avoid the interpreter startup, imports and
+client setup of a CLI run per item. It listens on TCP or a Unix socket::
+
+    POST /generate/scene      {"prompt": "A duel at dawn", "genre": "fantasy"}
+    POST /generate/profile    {"prompt": "A wise old wizard", "name": "Merlin"}
+    POST /generate/scenery    {"prompt": "A floating city", "mood": "serene"}
+    GET  /health              status, in-flight and queued requests
+    GET  /metrics             Prometheus text exposition
+
+A request body holds the same fields as a batch item (without ``type``);
+the reply is the generated item as JSON.
+"""
+import asyncio
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from ..clients import ClientPool
+from ..generators import AIGenerator
+from ..retry import GenerationError
+from ..serialization import dumps
+from ..telemetry import MetricsRecorder
+from ..tokens import ContextWindowError
+
+
+class ServerBusy(RuntimeError):
+    """Every generation slot is taken and the wait queue is full."""
+
+
+class _UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class GenerationServer:
+    """Serve generation requests from warm generators over HTTP.
+
+    Generation runs on one event loop in a background thread, so all
+    requests share the generators' async clients and connection pool. At
+    most ``concurrency`` generations run at once; up to ``max_queue`` more
+    wait for a slot and further requests are refused with 503. With
+    ``socket_path``, the server listens on that Unix socket instead of
+    ``host``/``port``.
+    """
+
+    def __init__(
+        self,
+        generators: Dict[str, AIGenerator],
+        host: str = "127.0.0.1",
+        port: int = 8000,
+        socket_path: Optional[str] = None,
+        concurrency: int = 8,
+        max_queue: int = 100,
+        telemetry: Optional[MetricsRecorder] = None,
+        pool: Optional[ClientPool] = None,
+    ):
+        self.generators = generators
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.telemetry = telemetry
+        self.pool = pool
+        self.socket_path = socket_path
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.started: Optional[float] = None
+        # Created on the server's loop by the first request (before Python 3.10
+        # a semaphore binds to the loop current where it is created)
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop = asyncio.new_event_loop()
+        handler = _make_handler(self)
+        if socket_path is not None:
+            if os.path.exists(socket_path):
+                # A socket left behind by a server that did not shut down cleanly
+                os.unlink(socket_path)
+            self._server = _UnixHTTPServer(socket_path, handler)
+        else:
+            self._server = ThreadingHTTPServer((host, port), handler)
+            self._server.daemon_threads = True
+        self._threads = []
+
+    @property
+    def url(self) -> str:
+        """Where the server listens: an ``http://`` URL or ``unix:`` socket path."""
+        if self.socket_path is not None:
+            return f"unix:{self.socket_path}"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "GenerationServer":
+        self.started = time.perf_counter()
+        if self.telemetry is not None:
+            self.telemetry.start()
+        self._threads = [
+            threading.Thread(target=self._loop.run_forever, daemon=True),
+            threading.Thread(target=self._server.serve_forever, daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop accepting requests, then close the connection pool and event loop."""
+        self._server.shutdown()
+        self._server.server_close()
+        if self.pool is not None:
+            asyncio.run_coroutine_threadsafe(self.pool.aclose(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        for thread in self._threads:
+            thread.join()
+        self._loop.close()
+        if self.socket_path is not None and os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    def __enter__(self) -> "GenerationServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    async def generate(self, kind: str, params: Dict[str, Any]) -> Any:
+        """Generate one item once a slot is free (runs on the server's loop)."""
+        generator = self.generators[kind]
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if self._slots.locked() and self.queued >= self.max_queue:
+            self.rejected += 1
+            raise ServerBusy(f"Server busy: {self.concurrency} running, {self.queued} queued")
+        self.queued += 1
+        try:
+            await self._slots.acquire()
+        finally:
+            self.queued -= 1
+        self.in_flight += 1
+        try:
+            return await generator.agenerate(**params)
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Any:
+        """Run ``generate`` on the server's loop from another thread and wait for it."""
+        return asyncio.run_coroutine_threadsafe(self.generate(kind, params), self._loop).result()
+
+    def health(self) -> Dict[str, Any]:
+        return {
+            "status": "ok",
+            "uptime": time.perf_counter() - self.started if self.started else 0.0,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+        }
+
+    def to_prometheus(self, prefix: str = "morewritings") -> str:
+        """Request telemetry plus the server's queue gauges, in Prometheus text format."""
+        lines = [
+            f"# TYPE {prefix}_server_in_flight gauge",
+            f"{prefix}_server_in_flight {self.in_flight}",
+            f"# TYPE {prefix}_server_queued gauge",
+            f"{prefix}_server_queued {self.queued}",
+            f"# TYPE {prefix}_server_rejected_total counter",
+            f"{prefix}_server_rejected_total {self.rejected}",
+        ]
+        text = "\n".join(lines) + "\n"
+        if self.telemetry is not None:
+            text += self.telemetry.to_prometheus(prefix)
+        return text
+
+
+def _make_handler(server: GenerationServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, data: bytes, content_type: str, headers=None) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers=None) -> None:
+            self._send(status, json.dumps(payload).encode("utf-8"), "application/json", headers)
+
+        def _error(self, status: int, message: str, headers=None) -> None:
+            self._send_json(status, {"error": {"message": message}}, headers)
+
+        def do_GET(self):
+            path = self.path.split("?")[0].rstrip("/")
+            if path == "/health":
+                self._send_json(200, server.health())
+            elif path == "/metrics":
+                self._send(200, server.to_prometheus().encode("utf-8"),
+                           "text/plain; version=0.0.4")
+            else:
+                self._error(404, f"Unknown path {self.path}")
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            prefix, _, kind = path.rpartition("/")
+            if prefix != "/generate" or kind not in server.generators:
+                self._error(404, f"Unknown path {self.path}")
+                return
+            try:
+                params = json.loads(raw or b"{}")
+            except ValueError:
+                self._error(400, "Request body is not valid JSON")
+                return
+            if not isinstance(params, dict) or not isinstance(params.get("prompt"), str):
+                self._error(400, 'Request body must be a JSON object with a "prompt" string')
+                return
+            params.pop("type", None)
+
+            try:
+                result = server.submit(kind, params)
+            except ServerBusy as e:
+                self._error(503, str(e), {"Retry-After": "1"})
+            except (ContextWindowError, TypeError, ValueError) as e:
+                self._error(400, str(e))
+            except GenerationError as e:
+                self._error(503 if e.retryable else 502, str(e))
+            except Exception as e:
+                self._error(500, str(e))
+            else:
+                self._send(200, dumps(result, compact=True), "application/json")
+
+    return Handler
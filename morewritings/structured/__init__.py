@@ -0,0 +1,96 @@
+"""
+Schema-constrained JSON output derived from the data models.
+
+Generators ask for a JSON object matching an output model (the fields of a
+``Profile``/``Scenery``/``Scene`` the model should write) and parse it with
+``model_validate_json``. Replies that are not valid JSON for the schema,
+such as plain text from models without JSON mode, yield None so callers can
+fall back to treating the reply as prose.
+
+Only models known to accept a ``json_schema`` ``response_format`` are asked
+for one by default; others (such as ``gpt-4``) reject it with a 400.
+"""
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Type
+
+from openai import BadRequestError
+from pydantic import BaseModel, Field, ValidationError, create_model
+
+
+# Whether models accept a json_schema response_format, matched by longest model-name prefix
+JSON_SCHEMA_SUPPORT: Dict[str, bool] = {
+    "gpt-4o": True,
+    "gpt-4o-2024-05-13": False,
+    "gpt-4.1": True,
+    "gpt-5": True,
+    "o1": True,
+    "o1-mini": False,
+    "o1-preview": False,
+    "o3": True,
+    "o4-mini": True,
+}
+
+
+def supports_json_schema(model: str) -> bool:
+    """Whether ``model`` is known to accept a ``json_schema`` ``response_format``."""
+    matches = [prefix for prefix in JSON_SCHEMA_SUPPORT if model.startswith(prefix)]
+    if not matches:
+        return False
+    return JSON_SCHEMA_SUPPORT[max(matches, key=len)]
+
+
+def output_model_of(model: Type[BaseModel], fields: Iterable[str]) -> Type[BaseModel]:
+    """Model with the given ``fields`` of ``model``, for the reply schema.
+
+    Field types, defaults and descriptions are taken from ``model`` itself,
+    so the schema follows any change to the data models.
+    """
+    return create_model(
+        f"{model.__name__}Output",
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+
+@lru_cache(maxsize=None)
+def pack_model(model: Type[BaseModel], count: int) -> Type[BaseModel]:
+    """Reply holding exactly ``count`` ``model`` items, in request order."""
+    return create_model(
+        f"{model.__name__}Pack",
+        items=(List[model], Field(min_length=count, max_length=count))
+    )
+
+
+@lru_cache(maxsize=None)
+def response_format(model: Type[BaseModel]) -> Dict[str, Any]:
+    """``response_format`` argument asking for JSON matching ``model`` (built once per model).
+
+    The schema is not sent as ``strict``: strict mode forbids free-form
+    objects such as ``Profile.relationships``. Replies are validated on
+    receipt instead.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": model.model_json_schema(),
+            "strict": False
+        }
+    }
+
+
+def parse_output(model: Type[BaseModel], content: str) -> Optional[BaseModel]:
+    """``content`` validated as ``model``, or None if it is not matching JSON."""
+    text = content.strip()
+    if not text.startswith("{"):
+        return None
+    try:
+        return model.model_validate_json(text)
+    except ValidationError:
+        return None
+
+
+def rejects_response_format(error: Exception) -> bool:
+    """Whether an API error says the model does not support ``response_format``."""
+    return isinstance(error, BadRequestError) and any(
+        word in str(error) for word in ("response_format", "json_schema")
+    )
@@ -0,0 +1,211 @@
+"""
+Per-request telemetry: timings, token usage and batch summaries.
+"""
+import json
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from pydantic import BaseModel
+
+
+class RequestMetrics(BaseModel):
+    """Measurements for one generation request."""
+    type: str
+    model: str
+    wall_time: float = 0.0
+    time_to_first_byte: Optional[float] = None
+    rate_limit_wait: float = 0.0
+    prompt_tokens: int = 0
+    # Prompt tokens served from the provider's prompt cache
+    cached_tokens: int = 0
+    completion_tokens: int = 0
+    attempts: int = 0
+    cached: bool = False
+    coalesced: bool = False
+    # A duplicate (hedge) request was sent
+    hedged: bool = False
+    error: Optional[str] = None
+
+    @property
+    def retries(self) -> int:
+        return max(0, self.attempts - 1)
+
+    def record_usage(self, usage: Any) -> None:
+        """Add token counts from an API ``usage`` object, if present."""
+        if usage is None:
+            return
+        self.prompt_tokens += getattr(usage, "prompt_tokens", None) or 0
+        self.completion_tokens += getattr(usage, "completion_tokens", None) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        self.cached_tokens += getattr(details, "cached_tokens", None) or 0
+
+
+def percentile(values: Sequence[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile (0-100) of ``values``, or None if empty."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class Reservoir:
+    """Fixed-size uniform sample of a stream (Algorithm R), for percentiles."""
+
+    def __init__(self, size: int = 10000):
+        self.size = size
+        self.seen = 0
+        self.values: List[float] = []
+        self._random = random.Random(0)
+
+    def add(self, value: float) -> None:
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            slot = self._random.randrange(self.seen)
+            if slot < self.size:
+                self.values[slot] = value
+
+
+class MetricsRecorder:
+    """Aggregates ``RequestMetrics`` for a run in constant memory.
+
+    Totals are exact; latency percentiles come from a bounded reservoir
+    sample. Thread-safe, so one recorder can be shared by generators used
+    from several threads.
+    """
+
+    def __init__(self, sample_size: int = 10000):
+        self.requests = 0
+        self.errors = 0
+        self.cached = 0
+        self.coalesced = 0
+        self.hedged = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.rate_limit_wait = 0.0
+        self.write_time = 0.0
+        self.latency = Reservoir(sample_size)
+        self.time_to_first_byte = Reservoir(sample_size)
+        self.writes = Reservoir(sample_size)
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Mark the start of the measured run."""
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def stop(self) -> None:
+        """Mark the end of the measured run."""
+        self.finished = time.perf_counter()
+
+    def record(self, metrics: RequestMetrics) -> None:
+        """Add one request's measurements."""
+        with self._lock:
+            self.requests += 1
+            self.errors += metrics.error is not None
+            self.cached += metrics.cached
+            self.coalesced += metrics.coalesced
+            self.hedged += metrics.hedged
+            self.retries += metrics.retries
+            self.prompt_tokens += metrics.prompt_tokens
+            self.cached_tokens += metrics.cached_tokens
+            self.completion_tokens += metrics.completion_tokens
+            self.rate_limit_wait += metrics.rate_limit_wait
+            self.latency.add(metrics.wall_time)
+            if metrics.time_to_first_byte is not None:
+                self.time_to_first_byte.add(metrics.time_to_first_byte)
+
+    def record_write(self, seconds: float) -> None:
+        """Add time spent serializing and writing one output."""
+        with self._lock:
+            self.write_time += seconds
+            self.writes.add(seconds)
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self.started is None:
+            return None
+        return (self.finished or time.perf_counter()) - self.started
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals, throughput and latency percentiles (seconds) for the run."""
+        with self._lock:
+            elapsed = self.elapsed
+            latency = list(self.latency.values)
+            ttfb = list(self.time_to_first_byte.values)
+            writes = list(self.writes.values)
+            summary = {
+                "requests": self.requests,
+                "errors": self.errors,
+                "cached": self.cached,
+                "coalesced": self.coalesced,
+                "hedged": self.hedged,
+                "retries": self.retries,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "rate_limit_wait": self.rate_limit_wait,
+                "write_time": self.write_time,
+                "elapsed": elapsed,
+            }
+        rate = (lambda n: n / elapsed) if elapsed else (lambda n: None)
+        summary["requests_per_second"] = rate(summary["requests"])
+        summary["completion_tokens_per_second"] = rate(summary["completion_tokens"])
+        # Share of prompt tokens the provider served from its prompt cache
+        prompt_tokens = summary["prompt_tokens"]
+        summary["prompt_cache_hit_rate"] = (
+            summary["cached_tokens"] / prompt_tokens if prompt_tokens else None
+        )
+        for name, values in (("latency", latency), ("ttfb", ttfb), ("write", writes)):
+            for pct in (50, 95, 99):
+                summary[f"{name}_p{pct}"] = percentile(values, pct)
+        return summary
+
+    def to_prometheus(self, prefix: str = "morewritings") -> str:
+        """Summary in the Prometheus text exposition format."""
+        summary = self.summary()
+        lines = []
+        counters = (
+            "requests", "errors", "cached", "coalesced", "hedged", "retries",
+            "prompt_tokens", "cached_tokens", "completion_tokens"
+        )
+        for name in counters:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {summary[name]}")
+        for name in ("rate_limit_wait", "write_time", "elapsed"):
+            if summary[name] is not None:
+                lines.append(f"# TYPE {prefix}_{name}_seconds gauge")
+                lines.append(f"{prefix}_{name}_seconds {summary[name]:.6f}")
+        if summary["prompt_cache_hit_rate"] is not None:
+            lines.append(f"# TYPE {prefix}_prompt_cache_hit_ratio gauge")
+            lines.append(f"{prefix}_prompt_cache_hit_ratio {summary['prompt_cache_hit_rate']:.6f}")
+        for name in ("latency", "ttfb", "write"):
+            values = [(q, summary[f"{name}_p{q}"]) for q in (50, 95, 99)]
+            if all(v is None for _, v in values):
+                continue
+            lines.append(f"# TYPE {prefix}_{name}_seconds summary")
+            for q, value in values:
+                lines.append(f'{prefix}_{name}_seconds{{quantile="0.{q}"}} {value:.6f}')
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Union[str, Path]) -> None:
+        """Write metrics to ``path``: Prometheus textfile for ``.prom``, else JSON."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.suffix == ".prom":
+            data = self.to_prometheus()
+        else:
+            data = json.dumps(self.summary(), indent=2)
+        # Write then rename, so textfile collectors never read a partial file
+        tmp = path.with_name(f".{path.name}.tmp")
+        tmp.write_text(data)
+        tmp.replace(path)
@@ -0,0 +1,159 @@
+"""
+Prompt templates and lazy expansion into batch requests.
+
+A templates file maps names to specs such as::
+
+    epic_battle:
+      prompt: "{hero} faces off against {villain} in {location}"
+      genre: action
+      values:                 # optional per-template value lists
+        hero: [Aria, Brom]
+
+Every other key (``genre``, ``mood``, ...) is copied into each expanded
+request, and ``type`` (default ``scene``) selects the generator.
+"""
+import itertools
+import random
+import string
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+import yaml
+
+
+class Template:
+    """A prompt template compiled once into literal text and placeholder slots."""
+
+    def __init__(
+        self,
+        name: str,
+        prompt: str,
+        type: str = "scene",
+        values: Optional[Mapping[str, Sequence[Any]]] = None,
+        **fields: Any,
+    ):
+        self.name = name
+        self.prompt = prompt
+        self.type = type
+        self.values: Dict[str, Sequence[Any]] = dict(values or {})
+        self.extra: Dict[str, Any] = fields
+        self._parts: List[Tuple[str, Optional[str], str]] = []
+        for literal, field, spec, conversion in string.Formatter().parse(prompt):
+            if field is not None and (not field.isidentifier() or conversion):
+                raise ValueError(f"Unsupported placeholder {{{field}}} in template {name!r}")
+            self._parts.append((literal, field, spec or ""))
+        # Placeholder names in order of first appearance
+        self.placeholders: List[str] = list(dict.fromkeys(
+            field for _, field, _ in self._parts if field is not None
+        ))
+
+    @classmethod
+    def from_spec(cls, name: str, spec: Mapping[str, Any]) -> "Template":
+        if "prompt" not in spec:
+            raise ValueError(f"Template {name!r} has no prompt")
+        return cls(name, **spec)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """The prompt with placeholders filled from ``values``."""
+        out = []
+        for literal, field, spec in self._parts:
+            out.append(literal)
+            if field is not None:
+                out.append(format(values[field], spec))
+        return "".join(out)
+
+    def request(self, values: Mapping[str, Any]) -> Dict[str, Any]:
+        """Batch request for one combination of placeholder values."""
+        return {"type": self.type, "prompt": self.render(values), **self.extra}
+
+    def value_lists(
+        self, values: Optional[Mapping[str, Sequence[Any]]] = None
+    ) -> List[Sequence[Any]]:
+        """Value list of each placeholder, ``values`` overriding the template's own."""
+        merged = dict(self.values)
+        merged.update(values or {})
+        missing = [p for p in self.placeholders if not merged.get(p)]
+        if missing:
+            raise ValueError(f"No values for {', '.join(missing)} in template {self.name!r}")
+        return [merged[p] for p in self.placeholders]
+
+    def count(self, values: Optional[Mapping[str, Sequence[Any]]] = None) -> int:
+        """Number of combinations in the full expansion."""
+        total = 1
+        for options in self.value_lists(values):
+            total *= len(options)
+        return total
+
+    def expand(
+        self,
+        values: Optional[Mapping[str, Sequence[Any]]] = None,
+        sample: Optional[int] = None,
+        seed: Optional[int] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """Lazily yield requests for the cartesian product of the value lists.
+
+        With ``sample``, yield that many distinct combinations chosen at
+        random instead. Only the chosen indexes are held in memory, never
+        the product itself.
+        """
+        lists = self.value_lists(values)
+        if sample is None:
+            for combination in itertools.product(*lists):
+                yield self.request(dict(zip(self.placeholders, combination)))
+            return
+        for index in _sample_indexes(random.Random(seed), self.count(values), sample):
+            yield self.request(dict(zip(self.placeholders, _decode(index, lists))))
+
+
+def _sample_indexes(rng: random.Random, total: int, k: int) -> Iterator[int]:
+    """``min(k, total)`` distinct random integers below ``total``."""
+    k = min(k, total)
+    if total <= sys.maxsize and k > total // 2:
+        yield from rng.sample(range(total), k)
+        return
+    # Sparse sample of a large product: draw and skip repeats
+    seen = set()
+    while len(seen) < k:
+        index = rng.randrange(total)
+        if index not in seen:
+            seen.add(index)
+            yield index
+
+
+def _decode(index: int, lists: Sequence[Sequence[Any]]) -> List[Any]:
+    """Combination number ``index`` of ``itertools.product(*lists)``."""
+    combination = []
+    for options in reversed(lists):
+        index, position = divmod(index, len(options))
+        combination.append(options[position])
+    return combination[::-1]
+
+
+def load_templates(path: Union[str, Path]) -> Dict[str, Template]:
+    """Compile every template in a YAML templates file."""
+    with open(path) as f:
+        specs = yaml.safe_load(f) or {}
+    if not isinstance(specs, dict):
+        raise ValueError(f"{path}: expected a mapping of template names to specs")
+    return {name: Template.from_spec(name, spec) for name, spec in specs.items()}
+
+
+def load_values(path: Union[str, Path]) -> Dict[str, List[Any]]:
+    """Placeholder value lists from a YAML/JSON mapping of name to list."""
+    with open(path) as f:
+        data = yaml.safe_load(f) or {}
+    if not isinstance(data, dict) or not all(isinstance(v, list) for v in data.values()):
+        raise ValueError(f"{path}: expected a mapping of placeholder names to lists")
+    return data
+
+
+def expand_all(
+    templates: Iterable[Template],
+    values: Optional[Mapping[str, Sequence[Any]]] = None,
+    sample: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Chain the expansions of several templates (``sample`` applies per template)."""
+    for template in templates:
+        yield from template.expand(values, sample=sample, seed=seed)
@@ -0,0 +1,489 @@
+"""
+Local stand-in for the OpenAI API, for tests and offline benchmarks.
+
+``MockOpenAIServer`` serves ``POST /v1/chat/completions`` (plain, streaming
+and JSON-schema constrained) from a background thread, with configurable latency, token rate
+and injected 429/5xx errors, plus the files and batches endpoints used by
+provider batch jobs. Point generators at it with ``base_url``::
+
+    with MockOpenAIServer(latency=0.05) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        SceneGenerator(api_key="test").generate("A quiet harbor")
+"""
+import email.parser
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+
+# Prompt caching granularity, in (estimated) tokens
+PROMPT_CACHE_BLOCK = 128
+
+WORDS = (
+    "the lantern flickered as rain traced silver lines down the tall window "
+    "while she waited listening for footsteps in the quiet hall beyond"
+).split()
+
+
+class MockOpenAIServer:
+    """Threaded HTTP server emulating chat completions.
+
+    Latency before the first byte is drawn from ``latency_distribution``
+    (``"fixed"``, ``"uniform"`` in ``[latency - jitter, latency + jitter]``,
+    or ``"lognormal"`` with median ``latency`` and sigma ``jitter``). The
+    completion then takes ``completion_tokens / tokens_per_second`` seconds.
+    ``error_rate_429`` and ``error_rate_5xx`` are per-request probabilities.
+
+    Like provider prompt caching, prompt tokens matching a prefix of an
+    earlier request (in blocks of 128, once at least
+    ``prompt_cache_min_tokens`` match) are reported as
+    ``usage.prompt_tokens_details.cached_tokens``.
+
+    Requests with a ``json_schema`` ``response_format`` get a JSON object
+    following the schema, with the filler text in every string field; with
+    ``json_schema=False`` they are rejected with 400 instead, like models
+    without JSON mode.
+
+    Uploaded files are kept in ``files``. A created batch runs every request
+    in its input file at once (with the same error injection, but no latency)
+    and reports ``in_progress`` until ``batch_latency`` seconds have passed.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        latency_distribution: str = "fixed",
+        tokens_per_second: Optional[float] = None,
+        completion_tokens: int = 200,
+        error_rate_429: float = 0.0,
+        error_rate_5xx: float = 0.0,
+        retry_after: float = 0.01,
+        seed: Optional[int] = None,
+        batch_latency: float = 0.0,
+        json_schema: bool = True,
+        prompt_cache_min_tokens: int = 1024,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.latency_distribution = latency_distribution
+        self.tokens_per_second = tokens_per_second
+        self.completion_tokens = completion_tokens
+        self.error_rate_429 = error_rate_429
+        self.error_rate_5xx = error_rate_5xx
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.batch_latency = batch_latency
+        self.json_schema = json_schema
+        self.prompt_cache_min_tokens = prompt_cache_min_tokens
+        self._prefixes = set()
+        self.requests: List[Dict[str, Any]] = []
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _make_handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """API base URL to hand to an OpenAI client."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockOpenAIServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "MockOpenAIServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _draw(self) -> float:
+        with self._lock:
+            if self.latency_distribution == "uniform":
+                value = self.random.uniform(self.latency - self.jitter, self.latency + self.jitter)
+            elif self.latency_distribution == "lognormal" and self.latency > 0:
+                value = self.random.lognormvariate(0, self.jitter) * self.latency
+            else:
+                value = self.latency
+        return max(0.0, value)
+
+    def _inject_error(self) -> Optional[int]:
+        with self._lock:
+            roll = self.random.random()
+        if roll < self.error_rate_429:
+            return 429
+        if roll < self.error_rate_429 + self.error_rate_5xx:
+            return 503
+        return None
+
+    def _record(self, path: str, body: Dict[str, Any]) -> None:
+        with self._lock:
+            self.requests.append({"path": path, "body": body})
+
+    def completion_text(self, body: Dict[str, Any]) -> str:
+        """Deterministic filler text sized to ``completion_tokens``/``max_tokens``."""
+        count = min(self.completion_tokens, body.get("max_tokens") or self.completion_tokens)
+        return " ".join(WORDS[i % len(WORDS)] for i in range(max(1, count)))
+
+    def completion(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """A ``chat.completion`` response object for a request body."""
+        text = self.completion_text(body)
+        completion_tokens = len(text.split(" "))
+        cached_tokens = self.cached_tokens(body)
+        schema = _json_schema(body)
+        if schema is not None:
+            text = json.dumps(_fill(schema, text))
+        prompt_tokens = _prompt_tokens(body)
+        max_tokens = body.get("max_tokens")
+        truncated = max_tokens is not None and max_tokens < self.completion_tokens
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "length" if truncated else "stop"
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens}
+            }
+        }
+
+    def cached_tokens(self, body: Dict[str, Any]) -> int:
+        """Prompt tokens matching an earlier request's prefix; remembers this prompt's."""
+        text = _prompt_text(body).encode("utf-8")
+        # Estimated 4 bytes per token, as in the prompt token count
+        size = PROMPT_CACHE_BLOCK * 4
+        digest = hashlib.sha256()
+        keys = []
+        for end in range(size, len(text) + 1, size):
+            digest.update(text[end - size:end])
+            keys.append(digest.copy().digest())
+        with self._lock:
+            matched = 0
+            for key in keys:
+                if key not in self._prefixes:
+                    break
+                matched += 1
+            self._prefixes.update(keys)
+        cached = matched * PROMPT_CACHE_BLOCK
+        return cached if cached >= self.prompt_cache_min_tokens else 0
+
+    def rejection(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """400 error body for a JSON schema request when ``json_schema`` is off."""
+        if self.json_schema or _json_schema(body) is None:
+            return None
+        return {"error": {
+            "message": "Invalid parameter: 'response_format' of type 'json_schema' "
+                       "is not supported with this model.",
+            "type": "invalid_request_error",
+            "param": "response_format",
+            "code": None
+        }}
+
+    def add_file(self, data: bytes, filename: str, purpose: str) -> Dict[str, Any]:
+        """Store an uploaded (or generated) file and return its file object."""
+        file = {
+            "id": f"file-{uuid.uuid4().hex[:12]}",
+            "object": "file",
+            "bytes": len(data),
+            "created_at": int(time.time()),
+            "filename": filename,
+            "purpose": purpose,
+            "status": "processed"
+        }
+        with self._lock:
+            self.files[file["id"]] = dict(file, data=data)
+        return file
+
+    def create_batch(self, body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Run a batch over an uploaded input file; None if the file is unknown."""
+        source = self.files.get(body.get("input_file_id"))
+        if source is None:
+            return None
+        batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+        outputs, errors = [], []
+        for line in source["data"].decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            status = self._inject_error()
+            rejection = self.rejection(item["body"])
+            if rejection is not None:
+                status = 400
+                response = {"status_code": status, "body": rejection}
+            elif status is None:
+                response = {"status_code": 200, "body": self.completion(item["body"])}
+            else:
+                message = "Rate limit reached" if status == 429 else "Service unavailable"
+                response = {
+                    "status_code": status,
+                    "body": {"error": {"message": message, "type": "mock_error", "code": None}}
+                }
+            result = {
+                "id": f"batch_req_{uuid.uuid4().hex[:12]}",
+                "custom_id": item["custom_id"],
+                "response": dict(response, request_id=uuid.uuid4().hex),
+                "error": None
+            }
+            (outputs if status is None else errors).append(json.dumps(result))
+
+        def result_file(lines: List[str], kind: str) -> Optional[str]:
+            if not lines:
+                return None
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            return self.add_file(data, f"{batch_id}_{kind}.jsonl", "batch_output")["id"]
+
+        now = int(time.time())
+        batch = {
+            "id": batch_id,
+            "object": "batch",
+            "endpoint": body.get("endpoint"),
+            "input_file_id": source["id"],
+            "completion_window": body.get("completion_window", "24h"),
+            "status": "in_progress",
+            "created_at": now,
+            "in_progress_at": now,
+            "expires_at": now + 86400,
+            "metadata": body.get("metadata"),
+            "request_counts": {
+                "total": len(outputs) + len(errors),
+                "completed": len(outputs),
+                "failed": len(errors)
+            },
+            "_ready_at": time.monotonic() + self.batch_latency,
+            "_output_file_id": result_file(outputs, "output"),
+            "_error_file_id": result_file(errors, "error")
+        }
+        with self._lock:
+            self.batches[batch_id] = batch
+        return self.batch(batch_id)
+
+    def batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a batch, completing it once ``batch_latency`` has passed."""
+        with self._lock:
+            batch = self.batches.get(batch_id)
+            if batch is None:
+                return None
+            if batch["status"] == "in_progress" and time.monotonic() >= batch["_ready_at"]:
+                batch.update(
+                    status="completed",
+                    completed_at=int(time.time()),
+                    output_file_id=batch["_output_file_id"],
+                    error_file_id=batch["_error_file_id"]
+                )
+            return {k: v for k, v in batch.items() if not k.startswith("_")}
+
+
+def _json_schema(body: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") != "json_schema":
+        return None
+    return response_format["json_schema"]["schema"]
+
+
+def _fill(schema: Dict[str, Any], text: str, defs: Optional[Dict[str, Any]] = None) -> Any:
+    """A value following ``schema``: ``text`` in strings, ``minItems`` array entries."""
+    defs = schema.get("$defs", defs or {})
+    if "$ref" in schema:
+        return _fill(defs[schema["$ref"].rsplit("/", 1)[-1]], text, defs)
+    options = [option for option in schema.get("anyOf", []) if option.get("type") != "null"]
+    if options:
+        return _fill(options[0], text, defs)
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            name: _fill(prop, text, defs) for name, prop in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = schema.get("items", {})
+        if items.get("type") == "string":
+            text = text.split(" ")[0]
+        return [_fill(items, text, defs) for _ in range(schema.get("minItems", 1))]
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return text
+
+
+def _prompt_text(body: Dict[str, Any]) -> str:
+    return "".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+
+def _prompt_tokens(body: Dict[str, Any]) -> int:
+    return max(1, len(_prompt_text(body)) // 4)
+
+
+def _make_handler(server: MockOpenAIServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers=None) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_json(self) -> Dict[str, Any]:
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _not_found(self) -> None:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        def do_POST(self):
+            path = self.path.split("?")[0].rstrip("/")
+            if path.endswith("/files"):
+                self._upload()
+                return
+            body = self._read_json()
+            server._record(self.path, body)
+            if path.endswith("/chat/completions"):
+                self._chat_completion(body)
+            elif path.endswith("/batches"):
+                batch = server.create_batch(body)
+                if batch is None:
+                    self._send_json(400, {"error": {"message": "Unknown input_file_id"}})
+                else:
+                    self._send_json(200, batch)
+            else:
+                self._not_found()
+
+        def do_GET(self):
+            parts = self.path.split("?")[0].strip("/").split("/")
+            server._record(self.path, {})
+            if len(parts) >= 3 and parts[-3] == "files" and parts[-1] == "content":
+                file = server.files.get(parts[-2])
+                if file is None:
+                    self._not_found()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(file["data"])))
+                self.end_headers()
+                self.wfile.write(file["data"])
+            elif len(parts) >= 2 and parts[-2] == "batches":
+                batch = server.batch(parts[-1])
+                if batch is None:
+                    self._not_found()
+                else:
+                    self._send_json(200, batch)
+            else:
+                self._not_found()
+
+        def _upload(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length)
+            message = email.parser.BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+            )
+            fields = {}
+            for part in message.get_payload():
+                name = part.get_param("name", header="content-disposition")
+                fields[name] = (part.get_filename(), part.get_payload(decode=True))
+            filename, data = fields.get("file", (None, b""))
+            purpose = (fields.get("purpose", (None, b"batch"))[1] or b"").decode()
+            file = server.add_file(data, filename or "upload.jsonl", purpose)
+            server._record(self.path, {"purpose": purpose, "filename": file["filename"]})
+            self._send_json(200, file)
+
+        def _chat_completion(self, body: Dict[str, Any]) -> None:
+            time.sleep(server._draw())
+            rejection = server.rejection(body)
+            if rejection is not None:
+                self._send_json(400, rejection)
+                return
+            status = server._inject_error()
+            if status is not None:
+                message = "Rate limit reached" if status == 429 else "Service unavailable"
+                self._send_json(
+                    status,
+                    {"error": {"message": message, "type": "mock_error", "code": None}},
+                    {"retry-after-ms": str(int(server.retry_after * 1000))}
+                )
+                return
+
+            completion = server.completion(body)
+            words = completion["choices"][0]["message"]["content"].split(" ")
+            usage = completion["usage"]
+            tokens_per_second = server.tokens_per_second
+            delay = usage["completion_tokens"] / tokens_per_second if tokens_per_second else 0.0
+
+            if body.get("stream"):
+                self._stream(body, completion["id"], words, delay, usage)
+                return
+
+            time.sleep(delay)
+            self._send_json(200, completion)
+
+        def _stream(self, body, completion_id, words, delay, usage) -> None:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            def send(payload: str) -> None:
+                data = f"data: {payload}\n\n".encode("utf-8")
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            per_word = delay / len(words) if words else 0.0
+            for i, word in enumerate(words):
+                if per_word:
+                    time.sleep(per_word)
+                send(json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [{
+                        "index": 0,
+                        "delta": {"content": word if i == 0 else " " + word},
+                        "finish_reason": None
+                    }]
+                }))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                send(json.dumps({
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body.get("model", "mock"),
+                    "choices": [],
+                    "usage": usage
+                }))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+
+    return Handler
@@ -0,0 +1,143 @@
+"""
+Token counting, context windows and adaptive output budgets.
+
+Counts use ``tiktoken`` when it is installed (``pip install morewritings[tokens]``)
+and fall back to a characters-per-token estimate otherwise.
+"""
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Iterable, Mapping, Optional
+
+from ..ratelimit import estimate_tokens
+from ..retry import GenerationError
+from ..telemetry import percentile
+
+
+# Context window sizes in tokens, matched by longest model-name prefix
+CONTEXT_WINDOWS: Dict[str, int] = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+
+# Starting output budgets per content type, used until enough completions are observed
+DEFAULT_BUDGETS: Dict[str, int] = {"scene": 1500, "profile": 1000, "scenery": 600}
+
+# Chat format overhead: tokens per message and for priming the reply
+MESSAGE_OVERHEAD = 3
+REPLY_OVERHEAD = 3
+
+
+class ContextWindowError(GenerationError):
+    """The prompt does not leave room for a completion in the model's context window."""
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        pass
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # Encodings are downloaded on first use; estimate when offline
+        return None
+
+
+def count_tokens(text: str, model: str = "gpt-4") -> int:
+    """Tokens in ``text`` for ``model``, exact with tiktoken, estimated without."""
+    encoding = _encoding(model)
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def count_message_tokens(messages: Iterable[Mapping[str, str]], model: str = "gpt-4") -> int:
+    """Prompt tokens for a list of chat messages, including format overhead."""
+    return REPLY_OVERHEAD + sum(
+        MESSAGE_OVERHEAD + count_tokens(m.get("content") or "", model) for m in messages
+    )
+
+
+def context_window(model: str) -> Optional[int]:
+    """Context window of ``model`` in tokens, or None if unknown."""
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return None
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+class OutputBudgets:
+    """Per-content-type ``max_tokens`` budgets learned from observed completions.
+
+    Until ``min_samples`` completions of a type have been seen its budget is
+    ``defaults[type]``; after that it is the 95th percentile of the last
+    ``window`` completion lengths times ``headroom``. Budgets never exceed
+    the caller's ceiling nor drop below ``minimum``. Shared safely between
+    generators and threads.
+    """
+
+    def __init__(
+        self,
+        defaults: Optional[Mapping[str, int]] = None,
+        headroom: float = 1.25,
+        minimum: int = 64,
+        window: int = 200,
+        min_samples: int = 5,
+    ):
+        self.defaults = dict(DEFAULT_BUDGETS if defaults is None else defaults)
+        self.headroom = headroom
+        self.minimum = minimum
+        self.window = window
+        self.min_samples = min_samples
+        self._samples: Dict[str, Deque[int]] = {}
+        self._lock = threading.Lock()
+
+    def budget(self, content_type: str, ceiling: int) -> int:
+        """Output tokens to request for ``content_type``, at most ``ceiling``."""
+        with self._lock:
+            samples = self._samples.get(content_type)
+            if samples is not None and len(samples) >= self.min_samples:
+                value = int(percentile(list(samples), 95) * self.headroom) + 1
+            else:
+                value = self.defaults.get(content_type, ceiling)
+        return max(min(self.minimum, ceiling), min(value, ceiling))
+
+    def observe(self, content_type: str, completion_tokens: int) -> None:
+        """Record the length of a complete (not truncated) completion."""
+        with self._lock:
+            samples = self._samples.get(content_type)
+            if samples is None:
+                samples = self._samples[content_type] = deque(maxlen=self.window)
+            samples.append(completion_tokens)
+
+
+def check_context(prompt_tokens: int, model: str, minimum: int = 1) -> Optional[int]:
+    """Room left for the completion; raises ``ContextWindowError`` below ``minimum``.
+
+    Returns None for models with an unknown context window.
+    """
+    window = context_window(model)
+    if window is None:
+        return None
+    room = window - prompt_tokens
+    if room < minimum:
+        raise ContextWindowError(
+            f"Prompt of {prompt_tokens} tokens leaves {max(room, 0)} of the "
+            f"{window}-token context window of {model}; shorten the prompt"
+        )
+    return room
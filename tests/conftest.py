@@ -0,0 +1,19 @@
+"""
+Shared fixtures for the test suite.
+"""
+import pytest
+from morewritings.testing import MockOpenAIServer
+
+
+@pytest.fixture
+def server_options():
+    """Keyword arguments for the mock server; override in a module to change them."""
+    return {"completion_tokens": 12, "seed": 1}
+
+
+@pytest.fixture
+def server(monkeypatch, server_options):
+    """Mock server the generators are pointed at."""
+    with MockOpenAIServer(**server_options) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        yield server
@@ -0,0 +1,123 @@
+"""
+Tests for batch execution.
+"""
+import asyncio
+import pytest
+from morewritings.batch import BatchJournal, iter_jsonl, read_batch, run_batch, write_atomic
+
+
+class FakeGenerator:
+    """Generator stand-in that finishes later items first."""
+    
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+    
+    async def agenerate(self, prompt, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01 / int(prompt))
+        self.in_flight -= 1
+        return prompt
+
+
+def test_run_batch_bounds_concurrency_and_keeps_indices():
+    """Test workers stay within the concurrency limit and report item indices."""
+    generator = FakeGenerator()
+    items = [(i, {"type": "scene", "prompt": str(i)}) for i in range(1, 9)]
+    results = {}
+    
+    asyncio.run(run_batch(
+        items,
+        {"scene": generator},
+        concurrency=3,
+        on_result=lambda i, t, r: results.__setitem__(i, r)
+    ))
+    
+    assert generator.max_in_flight == 3
+    assert results == {i: str(i) for i in range(1, 9)}
+
+
+def test_run_batch_reports_unknown_types():
+    """Test unknown item types are reported and skipped."""
+    unknown = []
+    asyncio.run(run_batch(
+        [(1, {"type": "poem", "prompt": "x"})],
+        {},
+        on_unknown=lambda i, t: unknown.append((i, t))
+    ))
+    assert unknown == [(1, "poem")]
+
+
+def test_run_batch_rejects_zero_concurrency():
+    """Test concurrency must be positive."""
+    with pytest.raises(ValueError):
+        asyncio.run(run_batch([], {}, concurrency=0))
+
+
+def test_journal_lists_only_intact_outputs(tmp_path):
+    """Test completed() drops entries whose file is missing or changed."""
+    journal = BatchJournal(tmp_path)
+    with journal.open():
+        for i in (1, 2, 3):
+            name = f"scene_{i:03d}.json"
+            journal.record(i, "scene", name, write_atomic(tmp_path / name, f"content {i}"))
+    (tmp_path / "scene_002.json").unlink()
+    (tmp_path / "scene_003.json").write_text("tampered")
+    
+    assert list(BatchJournal(tmp_path).completed()) == [1]
+
+
+def test_journal_tolerates_torn_line(tmp_path):
+    """Test a partially written final line is ignored and not corrupted by resuming."""
+    journal = BatchJournal(tmp_path)
+    with journal.open():
+        journal.record(1, "scene", "scene_001.json", write_atomic(tmp_path / "scene_001.json", "a"))
+    with open(journal.path, "a") as f:
+        f.write('{"index": 2, "type": "sce')
+    
+    with journal.open(resume=True):
+        journal.record(3, "scene", "scene_003.json", write_atomic(tmp_path / "scene_003.json", "c"))
+    
+    assert sorted(BatchJournal(tmp_path).completed()) == [1, 3]
+
+
+def test_read_batch_streams_jsonl(tmp_path):
+    """Test JSONL batch files are parsed lazily, line by line."""
+    batch_file = tmp_path / "batch.jsonl"
+    batch_file.write_text(
+        '{"type": "scene", "prompt": "One"}\n\n{"type": "profile", "prompt": "Two"}\n'
+    )
+    requests = read_batch(str(batch_file))
+    assert not isinstance(requests, list)
+    assert [r["prompt"] for r in requests] == ["One", "Two"]
+
+
+def test_read_batch_reports_bad_lines():
+    """Test invalid JSONL lines name their line number."""
+    with pytest.raises(ValueError, match="line 2"):
+        list(iter_jsonl(['{"type": "scene", "prompt": "ok"}', '{broken']))
+
+
+def test_run_batch_consumes_items_lazily():
+    """Test workers only pull items as they become free."""
+    pulled = []
+    
+    def items():
+        for i in range(1, 1000):
+            pulled.append(i)
+            yield i, {"type": "scene", "prompt": str(i)}
+    
+    class Stop(Exception):
+        pass
+    
+    class StopAfterThree:
+        async def agenerate(self, prompt, **kwargs):
+            await asyncio.sleep(0)
+            if prompt == "3":
+                raise Stop()
+            return prompt
+    
+    with pytest.raises(Stop):
+        asyncio.run(run_batch(items(), {"scene": StopAfterThree()}, concurrency=2))
+    assert len(pulled) < 10
@@ -0,0 +1,137 @@
+"""
+Tests for provider batch-API submission.
+"""
+import json
+import pytest
+from click.testing import CliRunner
+from morewritings.batch import read_batch
+from morewritings.batchapi import ProviderBatch, ResultIndex, result_content, write_inputs
+from morewritings.cli import cli
+from morewritings.generators import SceneGenerator, ProfileGenerator, SceneryGenerator
+from morewritings.retry import GenerationError
+from morewritings.testing import MockOpenAIServer
+
+
+@pytest.fixture
+def server_options():
+    """Mock server whose batches finish quickly."""
+    return {"completion_tokens": 12, "batch_latency": 0.05, "seed": 3}
+
+
+@pytest.fixture
+def batch_file(tmp_path):
+    """Batch file with one item of each type."""
+    path = tmp_path / "batch.jsonl"
+    path.write_text("\n".join(json.dumps(item) for item in [
+        {"type": "scene", "prompt": "A forest meeting", "title": "Forest"},
+        {"type": "profile", "prompt": "A wise wizard", "name": "Merlin"},
+        {"type": "scenery", "prompt": "A floating city", "name": "Skyreach"},
+    ]))
+    return path
+
+
+def submit(batch_file, output_dir, *args):
+    return CliRunner().invoke(cli, [
+        "batch-generate", str(batch_file), "-o", str(output_dir), "--submit-batch",
+        "--poll-interval", "0.02", "--no-cache", "--api-key", "test-key", *args
+    ])
+
+
+def test_result_content_classifies_failures(tmp_path):
+    """Test result lines map to content or classified GenerationErrors."""
+    ok = {"custom_id": "item-1", "response": {"status_code": 200, "body": {
+        "choices": [{"message": {"content": "Text"}}]}}}
+    limited = {"custom_id": "item-2", "response": {"status_code": 429, "body": {
+        "error": {"message": "Rate limit reached"}}}}
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps(ok) + "\n" + json.dumps(limited) + "\n")
+    index = ResultIndex([path])
+    assert len(index) == 2
+    assert result_content(index.get("item-1")) == "Text"
+    with pytest.raises(GenerationError) as excinfo:
+        result_content(index.get("item-2"))
+    assert excinfo.value.retryable
+    with pytest.raises(GenerationError, match="No result"):
+        result_content(index.get("item-3"))
+
+
+def test_write_inputs_splits_files(tmp_path):
+    """Test input lines carry completion bodies and respect max_requests."""
+    generators = {"scene": SceneGenerator(api_key='test-key')}
+    unknown = []
+    items = [(i, {"type": "scene", "prompt": f"Scene {i}"}) for i in range(1, 6)]
+    items.append((6, {"type": "poem", "prompt": "x"}))
+    paths = write_inputs(items, generators, tmp_path, max_requests=2,
+                         on_unknown=lambda i, t: unknown.append(i))
+    assert len(paths) == 3
+    line = json.loads(paths[0].read_text().splitlines()[0])
+    assert line["custom_id"] == "item-1"
+    assert line["url"] == "/v1/chat/completions"
+    assert line["body"]["max_tokens"] == 2000
+    assert line["body"]["messages"][1]["content"] == "Scene 1"
+    assert "response_format" not in line["body"]
+    assert unknown == [6]
+
+
+def test_submit_batch_end_to_end(server, batch_file, tmp_path):
+    """Test items are uploaded, polled and written as model files."""
+    output_dir = tmp_path / "out"
+    result = submit(batch_file, output_dir)
+    assert result.exit_code == 0, result.output
+    assert "Generated 3 items" in result.output
+    paths = [r["path"] for r in server.requests]
+    assert paths[:2] == ["/v1/files", "/v1/batches"]
+    assert not any(p.endswith("/chat/completions") for p in paths)
+
+    profile = json.loads((output_dir / "profile_002.json").read_text())
+    assert profile["name"] == "Merlin"
+    assert len(profile["description"].split()) == 12
+    assert json.loads((output_dir / "scene_001.json").read_text())["title"] == "Forest"
+    assert not list(output_dir.glob(".provider_batch*"))
+
+
+def test_submit_batch_for_model_without_json_schemas(monkeypatch, batch_file, tmp_path):
+    """Test the default model's batch lines are plain text, which it accepts."""
+    with MockOpenAIServer(completion_tokens=12, batch_latency=0.05, json_schema=False) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = submit(batch_file, tmp_path / "out")
+    assert result.exit_code == 0, result.output
+    assert "Generated 3 items" in result.output
+
+
+def test_failures_resubmitted_with_resume(server, batch_file, tmp_path):
+    """Test failed batch lines are journaled and only they are resubmitted."""
+    output_dir = tmp_path / "out"
+    server.error_rate_429 = 1.0
+    result = submit(batch_file, output_dir)
+    assert result.exit_code == 1
+    assert not list(output_dir.glob("*.json"))
+
+    server.error_rate_429 = 0.0
+    result = submit(batch_file, output_dir, "--resume")
+    assert result.exit_code == 0, result.output
+    assert len(list(output_dir.glob("*.json"))) == 3
+
+
+def test_resume_collects_pending_jobs(server, batch_file, tmp_path):
+    """Test jobs submitted earlier are collected with --resume, not resubmitted."""
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+    generators = {
+        "scene": SceneGenerator(api_key='test-key'),
+        "profile": ProfileGenerator(api_key='test-key'),
+        "scenery": SceneryGenerator(api_key='test-key'),
+    }
+    items = enumerate(read_batch(str(batch_file)), 1)
+    job = ProviderBatch(generators["scene"].client, output_dir)
+    job.submit(write_inputs(items, generators, output_dir))
+
+    result = submit(batch_file, output_dir)
+    assert result.exit_code != 0
+    assert "--resume" in result.output
+
+    result = submit(batch_file, output_dir, "--resume")
+    assert result.exit_code == 0, result.output
+    assert "Resuming 1 provider batch job(s)" in result.output
+    assert [r["path"] for r in server.requests].count("/v1/batches") == 1
+    assert len(list(output_dir.glob("*.json"))) == 3
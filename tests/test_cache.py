@@ -0,0 +1,66 @@
+"""
+Tests for the response cache.
+"""
+import time
+from unittest.mock import patch, MagicMock
+from morewritings.cache import ResponseCache, make_key
+from morewritings.generators import ProfileGenerator
+
+
+def test_cache_roundtrip(tmp_path):
+    """Test stored content is returned and misses return None."""
+    cache = ResponseCache(tmp_path)
+    key = make_key("gpt-4", 0.7, 2000, "system", "prompt")
+    assert cache.get(key) is None
+    cache.set(key, "Cached content")
+    assert cache.get(key) == "Cached content"
+    assert ResponseCache(tmp_path).get(key) == "Cached content"
+
+
+def test_cache_key_covers_parameters():
+    """Test every request parameter changes the key."""
+    base = make_key("gpt-4", 0.7, 2000, "system", "prompt")
+    assert base != make_key("gpt-4o", 0.7, 2000, "system", "prompt")
+    assert base != make_key("gpt-4", 0.2, 2000, "system", "prompt")
+    assert base != make_key("gpt-4", 0.7, 500, "system", "prompt")
+    assert base != make_key("gpt-4", 0.7, 2000, "other", "prompt")
+    assert base != make_key("gpt-4", 0.7, 2000, "system", "other")
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test the oldest unused entry is evicted past max_entries."""
+    cache = ResponseCache(tmp_path, max_entries=2)
+    cache.set("a" * 64, "A")
+    cache.set("b" * 64, "B")
+    cache.get("a" * 64)
+    cache.set("c" * 64, "C")
+    assert cache.get("b" * 64) is None
+    assert cache.get("a" * 64) == "A"
+    assert cache.get("c" * 64) == "C"
+    assert len(cache) == 2
+
+
+def test_cache_ttl_expires_entries(tmp_path):
+    """Test entries older than the TTL are treated as misses."""
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.set("a" * 64, "A")
+    with patch("morewritings.cache.time.time", return_value=time.time() + 120):
+        assert cache.get("a" * 64) is None
+    assert len(cache) == 0
+
+
+def test_generator_serves_repeats_from_cache(tmp_path):
+    """Test identical requests only reach the API once."""
+    with patch('morewritings.clients.OpenAI') as openai:
+        client = openai.return_value
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Generated content"
+        client.chat.completions.create.return_value = response
+        
+        generator = ProfileGenerator(api_key='test-key', cache=ResponseCache(tmp_path))
+        first = generator.generate(prompt="A wizard", name="Merlin")
+        second = generator.generate(prompt="A wizard", name="Merlin")
+    
+    assert first.description == second.description == "Generated content"
+    assert client.chat.completions.create.call_count == 1
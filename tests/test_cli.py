@@ -4,7 +4,7 @@ Tests for CLI commands (mocked).
 import pytest
 import json
 from click.testing import CliRunner
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from morewritings.cli import cli
 from morewritings.models import Scene, Profile, Scenery
 
@@ -18,9 +18,9 @@ def runner():
 @pytest.fixture
 def mock_generators():
     """Mock all generators."""
-    with patch('morewritings.cli.SceneGenerator') as scene_gen, \
-         patch('morewritings.cli.ProfileGenerator') as profile_gen, \
-         patch('morewritings.cli.SceneryGenerator') as scenery_gen:
+    with patch('morewritings.generators.SceneGenerator') as scene_gen, \
+         patch('morewritings.generators.ProfileGenerator') as profile_gen, \
+         patch('morewritings.generators.SceneryGenerator') as scenery_gen:
         
         # Mock scene generator
         scene_instance = MagicMock()
@@ -30,6 +30,7 @@ def mock_generators():
             characters=["Alice"],
             genre="test"
         )
+        scene_instance.agenerate = AsyncMock(return_value=scene_instance.generate.return_value)
         scene_gen.return_value = scene_instance
         
         # Mock profile generator
@@ -38,6 +39,7 @@ def mock_generators():
             name="Test Character",
             description="Test description"
         )
+        profile_instance.agenerate = AsyncMock(return_value=profile_instance.generate.return_value)
         profile_gen.return_value = profile_instance
         
         # Mock scenery generator
@@ -47,6 +49,7 @@ def mock_generators():
             location_type="outdoor",
             description="Test description"
         )
+        scenery_instance.agenerate = AsyncMock(return_value=scenery_instance.generate.return_value)
         scenery_gen.return_value = scenery_instance
         
         yield {
@@ -132,3 +135,106 @@ def test_generate_scene_with_output(runner, mock_generators, tmp_path):
         data = json.load(f)
         assert data['title'] == 'Test Scene'
         assert data['content'] == 'Test content'
+
+
+def test_batch_generate_concurrent(runner, mock_generators, tmp_path):
+    """Test batch generation numbers outputs by batch position."""
+    batch_file = tmp_path / "batch.json"
+    batch_file.write_text(json.dumps([
+        {"type": "scene", "prompt": "One"},
+        {"type": "profile", "prompt": "Two", "name": "Pip"},
+        {"type": "scenery", "prompt": "Three"},
+        {"type": "scene", "prompt": "Four"},
+    ]))
+    output_dir = tmp_path / "out"
+    result = runner.invoke(cli, [
+        'batch-generate',
+        str(batch_file),
+        '--output-dir', str(output_dir),
+        '--concurrency', '3',
+        '--api-key', 'test-key'
+    ])
+    assert result.exit_code == 0
+    assert sorted(p.name for p in output_dir.glob('*.json')) == [
+        'profile_002.json', 'scene_001.json', 'scene_004.json', 'scenery_003.json'
+    ]
+    assert mock_generators['scene'].agenerate.await_count == 2
+
+
+def test_batch_generate_resume_skips_completed(runner, mock_generators, tmp_path):
+    """Test --resume only generates items missing from the journal."""
+    batch_file = tmp_path / "batch.json"
+    batch_file.write_text(json.dumps([
+        {"type": "scene", "prompt": "One"},
+        {"type": "scene", "prompt": "Two"},
+        {"type": "scene", "prompt": "Three"},
+    ]))
+    output_dir = tmp_path / "out"
+    args = ['batch-generate', str(batch_file), '--output-dir', str(output_dir),
+            '--api-key', 'test-key']
+    assert runner.invoke(cli, args).exit_code == 0
+    (output_dir / 'scene_002.json').unlink()
+    mock_generators['scene'].agenerate.reset_mock()
+    
+    result = runner.invoke(cli, args + ['--resume'])
+    assert result.exit_code == 0
+    assert 'Resuming: 2 items already completed' in result.output
+    mock_generators['scene'].agenerate.assert_awaited_once()
+    assert mock_generators['scene'].agenerate.await_args.kwargs['prompt'] == 'Two'
+    assert (output_dir / 'scene_002.json').exists()
+
+
+def test_generate_scene_stream(runner, mock_generators):
+    """Test --stream echoes chunks and reports time to first token."""
+    scene_stream = MagicMock()
+    scene_stream.__iter__.return_value = iter(["Chunk one, ", "chunk two"])
+    scene_stream.preview = Scene(title="Test Scene", content="")
+    scene_stream.result = Scene(title="Test Scene", content="Chunk one, chunk two")
+    scene_stream.time_to_first_token = 0.25
+    scene_stream.elapsed = 1.5
+    mock_generators['scene'].generate.return_value = scene_stream
+    
+    result = runner.invoke(cli, [
+        'generate-scene',
+        'Test prompt',
+        '--stream',
+        '--api-key', 'test-key'
+    ])
+    assert result.exit_code == 0
+    assert 'SCENE: Test Scene' in result.output
+    assert 'Chunk one, chunk two' in result.output
+    assert 'Time to first token: 0.25s' in result.output
+
+
+def test_batch_generate_continues_after_failure(runner, mock_generators, tmp_path):
+    """Test failed items are recorded while the rest of the batch completes."""
+    from morewritings.retry import GenerationError
+    mock_generators['scene'].agenerate.side_effect = [
+        GenerationError("Failed to generate content: boom"),
+        Scene(title="Second", content="ok")
+    ]
+    batch_file = tmp_path / "batch.json"
+    batch_file.write_text(json.dumps([
+        {"type": "scene", "prompt": "One"},
+        {"type": "scene", "prompt": "Two"},
+    ]))
+    output_dir = tmp_path / "out"
+    result = runner.invoke(cli, [
+        'batch-generate', str(batch_file), '--output-dir', str(output_dir), '--api-key', 'test-key'
+    ])
+    assert result.exit_code == 1
+    assert 'Failed scene 1' in result.output
+    assert '1 items failed' in result.output
+    assert [p.name for p in output_dir.glob('*.json')] == ['scene_002.json']
+
+
+def test_batch_generate_from_stdin(runner, mock_generators, tmp_path):
+    """Test JSONL batches can be piped through stdin."""
+    output_dir = tmp_path / "out"
+    lines = "\n".join(json.dumps({"type": "scenery", "prompt": f"Place {i}"}) for i in range(1, 4))
+    result = runner.invoke(cli, [
+        'batch-generate', '-', '--output-dir', str(output_dir), '--api-key', 'test-key'
+    ], input=lines)
+    assert result.exit_code == 0
+    assert 'Generating scenery 3...' in result.output
+    assert len(list(output_dir.glob('scenery_*.json'))) == 3
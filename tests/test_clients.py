@@ -0,0 +1,59 @@
+"""
+Tests for the shared client pool.
+"""
+import asyncio
+from morewritings.clients import ClientPool, PoolConfig, configure_pool, get_pool
+from morewritings.generators import SceneGenerator, ProfileGenerator
+from morewritings.testing import MockOpenAIServer
+
+
+def test_generators_share_one_http_client():
+    """Test generators from the same pool reuse a single HTTP transport."""
+    pool = ClientPool()
+    scene = SceneGenerator(api_key='key-one', pool=pool)
+    profile = ProfileGenerator(api_key='key-two', pool=pool)
+    assert scene.client._client is pool.http_client
+    assert profile.client._client is pool.http_client
+    assert scene.client.max_retries == 0
+    pool.close()
+
+
+def test_async_client_is_per_event_loop():
+    """Test async transports are recreated for each event loop."""
+    pool = ClientPool()
+    
+    async def transport():
+        return pool.async_client('key')._client
+    
+    first = asyncio.run(transport())
+    second = asyncio.run(transport())
+    assert first is not second
+
+
+def test_generator_reused_across_event_loops(monkeypatch):
+    """Test a generator's async client follows the pool to each new event loop."""
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        generator = SceneGenerator(api_key='test-key', pool=ClientPool(), structured=False)
+        scenes = [asyncio.run(generator.agenerate(f"Scene {i}")) for i in range(2)]
+    assert [scene.content for scene in scenes] == ["the lantern flickered"] * 2
+    assert len(server.requests) == 2
+
+
+def test_pool_config_applies_limits_and_timeouts():
+    """Test pool settings reach the HTTP client."""
+    config = PoolConfig(max_connections=7, connect_timeout=2.0, read_timeout=30.0)
+    assert config.limits().max_connections == 7
+    assert config.timeout().connect == 2.0
+    assert config.timeout().read == 30.0
+    stats = ClientPool(config).stats()
+    assert stats["requests"] == 0
+    assert stats["max_connections"] == 7
+
+
+def test_configure_pool_replaces_default():
+    """Test configure_pool swaps the process-wide pool."""
+    pool = configure_pool(PoolConfig(max_connections=3))
+    assert get_pool() is pool
+    assert SceneGenerator(api_key='key').pool is pool
+    configure_pool(PoolConfig())
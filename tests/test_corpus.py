@@ -0,0 +1,110 @@
+"""
+Tests for the append-only corpus store.
+"""
+import gzip
+import json
+import pytest
+import yaml
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.corpus import Corpus, MissingRecordError
+from morewritings.models import Profile, Scene, Scenery
+from morewritings.testing import MockOpenAIServer
+
+
+def profile(i):
+    return Profile(name=f"Person {i}", description="x" * 40)
+
+
+def test_records_are_found_by_key_across_segments(tmp_path):
+    """Test records roll over into new segments and are read back by key after reopening."""
+    with Corpus(tmp_path, max_segment_bytes=500) as corpus:
+        for i in range(12, 0, -1):
+            corpus.append(f"profile_{i:03d}", "profile", profile(i), position=i)
+        corpus.append("scene_013", "scene", Scene(title="T", content="Once"), position=13)
+        corpus.append("profile_005", "profile", profile(50), position=5)
+        assert len(corpus.segments()) > 1
+
+    with Corpus(tmp_path) as corpus:
+        assert len(corpus) == 13 and "profile_007" in corpus
+        assert corpus.get("profile_007").name == "Person 7"
+        assert corpus.get("profile_005").name == "Person 50"
+        assert isinstance(corpus.get("scene_013"), Scene)
+        assert json.loads(corpus.raw("profile_003"))["name"] == "Person 3"
+        assert corpus.keys()[:2] == ["profile_001", "profile_002"]
+        assert corpus.keys("scene") == ["scene_013"]
+        with pytest.raises(MissingRecordError):
+            corpus.get("profile_099")
+
+
+def test_gzip_segments_decompress_to_json_lines(tmp_path):
+    """Test each gzip record is readable alone and a segment is a valid gzip stream."""
+    with Corpus(tmp_path, compression="gzip") as corpus:
+        sha = corpus.append("scenery_001", "scenery",
+                            Scenery(name="Dock", description="Fog", location_type="harbor"))
+        corpus.append("profile_002", "profile", profile(2))
+        assert corpus.get("scenery_001").location_type == "harbor"
+        assert corpus.checksums()["scenery_001"] == sha
+        (segment,) = corpus.segments()
+    with gzip.open(tmp_path / segment) as f:
+        assert [json.loads(line)["name"] for line in f] == ["Dock", "Person 2"]
+    with pytest.raises(ValueError):
+        Corpus(tmp_path, compression="lz4")
+
+
+def test_load_materializes_lazily_and_commits_in_batches(tmp_path, monkeypatch):
+    """Test load parses only accessed records, and other readers see records once committed."""
+    corpus = Corpus(tmp_path, commit_every=5)
+    for i in range(1, 8):
+        corpus.append(f"profile_{i:03d}", "profile", profile(i), position=i)
+    with Corpus(tmp_path) as reader:
+        assert len(reader) == 5
+        corpus.flush()
+        assert len(reader) == 7
+
+    parsed = []
+    model = Corpus._model
+    monkeypatch.setattr(Corpus, "_model",
+                        lambda self, t, data: parsed.append(t) or model(self, t, data))
+    records = corpus.load("profile")
+    assert len(records) == 7 and parsed == []
+    assert records[3].name == "Person 4" and parsed == ["profile"]
+    assert [p.name for p in records[5:]] == ["Person 6", "Person 7"]
+    assert records.keys[0] == "profile_001"
+    assert len(list(records.raw())) == 7 and len(parsed) == 3
+    corpus.close()
+
+
+def test_cli_batch_corpus_resume_and_export(monkeypatch, tmp_path):
+    """Test batch-generate --corpus resumes from the store, and corpus list/show/export read it."""
+    batch = tmp_path / "story.yaml"
+    batch.write_text(yaml.safe_dump([
+        {"type": "scene", "prompt": "The heist", "depends_on": ["pip"]},
+        {"type": "profile", "id": "pip", "prompt": "An orphan thief", "name": "Pip"},
+    ]))
+    output = tmp_path / "out"
+    args = ["batch-generate", str(batch), "-o", str(output), "--corpus", "--compression", "gzip",
+            "--no-cache", "--api-key", "test-key"]
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        result = CliRunner().invoke(cli, args + ["--resume"])
+        assert result.exit_code == 0, result.output
+    assert "Resuming: 2 items already completed" in result.output
+    assert len(server.requests) == 2
+    assert not list(output.glob("*.json"))
+
+    runner = CliRunner()
+    result = runner.invoke(cli, ["corpus", "list", str(output)])
+    assert result.output.split() == ["scene_001", "scene", "profile_002", "profile"]
+    result = runner.invoke(cli, ["corpus", "show", str(output), "scene_001"])
+    assert json.loads(result.output)["characters"] == ["Pip"]
+    result = runner.invoke(cli, ["corpus", "export", str(output), "-", "--type", "profile"])
+    assert [json.loads(line)["name"] for line in result.output.splitlines()] == ["Pip"]
+    result = runner.invoke(cli, ["corpus", "export", str(output), str(tmp_path / "files"),
+                                 "--format", "files"])
+    assert result.exit_code == 0, result.output
+    assert sorted(p.name for p in (tmp_path / "files").iterdir()) == [
+        "profile_002.json", "scene_001.json"
+    ]
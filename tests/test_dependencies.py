@@ -0,0 +1,174 @@
+"""
+Tests for batch items that depend on other items.
+"""
+import asyncio
+import json
+import yaml
+from click.testing import CliRunner
+from pathlib import Path
+from morewritings.batch import MANIFEST_NAME, DependencyError, Shard, dependency_groups, run_batch
+from morewritings.cli import cli
+from morewritings.models import Profile, Scenery
+from morewritings.testing import MockOpenAIServer
+
+
+class FakeGenerator:
+    """Generator stand-in returning a model of its type after ``delay`` seconds."""
+
+    def __init__(self, kind, log, delay=0.01):
+        self.kind = kind
+        self.log = log
+        self.delay = delay
+        self.calls = {}
+
+    async def agenerate(self, prompt, **kwargs):
+        self.log.append(("start", prompt))
+        self.calls[prompt] = kwargs
+        await asyncio.sleep(self.delay)
+        if prompt.startswith("fail"):
+            raise RuntimeError(f"{prompt} broke")
+        self.log.append(("end", prompt))
+        if self.kind == "profile":
+            return Profile(name=prompt, description=f"About {prompt}")
+        if self.kind == "scenery":
+            return Scenery(name=prompt, description=f"About {prompt}", location_type="city")
+        return prompt
+
+
+def run(items, concurrency=4, delays=None, resolved=None):
+    log, results, errors = [], {}, {}
+    generators = {
+        kind: FakeGenerator(kind, log, (delays or {}).get(kind, 0.01))
+        for kind in ("scene", "profile", "scenery")
+    }
+    asyncio.run(run_batch(
+        list(enumerate(items, 1)), generators, concurrency=concurrency,
+        on_result=lambda i, t, r: results.__setitem__(i, r),
+        on_error=lambda i, t, e: errors.__setitem__(i, e),
+        resolved=resolved
+    ))
+    return generators, log, results, errors
+
+
+def test_scene_waits_for_and_receives_dependencies():
+    """Test a scene runs after its dependencies, with their results, while others proceed."""
+    items = [
+        {"type": "scene", "prompt": "meeting", "characters": ["Cara"],
+         "depends_on": ["pip", "sky"]},
+        {"type": "profile", "id": "pip", "prompt": "Pip"},
+        {"type": "scenery", "id": "sky", "prompt": "Skyreach"},
+        {"type": "scene", "prompt": "unrelated"},
+    ]
+    generators, log, results, errors = run(items, delays={"scenery": 0.05})
+    assert not errors and sorted(results) == [1, 2, 3, 4]
+    starts = [prompt for event, prompt in log if event == "start"]
+    assert starts == ["Pip", "Skyreach", "unrelated", "meeting"]
+    assert log.index(("start", "meeting")) == log.index(("end", "Skyreach")) + 1
+
+    options = generators["scene"].calls["meeting"]
+    assert options["characters"][0] == "Cara"
+    assert options["characters"][1].description == "About Pip"
+    assert options["scenery"].name == "Skyreach"
+    assert "depends_on" not in options and "id" not in options
+
+
+def test_failures_cascade_and_bad_graphs_are_reported():
+    """Test dependents of failed items fail, as do unknown and cyclic dependencies."""
+    items = [
+        {"type": "profile", "id": "a", "prompt": "fail a"},
+        {"type": "profile", "id": "b", "prompt": "b", "depends_on": "a"},
+        {"type": "scene", "prompt": "c", "depends_on": ["b"]},
+        {"type": "scene", "prompt": "d", "depends_on": ["ghost"]},
+        {"type": "scene", "id": "e", "prompt": "e", "depends_on": ["f"]},
+        {"type": "scene", "id": "f", "prompt": "f", "depends_on": ["e"]},
+        {"type": "scene", "prompt": "g", "depends_on": ["pip"]},
+    ]
+    _, log, results, errors = run(items, resolved={"pip": None})
+    assert list(results) == [7]
+    assert sorted(errors) == [1, 2, 3, 4, 5, 6]
+    assert isinstance(errors[3], DependencyError)
+    assert str(errors[3]) == "Depends on failed item 'b'"
+    assert "unknown item 'ghost'" in str(errors[4])
+    assert "Dependency cycle" in str(errors[5])
+    assert [p for e, p in log if e == "start"] == ["fail a", "g"]
+
+
+def test_forward_references_and_ordering_only_dependencies():
+    """Test an item may depend on a later one and non-scene dependents just wait."""
+    items = [
+        {"type": "profile", "prompt": "apprentice", "depends_on": ["master"]},
+        {"type": "profile", "id": "master", "prompt": "master"},
+    ]
+    generators, log, results, errors = run(items, concurrency=1)
+    assert not errors
+    assert [p for e, p in log if e == "start"] == ["master", "apprentice"]
+    assert generators["profile"].calls["apprentice"] == {}
+
+
+def test_cli_casts_generated_entities_and_resumes(monkeypatch, tmp_path):
+    """Test batch-generate feeds profiles and scenery into scenes, also after --resume."""
+    batch = tmp_path / "story.yaml"
+    batch.write_text(yaml.safe_dump([
+        {"type": "scene", "prompt": "The heist", "depends_on": ["pip", "skyreach"]},
+        {"type": "profile", "id": "pip", "prompt": "An orphan thief", "name": "Pip"},
+        {"type": "scenery", "id": "skyreach", "prompt": "A floating city", "name": "Skyreach",
+         "location_type": "sci-fi"},
+    ]))
+    output = tmp_path / "out"
+    args = ["batch-generate", str(batch), "-o", str(output), "-c", "4",
+            "--no-cache", "--api-key", "test-key"]
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        scene = json.loads((output / "scene_001.json").read_text())
+        assert (scene["characters"], scene["scenery"]) == (["Pip"], "Skyreach")
+        prompt = server.requests[-1]["body"]["messages"][1]["content"]
+        assert "Pip: the lantern flickered" in prompt
+        assert "Skyreach (sci-fi): the lantern flickered" in prompt
+
+        (output / "scene_001.json").unlink()
+        result = CliRunner().invoke(cli, args + ["--resume"])
+        assert result.exit_code == 0, result.output
+    assert len(server.requests) == 4
+    assert server.requests[-1]["body"]["messages"][1]["content"] == prompt
+
+
+def test_dependency_groups_keep_linked_items_in_one_shard():
+    """Test items linked by depends_on, even through forward references, share a group."""
+    items = [
+        {"type": "scene", "depends_on": ["b"]},
+        {"type": "profile", "id": "a"},
+        {"type": "profile", "id": "b", "depends_on": "a"},
+        {"type": "scene"},
+        {"type": "scene", "depends_on": ["a", "ghost"]},
+        {"type": "profile", "id": "c"},
+    ]
+    groups = dependency_groups(items)
+    assert groups == {1: 1, 2: 1, 3: 1, 5: 1}
+    shard = Shard(2, 2)
+    assert [i for i in range(1, 7) if groups.get(i, i) in shard] == [4, 6]
+
+
+def test_cli_workers_run_dependency_example(monkeypatch, tmp_path):
+    """Test --workers keeps dependents with their dependencies, also across --resume."""
+    example = Path(__file__).parent.parent / "examples" / "story_dependencies.yaml"
+    output = tmp_path / "out"
+    args = ["batch-generate", str(example), "-o", str(output), "--workers", "2",
+            "--no-cache", "--api-key", "test-key"]
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, args)
+        assert result.exit_code == 0, result.output
+        count = len(yaml.safe_load(example.read_text()))
+        assert f"Manifest of {count} items written" in result.output
+        assert len(server.requests) == count
+        scene = json.loads((output / "scene_005.json").read_text())
+        assert scene["characters"] == ["Pip", "Professor Eleanor Gearsmith"]
+
+        (output / "scene_005.json").unlink()
+        result = CliRunner().invoke(cli, args + ["--resume"])
+        assert result.exit_code == 0, result.output
+    assert len(server.requests) == count + 1
+    manifest = (output / MANIFEST_NAME).read_text().splitlines()
+    assert [json.loads(line)["index"] for line in manifest] == list(range(1, count + 1))
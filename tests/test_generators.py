@@ -1,8 +1,9 @@
 """
 Tests for generators (mocked).
 """
+import asyncio
 import pytest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import Mock, patch, MagicMock, AsyncMock
 from morewritings.generators import SceneGenerator, ProfileGenerator, SceneryGenerator
 from morewritings.models import Scene, Profile, Scenery
 
@@ -10,7 +11,7 @@ from morewritings.models import Scene, Profile, Scenery
 @pytest.fixture
 def mock_openai_client():
     """Mock OpenAI client."""
-    with patch('morewritings.generators.OpenAI') as mock:
+    with patch('morewritings.clients.OpenAI') as mock:
         client = MagicMock()
         mock.return_value = client
         
@@ -85,3 +86,55 @@ def test_scenery_generation(mock_openai_client):
         assert scenery.location_type == "outdoor"
         assert scenery.mood == "peaceful"
         assert scenery.description == "Generated content"
+
+
+def test_scene_agenerate():
+    """Test async scene generation uses the async client."""
+    response = MagicMock()
+    response.choices = [MagicMock()]
+    response.choices[0].message.content = "Async content"
+    with patch('morewritings.clients.OpenAI'), \
+         patch('morewritings.clients.AsyncOpenAI') as async_openai:
+        async_openai.return_value.chat.completions.create = AsyncMock(return_value=response)
+        generator = SceneGenerator(api_key='test-key')
+        scene = asyncio.run(generator.agenerate(prompt="Test prompt", title="Async Scene"))
+    
+    assert scene.title == "Async Scene"
+    assert scene.content == "Async content"
+
+
+def test_profile_stream(mock_openai_client):
+    """Test streaming yields chunks and assembles the final profile."""
+    chunks = []
+    for text in ["Once ", None, "upon a time"]:
+        chunk = MagicMock()
+        chunk.choices[0].delta.content = text
+        chunks.append(chunk)
+    mock_openai_client.chat.completions.create.return_value = iter(chunks)
+    
+    generator = ProfileGenerator(api_key='test-key')
+    profile_stream = generator.generate(prompt="Test prompt", name="Pip", stream=True)
+    
+    assert profile_stream.preview.name == "Pip"
+    assert list(profile_stream) == ["Once ", "upon a time"]
+    assert profile_stream.result.description == "Once upon a time"
+    assert profile_stream.time_to_first_token is not None
+    assert mock_openai_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+def test_prompts_lead_with_shared_context(mock_openai_client):
+    """Test style guide and shared details precede the per-request prompt."""
+    generator = SceneGenerator(api_key='test-key', style_guide="Show, don't tell.\n")
+    for prompt in ("A duel at dawn", "A truce at dusk"):
+        generator.generate(prompt=prompt, characters=["Alice", "Bob"], genre="fantasy",
+                           mood="tense")
+    calls = mock_openai_client.chat.completions.create.call_args_list
+    shared = "Genre: fantasy\nMood/Tone: tense\nCharacters involved: Alice, Bob\n\n"
+    system, user = calls[0].kwargs["messages"]
+    assert system["content"].endswith("\n\nStyle guide:\nShow, don't tell.")
+    assert user["content"] == shared + "A duel at dawn"
+    assert calls[1].kwargs["messages"][1]["content"] == shared + "A truce at dusk"
+    
+    SceneryGenerator(api_key='test-key').generate(prompt="A harbor", location_type="outdoor")
+    scenery_prompt = mock_openai_client.chat.completions.create.call_args.kwargs["messages"][1]
+    assert scenery_prompt["content"] == "Describe a setting/location.\n\nType: outdoor\n\nA harbor"
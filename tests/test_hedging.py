@@ -0,0 +1,118 @@
+"""
+Tests for hedged requests.
+"""
+import asyncio
+import json
+import time
+import pytest
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.generators import SceneGenerator
+from morewritings.hedging import HedgePolicy
+from morewritings.telemetry import MetricsRecorder
+from morewritings.testing import MockOpenAIServer
+
+
+def warmed_policy(latency=0.01, count=20, **kwargs):
+    """Policy that has already seen ``count`` requests of ``latency`` seconds."""
+    policy = HedgePolicy(**kwargs)
+    for _ in range(count):
+        policy.observe(latency)
+    return policy
+
+
+def test_delay_follows_percentile_and_rate_is_capped():
+    """Test the trigger waits for history and hedges stay within the rate cap."""
+    policy = HedgePolicy(percentile=90, max_rate=0.1)
+    assert policy.delay() is None
+    for i in range(1, 21):
+        policy.observe(i / 10)
+    assert policy.delay() == pytest.approx(1.8)
+
+    assert policy.allow()
+    policy.observe(0.5, hedged=True)
+    policy.observe(0.5, hedged=True)
+    assert not policy.allow()
+    assert policy.hedge_rate == pytest.approx(2 / 22)
+
+    with pytest.raises(ValueError):
+        HedgePolicy(percentile=100)
+
+
+def test_state_survives_save_and_load(tmp_path):
+    """Test the request window is restored from disk and bad files are ignored."""
+    path = tmp_path / "state" / "hedging.json"
+    warmed_policy(0.2).save(path)
+    assert HedgePolicy().load(path).delay() == pytest.approx(0.2)
+
+    path.write_text("not json")
+    assert HedgePolicy().load(path).delay() is None
+    assert HedgePolicy().load(tmp_path / "missing.json").delay() is None
+
+
+def test_async_hedge_wins_and_cancels_slow_request(monkeypatch):
+    """Test a slow first request is raced by a hedge, which wins and cancels it."""
+    calls = []
+    cancelled = []
+
+    async def acomplete(request, metrics=None):
+        calls.append(time.perf_counter())
+        if len(calls) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return "The hedge"
+
+    recorder = MetricsRecorder()
+    generator = SceneGenerator(api_key='test-key', hedge=warmed_policy(), telemetry=recorder,
+                               structured=False)
+    monkeypatch.setattr(generator, "_acomplete", acomplete)
+    started = time.perf_counter()
+    scene = asyncio.run(generator.agenerate("A duel"))
+    assert time.perf_counter() - started < 1
+    assert scene.content == "The hedge"
+    assert len(calls) == 2 and cancelled == [True]
+    assert recorder.summary()["hedged"] == 1
+    assert generator.hedge.hedge_rate == pytest.approx(1 / 21)
+
+
+def test_sync_hedge_and_rate_cap(monkeypatch):
+    """Test blocking calls hedge in a thread, and no hedge is sent past the cap."""
+    calls = []
+
+    def complete(request, metrics=None):
+        calls.append(request)
+        time.sleep(0.3 if len(calls) == 1 else 0)
+        return f"Reply {len(calls)}"
+
+    generator = SceneGenerator(api_key='test-key', hedge=warmed_policy(), structured=False)
+    monkeypatch.setattr(generator, "_complete", complete)
+    assert generator.generate("A duel", distinct=True).content == "Reply 2"
+
+    calls.clear()
+    generator.hedge = warmed_policy(max_rate=0)
+    assert generator.generate("A feast", distinct=True).content == "Reply 1"
+    assert len(calls) == 1
+
+
+def test_cli_hedge_keeps_state_in_cache_dir(monkeypatch, tmp_path):
+    """Test generate-scene --hedge records latencies across runs, except with --no-cache."""
+    def args(prompt, *extra):
+        return ["generate-scene", prompt, "--hedge", "--cache-dir", str(tmp_path),
+                "--api-key", "test-key", "-o", str(tmp_path / "scene.json"), *extra]
+
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        for prompt in ("A duel", "A feast"):
+            result = CliRunner().invoke(cli, args(prompt))
+            assert result.exit_code == 0, result.output
+        result = CliRunner().invoke(cli, args("A chase", "--no-cache"))
+        assert result.exit_code == 0, result.output
+    state = json.loads((tmp_path / "hedging.json").read_text())
+    assert len(state["requests"]) == 2
+
+    result = CliRunner().invoke(cli, args("A duel", "--stream"))
+    assert result.exit_code != 0
+    assert "--hedge cannot be combined with --stream" in result.output
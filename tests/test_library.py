@@ -0,0 +1,129 @@
+"""
+Tests for the profile/scenery library.
+"""
+import json
+import pytest
+from unittest.mock import MagicMock, patch
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.generators import SceneGenerator
+from morewritings.library import Library, MissingEntityError, load_entity
+from morewritings.models import Profile, Scenery
+
+
+@pytest.fixture
+def library(tmp_path):
+    """Library with two profiles and two scenery entries."""
+    with Library(tmp_path / "library.db") as library:
+        library.add_all([
+            Profile(name="Aria", description="A young mage", traits=["brave", "curious"]),
+            Profile(name="Brom", description="A gruff smith", traits=["Brave", "stubborn"]),
+            Scenery(name="Old Mill", description="A creaking mill", location_type="outdoor",
+                    mood="eerie"),
+            Scenery(name="Great Hall", description="A feasting hall", location_type="indoor",
+                    mood="festive"),
+        ])
+        yield library
+
+
+def test_lookup_is_case_insensitive_and_upserts(library):
+    """Test names are matched case-insensitively and re-adding replaces an entity."""
+    assert library.profile("aria").description == "A young mage"
+    assert library.scenery("OLD MILL").mood == "eerie"
+    assert library.profile("Nobody") is None
+
+    library.add(Profile(name="ARIA", description="An older mage", traits=["wise"]))
+    assert library.counts() == {"profiles": 2, "scenery": 2}
+    assert library.profile("Aria").description == "An older mage"
+    assert [p.name for p in library.find_profiles(trait="curious")] == []
+
+    assert [p.name for p in library.profiles(["brom", "aria"])] == ["Brom", "ARIA"]
+    with pytest.raises(MissingEntityError, match="'Zed'"):
+        library.profiles(["Aria", "Zed"])
+
+
+def test_indexed_queries(library):
+    """Test profiles are found by trait and scenery by location type and mood."""
+    assert [p.name for p in library.find_profiles(trait="brave")] == ["Aria", "Brom"]
+    assert [p.name for p in library.find_profiles()] == ["Aria", "Brom"]
+    assert [s.name for s in library.find_scenery(location_type="Indoor")] == ["Great Hall"]
+    assert [s.name for s in library.find_scenery(mood="eerie")] == ["Old Mill"]
+    assert list(library.find_scenery(location_type="indoor", mood="eerie")) == []
+    plan = library._db.execute(
+        "EXPLAIN QUERY PLAN SELECT profile_id FROM profile_traits WHERE trait = ?", ("x",)
+    ).fetchall()
+    assert "profile_traits_trait" in str(plan)
+
+    assert library.remove("old mill")
+    assert not library.remove("old mill")
+    assert library.counts()["scenery"] == 1
+
+
+def test_import_generated_files(tmp_path):
+    """Test import stores profiles and scenery and skips scene files."""
+    profile = tmp_path / "profile_001.json"
+    profile.write_text(json.dumps({"name": "Merlin", "description": "A wizard"}))
+    scenery = tmp_path / "scenery_002.json"
+    scenery.write_text(json.dumps({"name": "Skyreach", "description": "A floating city",
+                                   "location_type": "fantasy"}))
+    scene = tmp_path / "scene_003.json"
+    scene.write_text(json.dumps({"title": "Forest", "content": "Text"}))
+    assert load_entity(scene) is None
+
+    db = tmp_path / "library.db"
+    result = CliRunner().invoke(cli, ["library", "import", str(profile), str(scenery),
+                                      str(scene), "--library", str(db)])
+    assert result.exit_code == 0, result.output
+    assert "Imported 2 entities (1 files skipped)" in result.output
+
+    result = CliRunner().invoke(cli, ["library", "list", "--location-type", "fantasy",
+                                      "--library", str(db)])
+    assert result.output.strip() == "scenery  Skyreach (fantasy)"
+
+
+@patch('morewritings.clients.OpenAI')
+def test_scene_prompt_describes_stored_entities(mock_openai, library):
+    """Test stored profiles and scenery are described in the prompt and named in the scene."""
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content="A scene"))]
+    mock_client.chat.completions.create.return_value = mock_response
+
+    generator = SceneGenerator(api_key='test-key')
+    scene = generator.generate(
+        "A meeting",
+        characters=["Cara", *library.profiles(["Aria"])],
+        scenery=library.scenery("Old Mill")
+    )
+    assert scene.characters == ["Cara", "Aria"]
+    assert scene.scenery == "Old Mill"
+
+    prompt = mock_client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+    assert "Characters involved: Cara, Aria" in prompt
+    assert "Aria: A young mage Traits: brave, curious." in prompt
+    assert "Old Mill (outdoor): A creaking mill\nMood: eerie" in prompt
+
+
+@patch('morewritings.clients.OpenAI')
+def test_cli_resolves_library_names(mock_openai, library, tmp_path):
+    """Test generate-scene --profile/--setting look up the library and reject unknown names."""
+    mock_client = MagicMock()
+    mock_openai.return_value = mock_client
+    mock_response = MagicMock()
+    mock_response.choices = [MagicMock(message=MagicMock(content="A scene"))]
+    mock_client.chat.completions.create.return_value = mock_response
+    output = tmp_path / "scene.json"
+    args = ["generate-scene", "A duel", "--library", str(library.path), "--no-cache",
+            "--api-key", "test-key", "-o", str(output)]
+
+    result = CliRunner().invoke(cli, args + ["--profile", "aria", "--profile", "Brom",
+                                             "--setting", "great hall"])
+    assert result.exit_code == 0, result.output
+    scene = json.loads(output.read_text())
+    assert scene["characters"] == ["Aria", "Brom"]
+    assert scene["scenery"] == "Great Hall"
+
+    result = CliRunner().invoke(cli, args + ["--profile", "Zed"])
+    assert result.exit_code != 0
+    assert "No profile named 'Zed' in the library" in result.output
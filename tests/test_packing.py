@@ -0,0 +1,118 @@
+"""
+Tests for packing several batch items into one completion.
+"""
+import asyncio
+import json
+from click.testing import CliRunner
+from morewritings.batch import pack_items, run_batch
+from morewritings.cli import cli
+from morewritings.generators import ProfileGenerator, SceneryGenerator
+from morewritings.testing import MockOpenAIServer
+
+
+def generators():
+    return {
+        "profile": ProfileGenerator(api_key='test-key', structured=True),
+        "scenery": SceneryGenerator(api_key='test-key', structured=True),
+    }
+
+
+def test_packs_sized_by_output_budget():
+    """Test packs hold as many items as fit the token budget, per type."""
+    items = [(i, {"type": "scenery", "prompt": f"Place {i}"}) for i in range(1, 8)]
+    items.insert(2, (100, {"type": "profile", "prompt": "A knight"}))
+    items.insert(4, (101, {"type": "scenery", "prompt": "Place", "distinct": True}))
+    items.append((102, {"type": "poem", "prompt": "x"}))
+
+    # Default budgets: scenery 600 (three fit), profile 1000 (one fits)
+    packs = list(pack_items(items, generators(), pack_tokens=1800))
+    assert [[i for i, _ in pack] for pack in packs] == [
+        [100], [1, 2, 3], [101], [4, 5, 6], [102], [7]
+    ]
+    assert [len(p) for p in pack_items(items[:3], generators(), 100000, max_items=2)] == [2, 1]
+
+
+def test_batch_generates_packs_in_one_call(monkeypatch, tmp_path):
+    """Test packed items share a completion and are written as separate files."""
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text("\n".join(
+        json.dumps({"type": "scenery", "prompt": f"Place {i}", "name": f"Place {i}"})
+        for i in range(1, 8)
+    ))
+    monkeypatch.setenv("MOREWRITINGS_MODEL", "gpt-4o")
+    with MockOpenAIServer(completion_tokens=6) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, [
+            "batch-generate", str(batch), "-o", str(tmp_path / "out"), "--no-cache",
+            "--pack-tokens", "1800", "--api-key", "test-key"
+        ])
+    assert result.exit_code == 0, result.output
+    assert "Generated 7 items" in result.output
+    assert len(server.requests) == 3
+
+    first = server.requests[0]["body"]
+    assert first["response_format"]["json_schema"]["schema"]["properties"]["items"]["minItems"] == 3
+    assert first["max_tokens"] == 1800
+    prompt = first["messages"][1]["content"]
+    assert prompt.startswith("Write one item for each numbered request")
+    assert "Request 3:\nDescribe a setting/location.\n\nPlace 3" in prompt
+
+    for i in range(1, 8):
+        scenery = json.loads((tmp_path / "out" / f"scenery_{i:03d}.json").read_text())
+        assert scenery["name"] == f"Place {i}"
+        assert scenery["description"] == "the lantern flickered as rain traced"
+
+
+def test_pack_falls_back_to_single_requests(monkeypatch):
+    """Test a model without JSON schemas gets the pack's items one at a time."""
+    results = {}
+    with MockOpenAIServer(completion_tokens=6, json_schema=False) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        items = [(i, {"type": "profile", "prompt": f"Person {i}"}) for i in range(1, 4)]
+        asyncio.run(run_batch(
+            items, generators(), pack_tokens=5000,
+            on_result=lambda i, t, r: results.__setitem__(i, r)
+        ))
+    # Rejected pack, its plain-text retry, then each item alone
+    assert len(server.requests) == 5
+    assert sorted(results) == [1, 2, 3]
+    assert all(r.description == "the lantern flickered as rain traced" for r in results.values())
+
+
+def test_pack_learns_per_item_budget(monkeypatch):
+    """Test a packed completion's usage is observed per item and failures reach every item."""
+    errors = {}
+    generator = ProfileGenerator(api_key='test-key', structured=True)
+    with MockOpenAIServer(completion_tokens=30) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        requests = [{"prompt": f"Person {i}"} for i in range(3)]
+        asyncio.run(generator.agenerate_packed(requests))
+        assert list(generator.budgets._samples["profile"]) == [10]
+
+        server.error_rate_5xx = 1.0
+        generator.retry.max_retries = 0
+        asyncio.run(run_batch(
+            [(i, {"type": "profile", "prompt": f"Other {i}"}) for i in range(1, 3)],
+            {"profile": generator}, pack_tokens=5000,
+            on_error=lambda i, t, e: errors.__setitem__(i, e)
+        ))
+    assert sorted(errors) == [1, 2]
+    assert errors[1] is errors[2]
+
+
+def test_pack_exception_reported_per_item(monkeypatch):
+    """Test an exception raised by the pack call itself is reported for each of its items."""
+    errors = {}
+    generator = ProfileGenerator(api_key='test-key', structured=True)
+
+    async def broken(requests):
+        raise RuntimeError("pack broke")
+
+    monkeypatch.setattr(generator, "agenerate_packed", broken)
+    asyncio.run(run_batch(
+        [(i, {"type": "profile", "prompt": f"Person {i}"}) for i in range(1, 4)],
+        {"profile": generator}, pack_tokens=5000,
+        on_error=lambda i, t, e: errors.__setitem__(i, e)
+    ))
+    assert sorted(errors) == [1, 2, 3]
+    assert all(str(e) == "pack broke" for e in errors.values())
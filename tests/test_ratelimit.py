@@ -0,0 +1,142 @@
+"""
+Tests for client-side rate limiting.
+"""
+import pickle
+import pytest
+from unittest.mock import patch, MagicMock
+from morewritings.generators import SceneryGenerator
+from morewritings.ratelimit import (
+    RateLimiter, RateLimitRegistry, TokenBucket, parse_reset
+)
+
+
+@pytest.fixture
+def clock():
+    """Controllable monotonic clock."""
+    now = [1000.0]
+    with patch('morewritings.ratelimit.time.monotonic', side_effect=lambda: now[0]):
+        yield now
+
+
+def test_bucket_waits_for_debt(clock):
+    """Test reservations past capacity return the time to repay the debt."""
+    bucket = TokenBucket(per_minute=60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(30) == pytest.approx(30.0)
+    clock[0] += 30
+    assert bucket.reserve(1) == pytest.approx(1.0)
+
+
+def test_reconcile_refunds_unused_tokens(clock):
+    """Test over-estimated reservations are returned to the token bucket."""
+    limiter = RateLimiter(tokens_per_minute=1000)
+    reserved = limiter.acquire(800)
+    limiter.reconcile(reserved, 200)
+    assert limiter.tokens.tokens == pytest.approx(800)
+
+
+def test_headers_adapt_limits(clock):
+    """Test provider headers set the rate and clamp the remaining budget."""
+    limiter = RateLimiter(requests_per_minute=100)
+    limiter.update_from_headers({
+        "x-ratelimit-limit-requests": "60",
+        "x-ratelimit-remaining-requests": "5",
+        "x-ratelimit-limit-tokens": "10000",
+        "x-ratelimit-remaining-tokens": "0",
+        "x-ratelimit-reset-tokens": "6s",
+    })
+    assert limiter.requests.per_minute == 60
+    assert limiter.requests.tokens == 5
+    assert limiter.tokens.per_minute == 10000
+    assert limiter.tokens.reserve(1) > 6.0
+
+
+def test_headers_never_raise_configured_limits(clock):
+    """Test higher provider limits keep the configured rate, and worker shares split them."""
+    headers = {
+        "x-ratelimit-limit-requests": "500",
+        "x-ratelimit-remaining-requests": "499",
+        "x-ratelimit-limit-tokens": "30000",
+        "x-ratelimit-remaining-tokens": "8000",
+    }
+    limiter = RateLimiter(requests_per_minute=60, tokens_per_minute=40000)
+    limiter.update_from_headers(headers)
+    assert limiter.requests.per_minute == 60
+    assert limiter.tokens.per_minute == 30000
+    assert limiter.tokens.tokens == 8000
+
+    registry = RateLimitRegistry(default=(60, 40000)).share(4)
+    worker = pickle.loads(pickle.dumps(registry)).for_model("gpt-4")
+    worker.update_from_headers(headers)
+    assert worker.requests.per_minute == 15
+    assert worker.tokens.per_minute == 7500
+    assert worker.tokens.tokens == 2000
+
+
+def test_parse_reset():
+    """Test provider reset durations are parsed to seconds."""
+    assert parse_reset("1s") == 1.0
+    assert parse_reset("6m0s") == 360.0
+    assert parse_reset("20ms") == pytest.approx(0.02)
+    assert parse_reset("2.5") == 2.5
+    assert parse_reset("") is None
+
+
+def test_registry_from_specs():
+    """Test default and per-model limits parse and share limiters."""
+    registry = RateLimitRegistry.from_specs(["500:30000", "gpt-4o=:90000"])
+    assert registry.default == (500.0, 30000.0)
+    assert registry.limits["gpt-4o"] == (None, 90000.0)
+    assert registry.for_model("gpt-4") is registry.for_model("gpt-4")
+    assert registry.for_model("gpt-4o").requests is None
+    with pytest.raises(ValueError):
+        RateLimitRegistry.from_specs(["gpt-4=lots"])
+
+
+def test_registry_shared_across_processes():
+    """Test a registry splits its limits into equal shares and pickles without limiter state."""
+    registry = RateLimitRegistry.from_specs(["500:30000", "gpt-4o=:90000"])
+    registry.for_model("gpt-4").acquire(10)
+    share = pickle.loads(pickle.dumps(registry.share(4)))
+    assert share.default == (125.0, 7500.0)
+    assert share.limits["gpt-4o"] == (None, 22500.0)
+    assert share._limiters == {}
+
+
+def test_generator_reserves_and_reconciles():
+    """Test generators budget through the registry and read usage and headers."""
+    with patch('morewritings.clients.OpenAI') as openai:
+        raw = MagicMock()
+        raw.headers = {"x-ratelimit-limit-requests": "3000"}
+        response = raw.parse.return_value
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Generated content"
+        response.usage.total_tokens = 120
+        stream = openai.return_value.chat.completions.with_streaming_response.create
+        stream.return_value.__enter__.return_value = raw
+        
+        registry = RateLimitRegistry(default=(100, 10000))
+        generator = SceneryGenerator(api_key='test-key', rate_limits=registry)
+        scenery = generator.generate(prompt="A quiet harbor")
+    
+    limiter = registry.for_model("gpt-4")
+    assert scenery.description == "Generated content"
+    assert limiter.requests.per_minute == 100
+    assert limiter.tokens.tokens == pytest.approx(10000 - 120, abs=1)
+
+
+def test_streams_reconcile_reserved_tokens(clock, server):
+    """Test streamed calls settle their reservation with the reported or estimated usage."""
+    registry = RateLimitRegistry(default=(100, 10000))
+    generator = SceneryGenerator(api_key='test-key', rate_limits=registry, structured=False)
+    limiter = registry.for_model("gpt-4")
+    
+    assert "".join(generator.stream(prompt="A quiet harbor")).startswith("the lantern")
+    assert server.requests[-1]["body"]["stream_options"] == {"include_usage": True}
+    full = 10000 - limiter.tokens.tokens
+    assert 12 < full < 200
+    
+    stream = iter(generator.stream(prompt="A quiet harbor"))
+    next(stream)
+    stream.close()
+    assert 0 < 10000 - limiter.tokens.tokens - full < full
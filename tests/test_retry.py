@@ -0,0 +1,85 @@
+"""
+Tests for the retry policy.
+"""
+import openai
+import pytest
+from unittest.mock import patch, MagicMock
+from morewritings.generators import SceneGenerator
+from morewritings.retry import GenerationError, RetryPolicy, is_retryable, retry_after
+
+
+def status_error(cls, status, headers=None, code=None):
+    """Build an OpenAI status error with a mocked response."""
+    response = MagicMock()
+    response.status_code = status
+    response.headers = headers or {}
+    return cls("error", response=response, body={"code": code} if code else None)
+
+
+def test_error_classification():
+    """Test transient errors are retryable and client errors are fatal."""
+    assert is_retryable(status_error(openai.RateLimitError, 429))
+    assert is_retryable(status_error(openai.InternalServerError, 503))
+    assert is_retryable(openai.APITimeoutError(request=MagicMock()))
+    assert is_retryable(ConnectionResetError())
+    assert not is_retryable(status_error(openai.AuthenticationError, 401))
+    assert not is_retryable(status_error(openai.BadRequestError, 400))
+    assert not is_retryable(status_error(openai.RateLimitError, 429, code="insufficient_quota"))
+    assert not is_retryable(ValueError("bad"))
+
+
+def test_retry_after_headers():
+    """Test Retry-After variants are honored and capped."""
+    assert retry_after(status_error(openai.RateLimitError, 429, {"retry-after": "3"})) == 3.0
+    assert retry_after(status_error(openai.RateLimitError, 429, {"retry-after-ms": "250"})) == 0.25
+    assert retry_after(ValueError()) is None
+    policy = RetryPolicy(max_retry_after=5)
+    assert policy.delay(0, status_error(openai.RateLimitError, 429, {"retry-after": "90"})) == 5
+
+
+def test_backoff_is_capped_and_jittered():
+    """Test delays stay within the exponential envelope and max_delay."""
+    policy = RetryPolicy(base_delay=1, max_delay=4)
+    for attempt in range(6):
+        delay = policy.delay(attempt, ConnectionError())
+        assert 0 <= delay <= min(4, 2 ** attempt)
+
+
+@patch('morewritings.retry.time.sleep')
+def test_call_retries_transient_then_succeeds(sleep):
+    """Test transient failures are retried until success."""
+    fn = MagicMock(side_effect=[ConnectionError(), status_error(openai.RateLimitError, 429), "ok"])
+    assert RetryPolicy().call(fn) == "ok"
+    assert fn.call_count == 3
+    assert sleep.call_count == 2
+
+
+@patch('morewritings.retry.time.sleep')
+def test_call_stops_on_fatal_and_exhaustion(sleep):
+    """Test fatal errors fail immediately and transient ones after max_retries."""
+    fatal = MagicMock(side_effect=status_error(openai.AuthenticationError, 401))
+    with pytest.raises(GenerationError) as info:
+        RetryPolicy().call(fatal)
+    assert not info.value.retryable
+    assert fatal.call_count == 1
+    
+    transient = MagicMock(side_effect=ConnectionError("reset"))
+    with pytest.raises(GenerationError) as info:
+        RetryPolicy(max_retries=2).call(transient)
+    assert info.value.retryable
+    assert info.value.attempts == 3
+    assert isinstance(info.value, RuntimeError)
+
+
+@patch('morewritings.retry.time.sleep')
+def test_generator_retries_api_errors(sleep):
+    """Test generators retry through their policy."""
+    with patch('morewritings.clients.OpenAI') as openai_cls:
+        response = MagicMock()
+        response.choices = [MagicMock()]
+        response.choices[0].message.content = "Generated content"
+        openai_cls.return_value.chat.completions.create.side_effect = [
+            status_error(openai.InternalServerError, 502), response
+        ]
+        scene = SceneGenerator(api_key='test-key').generate(prompt="Test prompt")
+    assert scene.content == "Generated content"
@@ -0,0 +1,82 @@
+"""
+Tests for model serialization.
+"""
+import json
+from datetime import datetime
+import pytest
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.models import Profile, Scene, Scenery
+from morewritings.serialization import dumps, dumps_lines, dumps_many, write_json
+from morewritings.testing import MockOpenAIServer
+
+
+def scene(i=1, **kwargs):
+    return Scene(title=f"Scene {i}", content="Rain on the window — again.", tags=["noir"],
+                 created_at=datetime(2025, 11, 26, 9, 30, 0, 250000), **kwargs)
+
+
+def test_dumps_indented_and_compact():
+    """Test models are written as ISO-dated JSON, indented or compact, in UTF-8."""
+    indented = dumps(scene())
+    assert indented.startswith(b'{\n  "title": "Scene 1",')
+    data = json.loads(indented)
+    assert data["created_at"] == "2025-11-26T09:30:00.250000"
+    assert data["content"] == "Rain on the window — again."
+    assert "—".encode("utf-8") in indented
+
+    compact = dumps(scene(), compact=True)
+    assert b"\n" not in compact and json.loads(compact) == data
+    assert Scene.model_validate_json(compact) == scene()
+
+
+def test_bulk_and_lines():
+    """Test lists serialize in one call, mixed types included, and as JSON Lines."""
+    scenes = [scene(i) for i in range(3)]
+    assert json.loads(dumps_many(scenes)) == [json.loads(dumps(s)) for s in scenes]
+
+    mixed = [scene(), Profile(name="Pip", description="A thief"),
+             Scenery(name="Mill", description="Old", location_type="outdoor")]
+    assert [item.get("name") for item in json.loads(dumps_many(mixed, compact=True))] == [
+        None, "Pip", "Mill"
+    ]
+    lines = dumps_lines(scenes).splitlines()
+    assert [Scene.model_validate_json(line) for line in lines] == scenes
+
+
+def test_unserializable_metadata_falls_back_to_str():
+    """Test values pydantic cannot serialize are written as strings."""
+    odd = scene(metadata={"source": object})
+    assert json.loads(dumps(odd))["metadata"]["source"] == str(object)
+    assert json.loads(dumps_many([odd]))[0]["metadata"]["source"] == str(object)
+
+
+def test_orjson_backend_matches(monkeypatch, tmp_path):
+    """Test the orjson backend writes the same JSON and is chosen by environment."""
+    pytest.importorskip("orjson")
+    scenes = [scene(i, metadata={"telemetry": {"wall_time": 0.5}}) for i in range(2)]
+    assert dumps(scenes[0], backend="orjson") == dumps(scenes[0])
+    assert dumps(scenes[0], compact=True, backend="orjson") == dumps(scenes[0], compact=True)
+    assert json.loads(dumps_many(scenes, backend="orjson")) == json.loads(dumps_many(scenes))
+
+    monkeypatch.setenv("MOREWRITINGS_JSON_BACKEND", "orjson")
+    write_json(tmp_path / "out" / "scene.json", scenes[0])
+    assert (tmp_path / "out" / "scene.json").read_bytes() == dumps(scenes[0], backend="pydantic")
+    with pytest.raises(ValueError, match="Unknown JSON backend"):
+        dumps(scenes[0], backend="simplejson")
+
+
+def test_batch_compact_output(monkeypatch, tmp_path):
+    """Test batch-generate --compact writes one-line JSON files."""
+    batch = tmp_path / "batch.jsonl"
+    batch.write_text(json.dumps({"type": "scene", "prompt": "A duel", "title": "Duel"}))
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, [
+            "batch-generate", str(batch), "-o", str(tmp_path / "out"), "--compact",
+            "--no-cache", "--api-key", "test-key"
+        ])
+    assert result.exit_code == 0, result.output
+    text = (tmp_path / "out" / "scene_001.json").read_text()
+    assert "\n" not in text
+    assert Scene.model_validate_json(text).title == "Duel"
@@ -0,0 +1,128 @@
+"""
+Tests for the generation server.
+"""
+import http.client
+import json
+import socket
+import threading
+import time
+import pytest
+from morewritings.generators import ProfileGenerator, SceneGenerator
+from morewritings.server import GenerationServer
+from morewritings.telemetry import MetricsRecorder
+
+
+@pytest.fixture
+def server_options():
+    """Mock OpenAI API slow enough for requests to overlap."""
+    return {"completion_tokens": 3, "latency": 0.2}
+
+
+def make_server(**kwargs):
+    telemetry = MetricsRecorder()
+    generators = {
+        "scene": SceneGenerator(api_key='test-key', telemetry=telemetry),
+        "profile": ProfileGenerator(api_key='test-key', telemetry=telemetry),
+    }
+    return GenerationServer(generators, port=0, telemetry=telemetry, **kwargs)
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP connection over a Unix socket."""
+
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.path)
+
+
+def request(connection, method, path, body=None):
+    connection.request(method, path, body=None if body is None else json.dumps(body))
+    response = connection.getresponse()
+    return response.status, response.read().decode()
+
+
+def test_generates_over_keepalive_connection(server):
+    """Test items are generated over one connection and errors map to HTTP statuses."""
+    with make_server() as service:
+        connection = http.client.HTTPConnection(*service._server.server_address[:2])
+        status, body = request(connection, "POST", "/generate/scene",
+                               {"prompt": "A duel", "title": "The Duel", "genre": "fantasy"})
+        assert status == 200, body
+        scene = json.loads(body)
+        assert (scene["title"], scene["genre"]) == ("The Duel", "fantasy")
+        assert scene["content"] == "the lantern flickered"
+
+        status, body = request(connection, "POST", "/generate/profile", {"prompt": "A wizard"})
+        assert status == 200 and json.loads(body)["description"] == "the lantern flickered"
+
+        assert request(connection, "POST", "/generate/poem", {"prompt": "x"})[0] == 404
+        assert request(connection, "POST", "/generate/scene", {"title": "x"})[0] == 400
+        assert request(connection, "GET", "/nowhere")[0] == 404
+    assert len(server.requests) == 2
+
+
+def test_queue_limit_and_health(server):
+    """Test requests beyond the concurrency and queue limits are refused with 503."""
+    with make_server(concurrency=1, max_queue=1) as service:
+        host, port = service._server.server_address[:2]
+        statuses = []
+
+        def send(i):
+            connection = http.client.HTTPConnection(host, port)
+            statuses.append(request(connection, "POST", "/generate/scene",
+                                    {"prompt": f"Scene {i}"})[0])
+
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sorted(statuses) == [200, 200, 503]
+
+        connection = http.client.HTTPConnection(host, port)
+        status, body = request(connection, "GET", "/health")
+        health = json.loads(body)
+        assert status == 200
+        assert (health["status"], health["in_flight"], health["queued"]) == ("ok", 0, 0)
+
+        status, body = request(connection, "GET", "/metrics")
+        assert "morewritings_server_rejected_total 1" in body
+        assert "morewritings_requests_total 2" in body
+
+
+def test_unix_socket(server, tmp_path):
+    """Test the server listens on a Unix socket and removes it on shutdown."""
+    path = str(tmp_path / "morewritings.sock")
+    with make_server(socket_path=path) as service:
+        assert service.url == f"unix:{path}"
+        status, body = request(UnixHTTPConnection(path), "POST", "/generate/scene",
+                               {"prompt": "A duel"})
+        assert status == 200, body
+    assert not (tmp_path / "morewritings.sock").exists()
+
+
+def test_queued_requests_wait_for_a_slot(server):
+    """Test requests beyond the concurrency limit wait in the queue and then succeed."""
+    with make_server(concurrency=2, max_queue=10) as service:
+        host, port = service._server.server_address[:2]
+        statuses, peaks = [], {"queued": 0, "in_flight": 0}
+
+        def send(i):
+            connection = http.client.HTTPConnection(host, port)
+            statuses.append(request(connection, "POST", "/generate/scene",
+                                    {"prompt": f"Scene {i}"})[0])
+
+        threads = [threading.Thread(target=send, args=(i,)) for i in range(6)]
+        for thread in threads:
+            thread.start()
+        while any(thread.is_alive() for thread in threads):
+            peaks["queued"] = max(peaks["queued"], service.queued)
+            peaks["in_flight"] = max(peaks["in_flight"], service.in_flight)
+            time.sleep(0.01)
+        assert statuses == [200] * 6
+        assert peaks["queued"] > 0 and peaks["in_flight"] == 2
+    assert len(server.requests) == 6
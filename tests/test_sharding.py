@@ -0,0 +1,115 @@
+"""
+Tests for sharded and multi-process batch runs.
+"""
+import json
+import pytest
+from click.testing import CliRunner
+from morewritings.batch import MANIFEST_NAME, BatchJournal, Shard, write_atomic
+from morewritings.cli import cli
+from morewritings.testing import MockOpenAIServer
+
+
+@pytest.fixture
+def batch(tmp_path):
+    """JSONL batch of seven scenery items."""
+    path = tmp_path / "batch.jsonl"
+    path.write_text("\n".join(
+        json.dumps({"type": "scenery", "prompt": f"Place {i}", "name": f"Place {i}"})
+        for i in range(1, 8)
+    ))
+    return path
+
+
+def read_manifest(output_dir):
+    return [json.loads(line) for line in (output_dir / MANIFEST_NAME).read_text().splitlines()]
+
+
+def test_shards_partition_positions():
+    """Test shards and their splits deal out every position exactly once."""
+    shards = [Shard.parse(f"{i}/3") for i in (1, 2, 3)]
+    assert [p for p in range(1, 10) if p in shards[1]] == [2, 5, 8]
+
+    split = shards[1].split(2)
+    assert split == [Shard(2, 6), Shard(5, 6)]
+    assert [p for p in range(1, 13) if p in split[0]] == [2, 8]
+    assert sorted(p for s in split for p in range(1, 13) if p in s) == [2, 5, 8, 11]
+
+    for spec in ("0/3", "4/3", "two/3", "3"):
+        with pytest.raises(ValueError):
+            Shard.parse(spec)
+
+
+def test_manifest_merges_shard_journals(tmp_path):
+    """Test the manifest orders entries from every shard and drops stale outputs."""
+    for shard, indices in ((Shard(1, 2), (1, 3)), (Shard(2, 2), (2, 4))):
+        with BatchJournal(tmp_path, shard).open() as journal:
+            for i in indices:
+                name = f"scene_{i:03d}.json"
+                journal.record(i, "scene", name, write_atomic(tmp_path / name, f"content {i}"))
+    with BatchJournal(tmp_path, Shard(2, 2)).open(resume=True) as journal:
+        journal.record_failure(6, "scene", "boom", retryable=True)
+    (tmp_path / "scene_003.json").write_text("tampered")
+
+    entries = BatchJournal(tmp_path).write_manifest()
+    assert [(e["index"], e.get("file")) for e in entries] == [
+        (1, "scene_001.json"), (2, "scene_002.json"), (4, "scene_004.json"), (6, None)
+    ]
+    assert read_manifest(tmp_path) == entries
+    assert sorted(BatchJournal(tmp_path, Shard(1, 2)).completed()) == [1, 2, 4]
+
+    with BatchJournal(tmp_path).open():
+        pass
+    assert [p.name for p in tmp_path.glob(".batch_journal*")] == [".batch_journal.jsonl"]
+
+
+def test_cli_shards_then_merge(monkeypatch, tmp_path, batch):
+    """Test shards generate disjoint items into one directory and merge-shards orders them."""
+    output = tmp_path / "out"
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        for shard in ("2/2", "1/2"):
+            result = CliRunner().invoke(cli, [
+                "batch-generate", str(batch), "-o", str(output), "--shard", shard,
+                "--no-cache", "--api-key", "test-key"
+            ])
+            assert result.exit_code == 0, result.output
+        assert "Generated 4 items" in result.output
+
+        result = CliRunner().invoke(cli, [
+            "batch-generate", str(batch), "-o", str(output), "--resume",
+            "--no-cache", "--api-key", "test-key"
+        ])
+        assert "Resuming: 7 items already completed" in result.output
+    assert len(server.requests) == 7
+
+    (output / "scenery_005.json").unlink()
+    result = CliRunner().invoke(cli, ["merge-shards", str(output)])
+    assert result.exit_code == 1
+    assert "1 items missing: 5" in result.output
+    assert [e["index"] for e in read_manifest(output)] == [1, 2, 3, 4, 6, 7]
+
+    result = CliRunner().invoke(cli, ["batch-generate", str(batch), "--shard", "3/2"])
+    assert result.exit_code != 0
+    assert "Invalid shard 3/2" in result.output
+
+
+def test_cli_workers_write_ordered_manifest(monkeypatch, tmp_path, batch):
+    """Test --workers splits the batch across processes and merges one ordered manifest."""
+    output = tmp_path / "out"
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        result = CliRunner().invoke(cli, [
+            "batch-generate", str(batch), "-o", str(output), "--workers", "2",
+            "--no-cache", "--api-key", "test-key"
+        ])
+    assert result.exit_code == 0, result.output
+    assert "Manifest of 7 items written" in result.output
+    assert len(server.requests) == 7
+
+    manifest = read_manifest(output)
+    assert [(e["index"], e["file"]) for e in manifest] == [
+        (i, f"scenery_{i:03d}.json") for i in range(1, 8)
+    ]
+    assert sorted(p.name for p in output.glob(".batch_journal*")) == [
+        ".batch_journal.shard-1-of-2.jsonl", ".batch_journal.shard-2-of-2.jsonl"
+    ]
@@ -0,0 +1,90 @@
+"""
+Tests for in-flight request coalescing.
+"""
+import asyncio
+import threading
+import time
+import pytest
+from morewritings.batch import run_batch
+from morewritings.generators import ProfileGenerator
+from morewritings.singleflight import SingleFlight
+from morewritings.testing import MockOpenAIServer
+
+
+def test_threads_share_one_call():
+    """Test concurrent duplicate calls run once and share the result."""
+    flights = SingleFlight()
+    calls = []
+    results = []
+
+    def slow(value):
+        calls.append(value)
+        time.sleep(0.05)
+        return value * 2
+
+    threads = [
+        threading.Thread(target=lambda: results.append(flights.do("k", slow, 21)))
+        for _ in range(5)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == [21]
+    assert sorted(results) == [(42, False)] + [(42, True)] * 4
+    assert flights.coalesced == 4
+    # Finished calls are forgotten
+    assert flights.do("k", slow, 1) == (2, False)
+
+
+def test_async_waiters_share_result_and_errors():
+    """Test async duplicates share results and failures, and survive a cancelled waiter."""
+    flights = SingleFlight()
+    calls = []
+
+    async def slow(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        if value < 0:
+            raise ValueError("negative")
+        return value
+
+    async def main():
+        first = asyncio.ensure_future(flights.ado("a", slow, 1))
+        others = [asyncio.ensure_future(flights.ado("a", slow, 1)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        first.cancel()
+        results = await asyncio.gather(*others)
+        errors = await asyncio.gather(
+            flights.ado("b", slow, -1), flights.ado("b", slow, -1), return_exceptions=True
+        )
+        return results, errors
+
+    results, errors = asyncio.run(main())
+    assert calls == [1, -1]
+    assert results == [(1, True)] * 3
+    assert all(isinstance(e, ValueError) for e in errors)
+
+
+@pytest.mark.parametrize("distinct, coalesce, expected", [
+    (False, True, 1),
+    (True, True, 4),
+    (False, False, 4),
+])
+def test_batch_duplicates_coalesced(monkeypatch, distinct, coalesce, expected):
+    """Test identical concurrent batch items make one API call unless opted out."""
+    with MockOpenAIServer(latency=0.05, completion_tokens=12) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        results = {}
+        item = {"type": "profile", "prompt": "A wise old wizard", "name": "Merlin"}
+        if distinct:
+            item["distinct"] = True
+        asyncio.run(run_batch(
+            [(i, dict(item)) for i in range(1, 5)],
+            {"profile": ProfileGenerator(api_key='test-key', coalesce=coalesce)},
+            concurrency=4,
+            on_result=lambda i, t, r: results.__setitem__(i, r)
+        ))
+    assert len(server.requests) == expected
+    assert sorted(results) == [1, 2, 3, 4]
+    assert len({r.description for r in results.values()}) == 1
@@ -0,0 +1,36 @@
+"""
+Import-time regression tests for CLI startup.
+"""
+import subprocess
+import sys
+import pytest
+
+
+HEAVY_MODULES = ("openai", "httpx", "httpx2", "pydantic", "yaml", "asyncio")
+
+PROBE = """
+import sys
+from morewritings.cli import cli
+try:
+    cli({args!r})
+except SystemExit:
+    pass
+print("loaded:" + ",".join(m for m in {modules!r} if m in sys.modules))
+"""
+
+
+@pytest.mark.parametrize("args", [
+    ["--version"],
+    ["--help"],
+    ["generate-scene", "--help"],
+    ["batch-generate", "--help"],
+])
+def test_cli_does_not_import_heavy_modules(args):
+    """Test help and version paths never import the generation stack."""
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(args=args, modules=HEAVY_MODULES)],
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    assert result.stdout.splitlines()[-1] == "loaded:"
@@ -0,0 +1,96 @@
+"""
+Tests for schema-constrained JSON output.
+"""
+import asyncio
+from morewritings.generators import ProfileGenerator, SceneGenerator, SceneryGenerator
+from morewritings.models import Profile
+from morewritings.structured import (
+    output_model_of, parse_output, response_format, supports_json_schema
+)
+from morewritings.testing import MockOpenAIServer
+
+
+def test_output_model_follows_data_model():
+    """Test the reply schema is derived from the data model's chosen fields."""
+    model = output_model_of(Profile, ["name", "description", "traits", "relationships"])
+    schema = response_format(model)["json_schema"]["schema"]
+    assert set(schema["properties"]) == {"name", "description", "traits", "relationships"}
+    assert set(schema["required"]) == {"name", "description"}
+    assert schema["properties"]["traits"]["items"] == {"type": "string"}
+
+    draft = parse_output(model, '{"name": "Aria", "description": "A mage", "traits": ["brave"]}')
+    assert draft.traits == ["brave"]
+    assert parse_output(model, "Aria is a young mage.") is None
+    assert parse_output(model, '{"name": "Aria"}') is None
+
+
+def test_one_call_fills_every_field(monkeypatch):
+    """Test profiles and scenery are fully populated from a single structured reply."""
+    monkeypatch.setenv("MOREWRITINGS_MODEL", "gpt-4o")
+    with MockOpenAIServer(completion_tokens=6) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        profile = ProfileGenerator(api_key='test-key').generate("A wizard", name="Merlin")
+        scenery = SceneryGenerator(api_key='test-key').generate("A city", mood="grim")
+    assert len(server.requests) == 2
+    body = server.requests[0]["body"]
+    assert body["response_format"]["json_schema"]["name"] == "ProfileOutput"
+
+    assert profile.name == "Merlin"
+    assert profile.description == "the lantern flickered as rain traced"
+    assert profile.traits == ["the"]
+    assert profile.background == profile.description
+    assert scenery.mood == "grim"
+    assert scenery.location_type == scenery.description
+    assert scenery.details == ["the"]
+
+
+def test_falls_back_to_text_for_models_without_json_mode(monkeypatch):
+    """Test a rejected schema is retried as plain text and not sent again for that model."""
+    with MockOpenAIServer(completion_tokens=6, json_schema=False) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        generator = ProfileGenerator(api_key='test-key', structured=True)
+        first = generator.generate("A wizard", name="Merlin")
+        second = asyncio.run(generator.agenerate("A knight", name="Gawain"))
+    sent = ["response_format" in r["body"] for r in server.requests]
+    assert sent == [True, False, False]
+    assert first.description == second.description == "the lantern flickered as rain traced"
+    assert first.traits == []
+
+
+def test_schema_only_for_models_known_to_support_it(monkeypatch):
+    """Test models without JSON schema support (like the default gpt-4) get plain text requests."""
+    assert supports_json_schema("gpt-4o-mini") and supports_json_schema("gpt-4.1-nano")
+    assert not supports_json_schema("gpt-4") and not supports_json_schema("gpt-4o-2024-05-13")
+    assert not supports_json_schema("o1-mini") and not supports_json_schema("my-local-model")
+
+    with MockOpenAIServer(completion_tokens=6, json_schema=False) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        for _ in range(2):
+            profile = ProfileGenerator(api_key='test-key').generate("A wizard", name="Merlin")
+    assert len(server.requests) == 2
+    assert not any("response_format" in r["body"] for r in server.requests)
+    assert profile.description == "the lantern flickered as rain traced"
+    assert not ProfileGenerator(api_key='test-key').can_pack
+
+
+def test_streams_and_opt_out_use_plain_text(monkeypatch):
+    """Test streams and structured=False never send a response_format."""
+    with MockOpenAIServer(completion_tokens=6) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        scene = SceneGenerator(api_key='test-key').generate("A duel", stream=True).result
+        plain = SceneGenerator(api_key='test-key', structured=False).generate("A duel")
+    assert not any("response_format" in r["body"] for r in server.requests)
+    assert scene.content == plain.content == "the lantern flickered as rain traced"
+
+
+def test_structured_scene_keeps_requested_fields(monkeypatch):
+    """Test requested title and tags win over those in the reply."""
+    monkeypatch.setenv("MOREWRITINGS_MODEL", "gpt-4o")
+    with MockOpenAIServer(completion_tokens=3) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        generator = SceneGenerator(api_key='test-key')
+        drafted = generator.generate("A duel", characters=["Aria"])
+        titled = generator.generate("A feast", title="The Feast", tags=["court"])
+    assert drafted.title == drafted.content == "the lantern flickered"
+    assert drafted.characters == ["Aria"]
+    assert (titled.title, titled.tags) == ("The Feast", ["court"])
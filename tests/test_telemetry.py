@@ -0,0 +1,114 @@
+"""
+Tests for per-request telemetry.
+"""
+import json
+import asyncio
+import pytest
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.generators import SceneGenerator
+from morewritings.retry import RetryPolicy
+from morewritings.telemetry import MetricsRecorder, RequestMetrics, Reservoir, percentile
+
+
+def test_recorder_summary():
+    """Test totals, percentiles and throughput are aggregated."""
+    recorder = MetricsRecorder()
+    recorder.start()
+    for i in range(1, 101):
+        recorder.record(RequestMetrics(
+            type="scene", model="gpt-4", wall_time=i / 100,
+            prompt_tokens=10, completion_tokens=20, attempts=2 if i == 1 else 1
+        ))
+    recorder.record(RequestMetrics(type="scene", model="gpt-4", attempts=1, error="boom"))
+    recorder.stop()
+    summary = recorder.summary()
+    assert summary["requests"] == 101
+    assert summary["errors"] == 1
+    assert summary["retries"] == 1
+    assert summary["completion_tokens"] == 2000
+    assert summary["latency_p50"] == pytest.approx(0.49)
+    assert summary["latency_p99"] == pytest.approx(0.99)
+    assert summary["ttfb_p50"] is None
+    assert summary["requests_per_second"] > 0
+    assert percentile([], 50) is None
+
+
+def test_reservoir_is_bounded():
+    """Test percentile samples stay within the reservoir size."""
+    reservoir = Reservoir(size=10)
+    for i in range(1000):
+        reservoir.add(float(i))
+    assert reservoir.seen == 1000
+    assert len(reservoir.values) == 10
+
+
+def test_write_prometheus_and_json(tmp_path):
+    """Test metrics export as a Prometheus textfile or JSON."""
+    recorder = MetricsRecorder()
+    recorder.start()
+    recorder.record(RequestMetrics(type="scene", model="gpt-4", wall_time=0.25, attempts=1))
+    recorder.stop()
+    recorder.write(tmp_path / "metrics.prom")
+    recorder.write(tmp_path / "metrics.json")
+    text = (tmp_path / "metrics.prom").read_text()
+    assert "morewritings_requests_total 1" in text
+    assert 'morewritings_latency_seconds{quantile="0.50"} 0.250000' in text
+    assert json.loads((tmp_path / "metrics.json").read_text())["requests"] == 1
+
+
+def test_generator_attaches_metrics(server):
+    """Test timings, usage and retries are recorded and attached to scenes."""
+    server.error_rate_429 = 0.5
+    recorder = MetricsRecorder()
+    generator = SceneGenerator(
+        api_key='test-key', telemetry=recorder, retry=RetryPolicy(max_retries=20, base_delay=0.001)
+    )
+    scenes = [generator.generate(prompt=f"Scene {i}") for i in range(4)]
+    scenes.append(asyncio.run(generator.agenerate(prompt="Async scene")))
+
+    telemetry = scenes[0].metadata["telemetry"]
+    assert telemetry["completion_tokens"] == 12
+    assert telemetry["prompt_tokens"] > 0
+    assert telemetry["time_to_first_byte"] <= telemetry["wall_time"]
+    summary = recorder.summary()
+    assert summary["requests"] == 5
+    assert summary["retries"] == len(server.requests) - 5
+    assert summary["completion_tokens"] == 60
+
+
+def test_batch_stats_and_metrics_file(server, tmp_path):
+    """Test batch-generate prints --stats and writes --metrics-file."""
+    batch_file = tmp_path / "batch.jsonl"
+    batch_file.write_text("\n".join(
+        json.dumps({"type": "scene", "prompt": f"Scene {i}"}) for i in range(3)
+    ))
+    metrics_file = tmp_path / "metrics.prom"
+    result = CliRunner().invoke(cli, [
+        "batch-generate", str(batch_file), "-o", str(tmp_path / "out"), "-c", "2",
+        "--no-cache", "--api-key", "test-key", "--stats", "--metrics-file", str(metrics_file)
+    ])
+    assert result.exit_code == 0, result.output
+    assert "Requests: 3 in" in result.output
+    assert "Latency p50/p95/p99:" in result.output
+    assert "morewritings_completion_tokens_total 36" in metrics_file.read_text()
+    scene = json.loads((tmp_path / "out" / "scene_001.json").read_text())
+    assert scene["metadata"]["telemetry"]["completion_tokens"] == 12
+
+
+def test_prompt_cache_hits_recorded(server):
+    """Test cached prompt tokens from usage are recorded and summarized as a hit rate."""
+    recorder = MetricsRecorder()
+    generator = SceneGenerator(
+        api_key='test-key', telemetry=recorder, style_guide="Keep it vivid. " * 400
+    )
+    scenes = [generator.generate(prompt=f"Scene {i}", genre="noir") for i in range(3)]
+    cached = [scene.metadata["telemetry"]["cached_tokens"] for scene in scenes]
+    assert cached[0] == 0
+    assert cached[1] == cached[2] >= 1024
+    summary = recorder.summary()
+    assert summary["cached_tokens"] == sum(cached)
+    assert 0.5 < summary["prompt_cache_hit_rate"] < 1
+    prometheus = recorder.to_prometheus()
+    assert f"morewritings_cached_tokens_total {sum(cached)}" in prometheus
+    assert "morewritings_prompt_cache_hit_ratio" in prometheus
@@ -0,0 +1,80 @@
+"""
+Tests for prompt templates and lazy expansion.
+"""
+import itertools
+import json
+from pathlib import Path
+import pytest
+from click.testing import CliRunner
+from morewritings.cli import cli
+from morewritings.templating import Template, expand_all, load_templates
+
+TEMPLATES = Path(__file__).parent.parent / "templates" / "scene_templates.yaml"
+VALUES = Path(__file__).parent.parent / "examples" / "template_values.yaml"
+
+
+def test_template_compiles_and_renders():
+    """Test placeholders, extra fields and format specs."""
+    template = Template("t", "{hero} meets {hero}'s rival in room {room:03d}", genre="action")
+    assert template.placeholders == ["hero", "room"]
+    assert template.request({"hero": "Aria", "room": 7}) == {
+        "type": "scene", "prompt": "Aria meets Aria's rival in room 007", "genre": "action"
+    }
+    with pytest.raises(ValueError):
+        Template("bad", "{0} and {x!r}")
+
+
+def test_cartesian_expansion_is_lazy():
+    """Test huge products stream without being materialized."""
+    template = Template("t", "{a}{b}{c}", values={k: range(10**6) for k in "abc"})
+    assert template.count() == 10**18
+    first = list(itertools.islice(template.expand(), 3))
+    assert [r["prompt"] for r in first] == ["000", "001", "002"]
+    with pytest.raises(ValueError, match="No values for b"):
+        next(Template("t", "{a}{b}", values={"a": [1]}).expand())
+
+
+def test_sampled_expansion_distinct_and_seeded():
+    """Test samples are distinct, reproducible and work on huge products."""
+    small = Template("t", "{a}-{b}", values={"a": [1, 2, 3], "b": ["x", "y"]})
+    prompts = [r["prompt"] for r in small.expand(sample=10, seed=1)]
+    assert sorted(prompts) == sorted(r["prompt"] for r in small.expand())
+    huge = Template("t", "{a} {b} {c} {d}", values={k: range(10**5) for k in "abcd"})
+    assert huge.count() == 10**20
+    sample = [r["prompt"] for r in huge.expand(sample=50, seed=7)]
+    assert len(set(sample)) == 50
+    assert sample == [r["prompt"] for r in huge.expand(sample=50, seed=7)]
+
+
+def test_repo_templates_expand():
+    """Test the shipped templates load and expand with the example values."""
+    templates = load_templates(TEMPLATES)
+    assert templates["epic_battle"].placeholders == ["hero", "villain", "location"]
+    values = {"hero": ["Aria"], "villain": ["the Lich King"], "location": ["a ruin"]}
+    request = next(expand_all([templates["epic_battle"]], values))
+    assert request == {
+        "type": "scene", "prompt": "Aria faces off against the Lich King in a ruin",
+        "genre": "action", "mood": "intense"
+    }
+
+
+def test_expand_templates_command(tmp_path):
+    """Test the command writes JSONL, counts, and reports missing values."""
+    runner = CliRunner()
+    result = runner.invoke(cli, [
+        "expand-templates", str(TEMPLATES), "-t", "epic_battle", "--values", str(VALUES),
+        "--set", "hero=Zed"
+    ])
+    assert result.exit_code == 0, result.output
+    lines = [json.loads(line) for line in result.output.splitlines()]
+    assert len(lines) == 1 * 2 * 3
+    assert all(line["prompt"].startswith("Zed faces off") for line in lines)
+
+    result = runner.invoke(cli, ["expand-templates", str(TEMPLATES), "--values", str(VALUES),
+                                 "--sample", "5", "--count"])
+    # Templates with fewer than 5 combinations contribute all of them
+    assert result.output.strip() == str(5 * 5 + 4)
+
+    result = runner.invoke(cli, ["expand-templates", str(TEMPLATES), "-t", "epic_battle"])
+    assert result.exit_code != 0
+    assert "No values for hero, villain, location" in result.output
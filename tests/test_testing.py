@@ -0,0 +1,47 @@
+"""
+Tests for the local mock OpenAI server.
+"""
+import asyncio
+from morewritings.batch import run_batch
+from morewritings.generators import SceneGenerator, ProfileGenerator
+from morewritings.retry import RetryPolicy
+
+
+def test_generate_against_mock_server(server):
+    """Test a real HTTP round trip produces a scene."""
+    scene = SceneGenerator(api_key='test-key').generate(prompt="A quiet harbor", title="Harbor")
+    assert scene.title == "Harbor"
+    assert len(scene.content.split()) == 12
+    assert server.requests[0]["body"]["messages"][1]["content"].startswith("A quiet harbor")
+
+
+def test_stream_against_mock_server(server):
+    """Test streamed chunks reassemble into the full completion."""
+    profile_stream = ProfileGenerator(api_key='test-key').stream(prompt="A wizard", name="Merlin")
+    chunks = list(profile_stream)
+    assert len(chunks) == 12
+    assert profile_stream.result.description == "".join(chunks)
+
+
+def test_injected_errors_are_retried(server):
+    """Test 429/5xx injection exercises the retry path."""
+    server.error_rate_429 = 0.3
+    server.error_rate_5xx = 0.3
+    generator = SceneGenerator(api_key='test-key',
+                               retry=RetryPolicy(max_retries=20, base_delay=0.001))
+    for _ in range(5):
+        assert generator.generate(prompt="Storm").content
+    assert len(server.requests) > 5
+
+
+def test_async_batch_against_mock_server(server):
+    """Test concurrent batch execution over real HTTP."""
+    server.latency = 0.02
+    results = {}
+    asyncio.run(run_batch(
+        [(i, {"type": "scene", "prompt": f"Scene {i}"}) for i in range(1, 9)],
+        {"scene": SceneGenerator(api_key='test-key')},
+        concurrency=4,
+        on_result=lambda i, t, r: results.__setitem__(i, r)
+    ))
+    assert sorted(results) == list(range(1, 9))
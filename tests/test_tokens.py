@@ -0,0 +1,70 @@
+"""
+Tests for token counting and adaptive output budgets.
+"""
+import pytest
+from unittest.mock import patch
+from morewritings.generators import SceneGenerator
+from morewritings.testing import MockOpenAIServer
+from morewritings.tokens import (
+    ContextWindowError,
+    OutputBudgets,
+    check_context,
+    context_window,
+    count_message_tokens,
+    count_tokens,
+)
+
+
+def test_counts_and_context_windows():
+    """Test message overhead and longest-prefix context window lookup."""
+    messages = [{"role": "system", "content": "abcd" * 10}, {"role": "user", "content": "hi"}]
+    assert count_message_tokens(messages) == (
+        3 + 3 + count_tokens("abcd" * 10) + 3 + count_tokens("hi")
+    )
+    assert context_window("gpt-4") == 8192
+    assert context_window("gpt-4-turbo-2024-04-09") == 128000
+    assert context_window("gpt-4o-mini") == 128000
+    assert context_window("my-local-model") is None
+    assert check_context(8000, "gpt-4") == 192
+    assert check_context(10**6, "my-local-model") is None
+    with pytest.raises(ContextWindowError):
+        check_context(8192, "gpt-4")
+
+
+def test_budgets_learn_from_completions():
+    """Test defaults apply until enough samples, then the p95 plus headroom."""
+    budgets = OutputBudgets(defaults={"scenery": 600}, headroom=1.5, minimum=64, min_samples=3)
+    assert budgets.budget("scenery", 2000) == 600
+    assert budgets.budget("scene", 2000) == 2000
+    for tokens in (100, 120, 200):
+        budgets.observe("scenery", tokens)
+    assert budgets.budget("scenery", 2000) == 301
+    assert budgets.budget("scenery", 250) == 250
+    for _ in range(3):
+        budgets.observe("profile", 5)
+    assert budgets.budget("profile", 2000) == 64
+
+
+def test_oversized_prompt_rejected_before_sending():
+    """Test prompts overflowing the context window never reach the API."""
+    with patch('morewritings.clients.OpenAI') as openai:
+        generator = SceneGenerator(api_key='test-key')
+        with pytest.raises(ContextWindowError) as excinfo:
+            generator.generate(prompt="word " * 40000)
+    assert excinfo.value.retryable is False
+    openai.return_value.chat.completions.create.assert_not_called()
+
+
+def test_truncated_budget_retries_with_full_limit(monkeypatch):
+    """Test a too-small learned budget is retried once at max_tokens and learned from."""
+    with MockOpenAIServer(completion_tokens=100) as server:
+        monkeypatch.setenv("OPENAI_BASE_URL", server.base_url)
+        budgets = OutputBudgets(defaults={"scene": 70}, min_samples=1)
+        generator = SceneGenerator(api_key='test-key', budgets=budgets)
+        scene = generator.generate(prompt="A quiet harbor")
+        generator.generate(prompt="A stormy harbor")
+
+    assert len(scene.content.split()) == 100
+    sent = [r["body"]["max_tokens"] for r in server.requests]
+    assert sent == [70, 2000, budgets.budget("scene", 2000)]
+    assert sent[2] == 126